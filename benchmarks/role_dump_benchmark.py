@@ -0,0 +1,162 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Micro-benchmark of the extraction of role statements from a
+pg_dumpall -r output, as done by pgbackman_dump and
+pgbackman_restore.
+
+It generates a synthetic dumpall file and compares the line by line
+parsing in pgbackman.role_dump with the old loop over every role for
+every line. The old loop is only run over the first --legacy-lines
+lines of the file and the time for the whole file is estimated.
+
+Run it from the top directory of the source tree:
+
+  python2 benchmarks/role_dump_benchmark.py --roles 50000
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..'))
+
+from pgbackman.role_dump import *
+
+
+# ############################################
+# Function generate_dumpall_file()
+# ############################################
+
+def generate_dumpall_file(dumpall_file,roles):
+    '''Generate a synthetic pg_dumpall -r output with roles roles'''
+
+    dumpall_file.write('--\n-- PostgreSQL database cluster dump\n--\n\n')
+    dumpall_file.write('SET default_transaction_read_only = off;\n\n')
+
+    for n in range(roles):
+        dumpall_file.write('CREATE ROLE role_%05d;\n' % n)
+        dumpall_file.write('ALTER ROLE role_%05d WITH NOSUPERUSER INHERIT NOCREATEROLE NOCREATEDB LOGIN NOREPLICATION NOBYPASSRLS;\n' % n)
+
+    dumpall_file.write('\n--\n-- Role memberships\n--\n\n')
+
+    for n in range(1,roles):
+        dumpall_file.write('GRANT role_%05d TO role_%05d GRANTED BY postgres;\n' % (n // 10,n))
+
+    dumpall_file.write('\n--\n-- PostgreSQL database cluster dump complete\n--\n\n')
+
+
+# ############################################
+# Function legacy_extract()
+# ############################################
+
+def legacy_extract(lines,role_list):
+    '''The old extraction, a loop over every role for every line'''
+
+    statements = []
+
+    for line in lines:
+        for role in role_list:
+
+            if ' ROLE ' + role + ';' in line:
+                statements.append(line)
+
+            if ' ROLE ' + role + ' ' in line:
+                statements.append(line)
+
+            if 'GRANT ' in line:
+                if ' TO ' + role + ' GRANTED BY ' in line:
+                    statements.append(line)
+
+    return statements
+
+
+# ############################################
+# Function linear_extract()
+# ############################################
+
+def linear_extract(lines,role_list):
+    '''The extraction with pgbackman.role_dump, one parse per line'''
+
+    statements = []
+    role_set = set(role_list)
+
+    for line in lines:
+        role_statement = parse_role_statement(line)
+
+        if role_statement and role_statement[1] in role_set:
+            statements.append(line)
+
+    return statements
+
+
+# ############################################
+# Function main()
+# ############################################
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark of the extraction of role statements from a pg_dumpall -r output')
+    parser.add_argument('--roles', type=int, default=50000, help='Roles in the synthetic dumpall file (default: 50000)')
+    parser.add_argument('--role-list', type=int, default=5000, dest='role_list', help='Roles in the role list of the database (default: 5000)')
+    parser.add_argument('--legacy-lines', type=int, default=500, dest='legacy_lines', help='Lines used to time the old extraction (default: 500)')
+
+    args = parser.parse_args()
+
+    role_list = ['role_%05d' % n for n in range(0,args.roles,max(1,args.roles // args.role_list))]
+
+    with tempfile.NamedTemporaryFile(mode='w+') as dumpall_file:
+        generate_dumpall_file(dumpall_file,args.roles)
+        dumpall_file.flush()
+
+        dumpall_file.seek(0)
+        lines = dumpall_file.readlines()
+
+    print('Dumpall file: %d roles, %d lines. Role list: %d roles' % (args.roles,len(lines),len(role_list)))
+
+    start = time.time()
+    statements = linear_extract(lines,role_list)
+    linear_time = time.time() - start
+
+    print('Linear extraction: %d statements in %.3f s' % (len(statements),linear_time))
+
+    sample = lines[:args.legacy_lines]
+
+    start = time.time()
+    legacy_statements = legacy_extract(sample,role_list)
+    legacy_time = (time.time() - start) * len(lines) / max(1,len(sample))
+
+    if legacy_statements != linear_extract(sample,role_list):
+        print('ERROR: the old and the linear extraction return different statements')
+        sys.exit(1)
+
+    print('Old extraction: estimated %.3f s (%d lines timed)' % (legacy_time,len(sample)))
+    print('Speedup: %.0fx' % (legacy_time / max(linear_time,0.000001)))
+
+
+# ############################################
+#
+# ############################################
+
+if __name__ == '__main__':
+    main()
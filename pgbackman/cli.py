@@ -41,6 +41,8 @@ import random
 
 from pgbackman.database import *
 from pgbackman.config import *
+from pgbackman.compression import *
+from pgbackman.manifest import *
 from pgbackman.logs import *
 from pgbackman.prettytable import *
 from pgbackman.ordereddict import OrderedDict
@@ -91,7 +93,11 @@ class PgbackmanCli(cmd.Cmd):
 
         self.logs = PgbackmanLogs('pgbackman_cli', '', '')
 
-        self.db = PgbackmanDB(self.dsn, 'pgbackman_cli')
+        self.db = PgbackmanDB(self.dsn, 'pgbackman_cli',
+                              self.conf.persistent_connections == 'ON',self.conf.pg_health_check_interval,None,
+                              self.conf.lookup_cache_size,self.conf.lookup_cache_ttl,self.conf.query_stats_sample_size,
+                              self.conf.ro_dsn_list,self.conf.ro_max_lag)
+        self.db.stream_itersize = self.conf.stream_itersize
         self.output_format = 'table'
 
         self.backup_server_id = ''
@@ -742,7 +748,7 @@ class PgbackmanCli(cmd.Cmd):
                 result = self.db.show_backup_definitions(server_list,node_list,dbname_list)
 
                 colnames = [desc[0] for desc in result.description]
-                self.generate_output(result,colnames,["Backup server","PgSQL node","DBname","Schedule","Code","Parameters"],'backup_definitions')
+                self.generate_output(result,colnames,["Backup server","PgSQL node","DBname","Schedule","Spread schedule","Code","Parameters"],'backup_definitions')
 
             except Exception as e:
                 self.processing_error('[ERROR]: ' + str(e) + '\n')
@@ -787,7 +793,7 @@ class PgbackmanCli(cmd.Cmd):
                 result = self.db.show_backup_definitions(server_list,node_list,dbname_list)
 
                 colnames = [desc[0] for desc in result.description]
-                self.generate_output(result,colnames,["Backup server","PgSQL node","DBname","Schedule","Code","Parameters"],'backup_definitions')
+                self.generate_output(result,colnames,["Backup server","PgSQL node","DBname","Schedule","Spread schedule","Code","Parameters"],'backup_definitions')
 
             except Exception as e:
                 self.processing_error('[ERROR]: ' + str(e) + '\n')
@@ -876,8 +882,9 @@ class PgbackmanCli(cmd.Cmd):
 
         [encryption]:
         ------------
-        TRUE: GnuPG encryption activated.
-        FALSE: GnuPG encryption NOT activated.
+        TRUE: Dump files encrypted with the encryption_backend (age or gpg)
+              defined in pgbackman.conf in the backup server.
+        FALSE: Encryption NOT activated.
 
         [retention period]:
         -------------------
@@ -1646,6 +1653,10 @@ class PgbackmanCli(cmd.Cmd):
                             [DBname]
                             [DefID]
                             [Status]
+                            [--limit N]
+                            [--after-bckid BckID]
+                            [--since timestamp]
+                            [--until timestamp]
 
         [SrvID | FQDN]:
         ---------------
@@ -1673,10 +1684,27 @@ class PgbackmanCli(cmd.Cmd):
 
         One can use 'all' or '*' with this parameter.
 
+        [--limit N]:
+        ------------
+        Show only the N most recent entries.
+
+        [--after-bckid BckID]:
+        ----------------------
+        Show entries older than BckID. Use the last BckID of a
+        page to get the next one.
+
+        [--since timestamp] / [--until timestamp]:
+        ------------------------------------------
+        Show entries finished at or after / before this time.
+
+        With any of these options the entries are ordered by BckID,
+        newest first.
+
         '''
 
         try:
             arg_list = shlex.split(args)
+            arg_list,options = self.get_pagination_options(arg_list,'--after-bckid')
 
         except ValueError as e:
             print '--------------------------------------------------------'
@@ -1738,7 +1766,8 @@ class PgbackmanCli(cmd.Cmd):
                 status_list = status.strip().replace(' ','').upper().split(',')
 
             try:
-                result = self.db.show_backup_catalog(server_list,node_list,dbname_list,def_id_list,status_list)
+                result = self.db.show_backup_catalog(server_list,node_list,dbname_list,def_id_list,status_list,
+                                                     options['limit'],options['after'],options['since'],options['until'])
 
                 colnames = [desc[0] for desc in result.description]
                 self.generate_output(result,colnames,["Finished","Backup server","PgSQL node","DBname","Size"],'backup_catalog')
@@ -1797,7 +1826,8 @@ class PgbackmanCli(cmd.Cmd):
                 print '--------------------------------------------------------'
 
             try:
-                result = self.db.show_backup_catalog(server_list,node_list,dbname_list,def_id_list,status_list)
+                result = self.db.show_backup_catalog(server_list,node_list,dbname_list,def_id_list,status_list,
+                                                     options['limit'],options['after'],options['since'],options['until'])
 
                 colnames = [desc[0] for desc in result.description]
                 self.generate_output(result,colnames,["Finished","Backup server","PgSQL node","DBname","Size"],'backup_catalog')
@@ -1824,6 +1854,10 @@ class PgbackmanCli(cmd.Cmd):
         show_restore_catalog [SrvID|FQDN]
                              [Target NodeID|FQDN]
                              [Target DBname]
+                             [--limit N]
+                             [--after-restoreid RestoreID]
+                             [--since timestamp]
+                             [--until timestamp]
 
 
         [SrvID|FQDN]:
@@ -1840,10 +1874,27 @@ class PgbackmanCli(cmd.Cmd):
         ----------------
         Database name. One can use 'all' or '*' with this parameter.
 
+        [--limit N]:
+        ------------
+        Show only the N most recent entries.
+
+        [--after-restoreid RestoreID]:
+        ------------------------------
+        Show entries older than RestoreID. Use the last RestoreID
+        of a page to get the next one.
+
+        [--since timestamp] / [--until timestamp]:
+        ------------------------------------------
+        Show entries finished at or after / before this time.
+
+        With any of these options the entries are ordered by
+        RestoreID, newest first.
+
         '''
 
         try:
             arg_list = shlex.split(args)
+            arg_list,options = self.get_pagination_options(arg_list,'--after-restoreid')
 
         except ValueError as e:
             print '--------------------------------------------------------'
@@ -1893,7 +1944,8 @@ class PgbackmanCli(cmd.Cmd):
                 dbname_list = dbname.strip().replace(' ','').split(',')
 
             try:
-                result = self.db.show_restore_catalog(server_list,node_list,dbname_list)
+                result = self.db.show_restore_catalog(server_list,node_list,dbname_list,
+                                                      options['limit'],options['after'],options['since'],options['until'])
 
                 colnames = [desc[0] for desc in result.description]
                 self.generate_output(result,colnames,["Finished","Backup server","Target PgSQL node","Target DBname"],'restore_catalog')
@@ -1938,7 +1990,8 @@ class PgbackmanCli(cmd.Cmd):
                 print '--------------------------------------------------------'
 
             try:
-                result = self.db.show_restore_catalog(server_list,node_list,dbname_list)
+                result = self.db.show_restore_catalog(server_list,node_list,dbname_list,
+                                                      options['limit'],options['after'],options['since'],options['until'])
 
                 colnames = [desc[0] for desc in result.description]
                 self.generate_output(result,colnames,["Finished","Backup server","Target PgSQL node","Target DBname"],'restore_catalog')
@@ -3061,6 +3114,129 @@ class PgbackmanCli(cmd.Cmd):
         print
 
 
+    # ############################################
+    # Method do_verify_backup
+    # ############################################
+
+    def do_verify_backup(self,args):
+        '''
+        DESCRIPTION:
+        This command checks the files of a backup against the
+        manifest created by pgbackman_dump. The size and checksum of
+        every file are read again and compared with the values in the
+        manifest.
+
+        The files are read in parallel by manifest_jobs threads. This
+        command has to be run in the backup server where the backup
+        is saved.
+
+        COMMAND:
+        verify_backup [BckID]
+
+        [BckID]:
+        --------
+        Backup ID in the backup catalog.
+
+        '''
+
+        try:
+            arg_list = shlex.split(args)
+
+        except ValueError as e:
+            print '--------------------------------------------------------'
+            self.processing_error('[ERROR]: ' + str(e) + '\n')
+            return False
+
+        #
+        # Command without parameters
+        #
+
+        if len(arg_list) == 0:
+
+            try:
+                print '--------------------------------------------------------'
+                bck_id = raw_input('# BckID: ')
+                print '--------------------------------------------------------'
+
+            except Exception as e:
+                print '\n--------------------------------------------------------'
+                print '[ABORTED] Command interrupted by the user.\n'
+                return False
+
+        #
+        # Command with parameters
+        #
+
+        elif len(arg_list) == 1:
+
+            bck_id = arg_list[0]
+
+            if self.output_format == 'table':
+
+                print '--------------------------------------------------------'
+                print '# BckID: ' + str(bck_id)
+                print '--------------------------------------------------------'
+
+        else:
+            self.processing_error('\n[ERROR] - Wrong number of parameters used.\n          Type help or ? to list commands\n')
+            return False
+
+        if not bck_id.isdigit():
+            self.processing_error('[ERROR]: The BckID must be a digit.\n')
+            return False
+
+        try:
+            record = self.db.get_backup_manifest(bck_id)
+
+        except Exception as e:
+            self.processing_error('[ERROR]: ' + str(e) + '\n')
+            return False
+
+        if record == None:
+            self.processing_error('[ERROR]: BckID [' + bck_id + '] does not exist\n')
+            return False
+
+        manifest_file,checksum,backup_server_fqdn = record
+
+        if manifest_file == None:
+            self.processing_error('[ERROR]: BckID [' + bck_id + '] has not a manifest file\n')
+            return False
+
+        if not os.path.exists(manifest_file):
+            self.processing_error('[ERROR]: The manifest file ' + manifest_file + ' does not exist.\n' +
+                                  '         Run this command in the backup server ' + str(backup_server_fqdn) + '\n')
+            return False
+
+        try:
+            manifest = PgbackmanManifest(manifest_file,'sha256',self.conf.manifest_jobs)
+            manifest.load(checksum)
+
+            errors = manifest.verify()
+
+        except Exception as e:
+            self.processing_error('[ERROR]: Could not verify BckID [' + bck_id + '] - ' + str(e) + '\n')
+            return False
+
+        result = OrderedDict()
+
+        result['BckID'] = bck_id
+        result['Manifest file'] = manifest_file
+        result['Algorithm'] = manifest.algorithm
+        result['Files'] = len(manifest.files)
+        result['Total bytes'] = manifest.get_total_size()
+        result['Files with errors'] = len(errors)
+        result['Status'] = 'ERROR' if errors else 'OK'
+
+        self.generate_unique_output(result,'verify_backup')
+
+        if errors:
+            self.generate_output(errors,['File','Error'],['File','Error'],'verify_backup_errors')
+            self.processing_error('[ERROR]: BckID [' + bck_id + '] has ' + str(len(errors)) + ' files with errors\n')
+            return False
+
+        print
+
+
     # ############################################
     # Method do_show_restore_details
     # ############################################
@@ -3260,11 +3436,18 @@ class PgbackmanCli(cmd.Cmd):
         installation
 
         COOMAND:
-        show_pgbackman_stats
+        show_pgbackman_stats [--snapshot]
+
+        [--snapshot]:
+        -------------
+        Show the stats saved by pgbackman_maintenance in the
+        stats snapshot instead of calculating them.
 
         '''
         try:
             arg_list = shlex.split(args)
+            snapshot = '--snapshot' in arg_list
+            arg_list = [arg for arg in arg_list if arg != '--snapshot']
 
         except ValueError as e:
             print '--------------------------------------------------------'
@@ -3273,7 +3456,7 @@ class PgbackmanCli(cmd.Cmd):
 
         if len(arg_list) == 0:
             try:
-                result = self.db.show_pgbackman_stats()
+                result = self.db.show_pgbackman_stats(snapshot)
 
                 self.generate_unique_output(result,'pgbackman_stats')
 
@@ -3296,15 +3479,23 @@ class PgbackmanCli(cmd.Cmd):
 
         COMMAND:
         show_backup_server_stats [SrvID | FQDN]
+                                 [--snapshot]
 
         [SrvID | FQDN]:
         ---------------
         SrvID in PgBackMan or FQDN of the backup server
 
+        [--snapshot]:
+        -------------
+        Show the stats saved by pgbackman_maintenance in the
+        stats snapshot instead of calculating them.
+
         '''
 
         try:
             arg_list = shlex.split(args)
+            snapshot = '--snapshot' in arg_list
+            arg_list = [arg for arg in arg_list if arg != '--snapshot']
 
         except ValueError as e:
             print '--------------------------------------------------------'
@@ -3343,7 +3534,7 @@ class PgbackmanCli(cmd.Cmd):
                 else:
                     backup_server_id = self.db.get_backup_server_id(server_id)
 
-                result = self.db.show_backup_server_stats(backup_server_id)
+                result = self.db.show_backup_server_stats(backup_server_id,snapshot)
 
                 if len(result) > 0:
                     self.generate_unique_output(result,'backup_server_stats')
@@ -3376,7 +3567,7 @@ class PgbackmanCli(cmd.Cmd):
                 else:
                     backup_server_id = self.db.get_backup_server_id(server_id)
 
-                result = self.db.show_backup_server_stats(backup_server_id)
+                result = self.db.show_backup_server_stats(backup_server_id,snapshot)
 
                 if len(result) > 0:
                     self.generate_unique_output(result,'backup_server_stats')
@@ -3403,15 +3594,23 @@ class PgbackmanCli(cmd.Cmd):
 
         COMMAND:
         show_pgsql_node_stats [NodeID | FQDN]
+                              [--snapshot]
 
         [NodeID|FQDN]:
         --------------
         NodeID in PgBackMan or FQDN of the PgSQL node
 
+        [--snapshot]:
+        -------------
+        Show the stats saved by pgbackman_maintenance in the
+        stats snapshot instead of calculating them.
+
         '''
 
         try:
             arg_list = shlex.split(args)
+            snapshot = '--snapshot' in arg_list
+            arg_list = [arg for arg in arg_list if arg != '--snapshot']
 
         except ValueError as e:
             print '--------------------------------------------------------'
@@ -3441,7 +3640,7 @@ class PgbackmanCli(cmd.Cmd):
                 else:
                     pgsql_node_id = self.db.get_pgsql_node_id(node_id)
 
-                result = self.db.show_pgsql_node_stats(pgsql_node_id)
+                result = self.db.show_pgsql_node_stats(pgsql_node_id,snapshot)
 
                 if len(result) > 0:
                     self.generate_unique_output(result,'pgsql_node_stats')
@@ -3471,7 +3670,7 @@ class PgbackmanCli(cmd.Cmd):
                 else:
                     pgsql_node_id = self.db.get_pgsql_node_id(node_id)
 
-                result = self.db.show_backup_server_stats(pgsql_node_id)
+                result = self.db.show_pgsql_node_stats(pgsql_node_id,snapshot)
 
                 if len(result) > 0:
                     self.generate_unique_output(result,'pgsql_node_stats')
@@ -3487,6 +3686,68 @@ class PgbackmanCli(cmd.Cmd):
         print
 
 
+    # ############################################
+    # Method do_show_query_stats
+    # ############################################
+
+    def do_show_query_stats(self,args):
+        '''
+        DESCRIPTION:
+        This command shows statistics about the queries run
+        against the pgbackman database by this PgBackMan shell
+        session. Times are in milliseconds.
+
+        COMMAND:
+        show_query_stats [reset]
+
+        [reset]:
+        --------
+        Reset the statistics.
+
+        '''
+
+        try:
+            arg_list = shlex.split(args)
+
+        except ValueError as e:
+            print '--------------------------------------------------------'
+            self.processing_error('[ERROR]: ' + str(e) + '\n')
+            return False
+
+        if self.db.query_stats is None:
+            self.processing_error('[ERROR]: Query stats are not active. Check query_stats_sample_size in the configuration file.\n')
+            return False
+
+        if len(arg_list) == 0:
+            try:
+                stats = self.db.query_stats.get_stats()
+                summary = self.db.query_stats.get_summary()
+
+                colnames = ['Method','Calls','Errors','Rows','Total ms','Avg ms','p50 ms','p95 ms','p99 ms','Max ms']
+                result = [method_stats.values() for method_stats in stats]
+
+                if self.output_format == 'table':
+                    print '--------------------------------------------------------'
+                    print '# Queries: ' + str(summary['calls']) + ' / Errors: ' + str(summary['errors']) + ' / Rows: ' + str(summary['rows'])
+                    print '# Connections: ' + str(summary['connections']) + ' / Reconnects: ' + str(summary['reconnects']) + ' / Period: ' + str(summary['seconds']) + ' sec.'
+                    print '--------------------------------------------------------'
+
+                self.generate_output(result,colnames,['Method'],'query_stats')
+
+            except Exception as e:
+                self.processing_error('[ERROR]: ' + str(e) + '\n')
+
+        elif len(arg_list) == 1 and arg_list[0].lower() == 'reset':
+            self.db.query_stats.reset()
+
+            print '[DONE] Query stats reset.\n'
+
+        else:
+            self.processing_error('\n[ERROR] - Wrong number of parameters used.\n          Type help or ? to list commands\n')
+
+        print
+
+
     # ############################################
     # Method do_show_job_queue
     # ############################################
@@ -3851,6 +4112,58 @@ class PgbackmanCli(cmd.Cmd):
         print
 
 
+    # ############################################
+    # Method do_show_backups_in_progress
+    # ############################################
+
+    def do_show_backups_in_progress(self,args):
+        '''
+        DESCRIPTION:
+
+        This command shows all backup jobs in progress with the
+        tables dumped, the size written until now and an estimate of
+        the progress and the end time. The estimate uses the size of
+        the last backup of the same backup definition, or the number
+        of tables in the database if there is not one.
+
+        COMMAND:
+        show_backups_in_progress
+
+        '''
+
+        try:
+            arg_list = shlex.split(args)
+
+        except ValueError as e:
+            print '--------------------------------------------------------'
+            self.processing_error('[ERROR]: ' + str(e) + '\n')
+            return False
+
+        #
+        # Command without parameters
+        #
+
+        if len(arg_list) == 0:
+
+            try:
+                result = self.db.show_backups_in_progress()
+
+                colnames = [desc[0] for desc in result.description]
+                self.generate_output(result,colnames,["Backup server","PgSQL node","DBname","Code"],'backups_in_progress')
+
+            except Exception as e:
+                self.processing_error('[ERROR]: ' + str(e) + '\n')
+
+        #
+        # Command with the wrong number of parameters
+        #
+
+        else:
+            self.processing_error('\n[ERROR] - Wrong number of parameters used.\n          Type help or ? to list commands\n')
+
+        print
+
+
     # ############################################
     # Method do_show_snapshot_in_progress
     # ############################################
@@ -4310,6 +4623,36 @@ class PgbackmanCli(cmd.Cmd):
                                  [pgnode backup dir]
                                  [pgnode crontab file]
                                  [pgnode status]
+                                 [parallel jobs]
+                                 [backup spread]
+                                 [backup spread max concurrency]
+                                 [bandwidth limit]
+                                 [backup batch]
+                                 [backup batch jobs]
+
+        [parallel jobs] is optional. It is the number of pg_dump jobs
+        used by FULL and DATA backups without their own value.
+
+        [backup spread] and [backup spread max concurrency] are
+        optional. With backup spread ON, the start times of the
+        backup definitions of the node are spread in the hours cron
+        interval, the longest backups first, so that no more than
+        [backup spread max concurrency] backups run at the same
+        time. Durations are taken from the backup catalog. The
+        schedule used is shown in show_backup_definitions.
+
+        [bandwidth limit] is optional. It is the MB/s that all the
+        backups of the node running in a backup server can read
+        together. The limit is shared equally by the running
+        backups. 0 means no limit.
+
+        [backup batch] and [backup batch jobs] are optional. With
+        backup batch ON, the FULL, SCHEMA and DATA backups of the
+        node with the same schedule run in one pgbackman_dump
+        process. The roles and database configuration are dumped
+        once for all of them, [backup batch jobs] databases are
+        dumped at the same time and the backup catalog is updated
+        in one transaction.
 
         '''
 
@@ -4374,6 +4717,12 @@ class PgbackmanCli(cmd.Cmd):
                 pgnode_backup_partition_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'pgnode_backup_partition')
                 pgnode_crontab_file_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'pgnode_crontab_file')
                 pgsql_node_status_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'pgsql_node_status')
+                parallel_jobs_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'parallel_jobs')
+                backup_spread_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_spread')
+                backup_spread_max_concurrency_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_spread_max_concurrency')
+                bandwidth_limit_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'bandwidth_limit')
+                backup_batch_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_batch')
+                backup_batch_jobs_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_batch_jobs')
 
             except Exception as e:
                 print '--------------------------------------------------------'
@@ -4403,6 +4752,12 @@ class PgbackmanCli(cmd.Cmd):
                 pgnode_backup_partition = raw_input('# Backup directory [' + pgnode_backup_partition_default + ']: ').strip()
                 pgnode_crontab_file = raw_input('# Crontab file [' + pgnode_crontab_file_default + ']: ').strip()
                 pgsql_node_status = raw_input('# PgSQL node status [' + pgsql_node_status_default + ']: ').strip()
+                parallel_jobs = raw_input('# Parallel jobs [' + parallel_jobs_default + ']: ').strip()
+                backup_spread = raw_input('# Backup spread [' + backup_spread_default + ']: ').strip()
+                backup_spread_max_concurrency = raw_input('# Backup spread max concurrency [' + backup_spread_max_concurrency_default + ']: ').strip()
+                bandwidth_limit = raw_input('# Bandwidth limit MB/s [' + bandwidth_limit_default + ']: ').strip()
+                backup_batch = raw_input('# Backup batch [' + backup_batch_default + ']: ').strip()
+                backup_batch_jobs = raw_input('# Backup batch jobs [' + backup_batch_jobs_default + ']: ').strip()
                 print
 
                 while ack != 'yes' and ack != 'no':
@@ -4492,13 +4847,70 @@ class PgbackmanCli(cmd.Cmd):
             else:
                 pgsql_node_status = pgsql_node_status_default
 
+            if parallel_jobs != '':
+                if not parallel_jobs.isdigit() or int(parallel_jobs) < 1:
+                    print '[WARNING]: Wrong parallel jobs value, using default.'
+                    parallel_jobs = parallel_jobs_default
+            else:
+                parallel_jobs = parallel_jobs_default
+
+            #
+            # The backup spread parameters are only sent if they change,
+            # the crontab files of the node are generated again then.
+            #
+
+            if backup_spread != '':
+                if backup_spread.upper() not in ['ON','OFF']:
+                    print '[WARNING]: Wrong backup spread value, using default.'
+                    backup_spread = None
+                elif backup_spread.upper() == backup_spread_default.upper():
+                    backup_spread = None
+            else:
+                backup_spread = None
+
+            if backup_spread_max_concurrency != '':
+                if not backup_spread_max_concurrency.isdigit() or int(backup_spread_max_concurrency) < 1:
+                    print '[WARNING]: Wrong backup spread max concurrency value, using default.'
+                    backup_spread_max_concurrency = None
+                elif backup_spread_max_concurrency == backup_spread_max_concurrency_default:
+                    backup_spread_max_concurrency = None
+            else:
+                backup_spread_max_concurrency = None
+
+            if bandwidth_limit != '':
+                if not bandwidth_limit.isdigit():
+                    print '[WARNING]: Wrong bandwidth limit value, using default.'
+                    bandwidth_limit = bandwidth_limit_default
+            else:
+                bandwidth_limit = bandwidth_limit_default
+
+            if backup_batch != '':
+                if backup_batch.upper() not in ['ON','OFF']:
+                    print '[WARNING]: Wrong backup batch value, using default.'
+                    backup_batch = None
+                elif backup_batch.upper() == backup_batch_default.upper():
+                    backup_batch = None
+            else:
+                backup_batch = None
+
+            if backup_batch_jobs != '':
+                if not backup_batch_jobs.isdigit() or int(backup_batch_jobs) < 1:
+                    print '[WARNING]: Wrong backup batch jobs value, using default.'
+                    backup_batch_jobs = None
+                elif backup_batch_jobs == backup_batch_jobs_default:
+                    backup_batch_jobs = None
+            else:
+                backup_batch_jobs = None
+
             if ack.lower() == 'yes':
                 try:
                     self.db.update_pgsql_node_config(pgsql_node_id,backup_minutes_interval.strip(),backup_hours_interval.strip(),backup_weekday_cron.strip(),
                                                      backup_month_cron.strip(),backup_day_month_cron.strip(),backup_code.strip().upper(),retention_period.strip(),
                                                      retention_redundancy.strip(),automatic_deletion_retention.strip(),extra_backup_parameters.strip(),
                                                      extra_restore_parameters.strip(),backup_job_status.strip().upper(),domain.strip(),logs_email.strip(),
-                                                     admin_user.strip(),pgport,pgnode_backup_partition.strip(),pgnode_crontab_file.strip(),pgsql_node_status.strip().upper())
+                                                     admin_user.strip(),pgport,pgnode_backup_partition.strip(),pgnode_crontab_file.strip(),pgsql_node_status.strip().upper(),
+                                                     parallel_jobs,backup_spread,backup_spread_max_concurrency,bandwidth_limit,
+                                                     backup_batch,backup_batch_jobs)
 
                     print '[DONE] Configuration parameters for NodeID: ' + str(pgsql_node_id) + ' updated.\n'
 
@@ -4512,7 +4924,7 @@ class PgbackmanCli(cmd.Cmd):
         # Command with parameters
         #
 
-        elif len(arg_list) == 20:
+        elif len(arg_list) in [20,21,23,24,26]:
 
             pgsql_node = arg_list[0]
 
@@ -4550,6 +4962,12 @@ class PgbackmanCli(cmd.Cmd):
                 pgnode_backup_partition_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'pgnode_backup_partition')
                 pgnode_crontab_file_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'pgnode_crontab_file')
                 pgsql_node_status_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'pgsql_node_status')
+                parallel_jobs_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'parallel_jobs')
+                backup_spread_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_spread')
+                backup_spread_max_concurrency_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_spread_max_concurrency')
+                bandwidth_limit_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'bandwidth_limit')
+                backup_batch_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_batch')
+                backup_batch_jobs_default = self.db.get_pgsql_node_config_value(pgsql_node_id,'backup_batch_jobs')
 
             except Exception as e:
                 self.processing_error('[ERROR]: Problems getting default values for parameters\n' + str(e) + '\n')
@@ -4575,6 +4993,30 @@ class PgbackmanCli(cmd.Cmd):
             pgnode_crontab_file = arg_list[18]
             pgsql_node_status = arg_list[19]
 
+            if len(arg_list) >= 21:
+                parallel_jobs = arg_list[20]
+            else:
+                parallel_jobs = ''
+
+            if len(arg_list) >= 23:
+                backup_spread = arg_list[21]
+                backup_spread_max_concurrency = arg_list[22]
+            else:
+                backup_spread = ''
+                backup_spread_max_concurrency = ''
+
+            if len(arg_list) >= 24:
+                bandwidth_limit = arg_list[23]
+            else:
+                bandwidth_limit = ''
+
+            if len(arg_list) == 26:
+                backup_batch = arg_list[24]
+                backup_batch_jobs = arg_list[25]
+            else:
+                backup_batch = ''
+                backup_batch_jobs = ''
+
             if backup_minutes_interval != '':
                 if not self.check_minutes_interval(backup_minutes_interval):
                     print '[WARNING]: Wrong minutes interval format, using default.'
@@ -4652,12 +5094,69 @@ class PgbackmanCli(cmd.Cmd):
             else:
                 pgsql_node_status = pgsql_node_status_default
 
+            if parallel_jobs != '':
+                if not parallel_jobs.isdigit() or int(parallel_jobs) < 1:
+                    print '[WARNING]: Wrong parallel jobs value, using default.'
+                    parallel_jobs = parallel_jobs_default
+            else:
+                parallel_jobs = parallel_jobs_default
+
+            #
+            # The backup spread parameters are only sent if they change,
+            # the crontab files of the node are generated again then.
+            #
+
+            if backup_spread != '':
+                if backup_spread.upper() not in ['ON','OFF']:
+                    print '[WARNING]: Wrong backup spread value, using default.'
+                    backup_spread = None
+                elif backup_spread.upper() == backup_spread_default.upper():
+                    backup_spread = None
+            else:
+                backup_spread = None
+
+            if backup_spread_max_concurrency != '':
+                if not backup_spread_max_concurrency.isdigit() or int(backup_spread_max_concurrency) < 1:
+                    print '[WARNING]: Wrong backup spread max concurrency value, using default.'
+                    backup_spread_max_concurrency = None
+                elif backup_spread_max_concurrency == backup_spread_max_concurrency_default:
+                    backup_spread_max_concurrency = None
+            else:
+                backup_spread_max_concurrency = None
+
+            if bandwidth_limit != '':
+                if not bandwidth_limit.isdigit():
+                    print '[WARNING]: Wrong bandwidth limit value, using default.'
+                    bandwidth_limit = bandwidth_limit_default
+            else:
+                bandwidth_limit = bandwidth_limit_default
+
+            if backup_batch != '':
+                if backup_batch.upper() not in ['ON','OFF']:
+                    print '[WARNING]: Wrong backup batch value, using default.'
+                    backup_batch = None
+                elif backup_batch.upper() == backup_batch_default.upper():
+                    backup_batch = None
+            else:
+                backup_batch = None
+
+            if backup_batch_jobs != '':
+                if not backup_batch_jobs.isdigit() or int(backup_batch_jobs) < 1:
+                    print '[WARNING]: Wrong backup batch jobs value, using default.'
+                    backup_batch_jobs = None
+                elif backup_batch_jobs == backup_batch_jobs_default:
+                    backup_batch_jobs = None
+            else:
+                backup_batch_jobs = None
+
             try:
                 self.db.update_pgsql_node_config(pgsql_node_id,backup_minutes_interval.strip(),backup_hours_interval.strip(),backup_weekday_cron.strip(),
                                                  backup_month_cron.strip(),backup_day_month_cron.strip(),backup_code.strip().upper(),retention_period.strip(),
                                                  retention_redundancy.strip(),automatic_deletion_retention.strip(),extra_backup_parameters.strip(),
                                                  extra_restore_parameters.strip(),backup_job_status.strip().upper(),domain.strip(),logs_email.strip(),
-                                                 admin_user.strip(),pgport,pgnode_backup_partition.strip(),pgnode_crontab_file.strip(),pgsql_node_status.strip().upper())
+                                                 admin_user.strip(),pgport,pgnode_backup_partition.strip(),pgnode_crontab_file.strip(),pgsql_node_status.strip().upper(),
+                                                 parallel_jobs,backup_spread,backup_spread_max_concurrency,bandwidth_limit,
+                                                 backup_batch,backup_batch_jobs)
 
                 print '[DONE] Configuration parameters for NodeID: ' + str(pgsql_node_id) + ' updated.\n'
 
@@ -5619,6 +6118,9 @@ class PgbackmanCli(cmd.Cmd):
                                  [extra backup parameters]
                                  [job status]
                                  [remarks]
+                                 [parallel jobs]
+                                 [dump compression]
+                                 [bandwidth limit]
 
         [DefID]:
         --------
@@ -5648,6 +6150,28 @@ class PgbackmanCli(cmd.Cmd):
         ACTIVE: Backup job activated and in production.
         STOPPED: Backup job stopped.
 
+        [parallel jobs]:
+        ----------------
+        Optional. Number of pg_dump jobs used by FULL and DATA
+        backups. 0 uses the parallel jobs value of the PgSQL node.
+
+        [dump compression]:
+        -------------------
+        Optional. pg_dump compression used by FULL, DATA and SCHEMA
+        backups: a level 0-9 or method[:level] with method gzip, lz4,
+        zstd or none, e.g. lz4, zstd:19. lz4 and zstd need pg_dump
+        >= 16. 'default' uses the pg_dump default.
+
+        CLUSTER backups: compression codec[:level[:threads]] with
+        codec gzip, pigz, zstd, lz4 or none, e.g. pigz::8, zstd:3:8.
+        'default' uses cluster_compression in pgbackman.conf.
+
+        [bandwidth limit]:
+        ------------------
+        Optional. MB/s read by pg_dump / pg_dumpall from the PgSQL
+        node. The backup is paused when it goes over this value. 0
+        uses only the bandwidth limit of the PgSQL node.
+
         '''
 
         try:
@@ -5690,6 +6214,10 @@ class PgbackmanCli(cmd.Cmd):
                     extra_backup_parameters_default = self.db.get_backup_definition_def_value(def_id,'extra_backup_parameters')
                     job_status_default = self.db.get_backup_definition_def_value(def_id,'job_status')
                     remarks_default = self.db.get_backup_definition_def_value(def_id,'remarks')
+                    parallel_jobs_default = self.db.get_backup_definition_def_value(def_id,'parallel_jobs')
+                    dump_compression_default = self.db.get_backup_definition_def_value(def_id,'dump_compression')
+                    backup_code = self.db.get_backup_definition_def_value(def_id,'backup_code')
+                    bandwidth_limit_default = self.db.get_backup_definition_def_value(def_id,'bandwidth_limit')
 
                 except Exception as e:
                     print '--------------------------------------------------------'
@@ -5710,6 +6238,9 @@ class PgbackmanCli(cmd.Cmd):
                 extra_backup_parameters = raw_input('# Extra backup parameters [' + str(extra_backup_parameters_default) + ']: ')
                 job_status = raw_input('# Job status [' + str(job_status_default) + ']: ')
                 remarks = raw_input('# Remarks [' + str(remarks_default) + ']: ')
+                parallel_jobs = raw_input('# Parallel jobs [' + str(parallel_jobs_default) + ']: ')
+                dump_compression = raw_input('# Dump compression [' + str(dump_compression_default) + ']: ')
+                bandwidth_limit = raw_input('# Bandwidth limit MB/s [' + str(bandwidth_limit_default) + ']: ')
                 print
 
                 while ack != 'yes' and ack != 'no':
@@ -5752,10 +6283,35 @@ class PgbackmanCli(cmd.Cmd):
             if remarks == '':
                 remarks = remarks_default
 
+            if parallel_jobs != '':
+                if not parallel_jobs.isdigit():
+                    print '[WARNING]: Wrong parallel jobs value, using default.'
+                    parallel_jobs = parallel_jobs_default
+            else:
+                parallel_jobs = parallel_jobs_default
+
+            if dump_compression.strip().lower() == 'default':
+                dump_compression = ''
+
+            elif dump_compression != '':
+                if not check_dump_compression(dump_compression,backup_code):
+                    print '[WARNING]: Wrong dump compression value, using default.'
+                    dump_compression = dump_compression_default
+            else:
+                dump_compression = dump_compression_default
+
+            if bandwidth_limit != '':
+                if not bandwidth_limit.isdigit():
+                    print '[WARNING]: Wrong bandwidth limit value, using default.'
+                    bandwidth_limit = bandwidth_limit_default
+            else:
+                bandwidth_limit = bandwidth_limit_default
+
             if ack.lower() == 'yes':
                 try:
                     self.db.update_backup_definition(def_id,minutes_cron,hours_cron,day_month_cron,month_cron,weekday_cron,retention_period,
-                                                     retention_redundancy,extra_backup_parameters,job_status.upper(),remarks)
+                                                     retention_redundancy,extra_backup_parameters,job_status.upper(),remarks,parallel_jobs,
+                                                     dump_compression.strip().lower(),bandwidth_limit)
 
                     print '[DONE] Backup definition DefID: ' + str(def_id) + ' updated.\n'
 
@@ -5769,7 +6325,7 @@ class PgbackmanCli(cmd.Cmd):
         # Command with parameters
         #
 
-        elif len(arg_list) == 11:
+        elif len(arg_list) in [11,12,13,14]:
 
             def_id = arg_list[0]
 
@@ -5787,6 +6343,10 @@ class PgbackmanCli(cmd.Cmd):
                     extra_backup_parameters_default = self.db.get_backup_definition_def_value(def_id,'extra_backup_parameters')
                     job_status_default = self.db.get_backup_definition_def_value(def_id,'job_status')
                     remarks_default = self.db.get_backup_definition_def_value(def_id,'remarks')
+                    parallel_jobs_default = self.db.get_backup_definition_def_value(def_id,'parallel_jobs')
+                    dump_compression_default = self.db.get_backup_definition_def_value(def_id,'dump_compression')
+                    backup_code = self.db.get_backup_definition_def_value(def_id,'backup_code')
+                    bandwidth_limit_default = self.db.get_backup_definition_def_value(def_id,'bandwidth_limit')
 
                 except Exception as e:
                     self.processing_error('[ERROR]: Problems getting default values for parameters\n' + str(e) + '\n')
@@ -5807,6 +6367,21 @@ class PgbackmanCli(cmd.Cmd):
             job_status = arg_list[9]
             remarks = arg_list[10]
 
+            if len(arg_list) >= 12:
+                parallel_jobs = arg_list[11]
+            else:
+                parallel_jobs = ''
+
+            if len(arg_list) >= 13:
+                dump_compression = arg_list[12]
+            else:
+                dump_compression = ''
+
+            if len(arg_list) == 14:
+                bandwidth_limit = arg_list[13]
+            else:
+                bandwidth_limit = ''
+
             if minutes_cron == '':
                 minutes_cron = minutes_cron_default
 
@@ -5837,9 +6412,34 @@ class PgbackmanCli(cmd.Cmd):
             if remarks == '':
                 remarks = remarks_default
 
+            if parallel_jobs != '':
+                if not parallel_jobs.isdigit():
+                    print '[WARNING]: Wrong parallel jobs value, using default.'
+                    parallel_jobs = parallel_jobs_default
+            else:
+                parallel_jobs = parallel_jobs_default
+
+            if dump_compression.strip().lower() == 'default':
+                dump_compression = ''
+
+            elif dump_compression != '':
+                if not check_dump_compression(dump_compression,backup_code):
+                    print '[WARNING]: Wrong dump compression value, using default.'
+                    dump_compression = dump_compression_default
+            else:
+                dump_compression = dump_compression_default
+
+            if bandwidth_limit != '':
+                if not bandwidth_limit.isdigit():
+                    print '[WARNING]: Wrong bandwidth limit value, using default.'
+                    bandwidth_limit = bandwidth_limit_default
+            else:
+                bandwidth_limit = bandwidth_limit_default
+
             try:
                 self.db.update_backup_definition(def_id,minutes_cron,hours_cron,weekday_cron,month_cron,day_month_cron,retention_period,
-                                                 retention_redundancy,extra_backup_parameters,job_status.upper(),remarks)
+                                                 retention_redundancy,extra_backup_parameters,job_status.upper(),remarks,parallel_jobs,
+                                                 dump_compression.strip().lower(),bandwidth_limit)
 
                 print '[DONE] Backup definition DefID: ' + str(def_id) + ' updated.\n'
 
@@ -6375,13 +6975,18 @@ class PgbackmanCli(cmd.Cmd):
     def generate_output(self,cur,colnames,left_columns,result_type):
         '''A function to print the output from show_* commands'''
 
-        if self.output_format == 'table':
+        #
+        # Results from a server-side cursor are printed while they
+        # are fetched. A table is printed in blocks of
+        # stream_itersize rows so we do not keep all rows in memory.
+        #
 
-            x = PrettyTable(colnames)
-            x.padding_width = 1
+        streaming = isinstance(cur,PgbackmanStreamCursor)
+
+        if self.output_format == 'table':
 
-            for column in left_columns:
-                x.align[column] = "l"
+            x = self.new_output_table(colnames,left_columns)
+            block_rows = 0
 
             for records in cur:
                 columns = []
@@ -6390,10 +6995,24 @@ class PgbackmanCli(cmd.Cmd):
                     columns.append(records[index])
 
                 x.add_row(columns)
+                block_rows += 1
+
+                if streaming and block_rows == self.db.stream_itersize:
+                    print x.get_string()
+                    sys.stdout.flush()
+
+                    x = self.new_output_table(colnames,left_columns)
+                    block_rows = 0
+
+            if block_rows > 0 or not streaming:
+                print x.get_string()
 
-            print x.get_string()
             print
 
+        elif self.output_format == 'json' and streaming:
+
+            self.generate_json_stream_output(cur,colnames,result_type)
+
         elif self.output_format == 'csv':
 
             print ','.join(colnames).lower().replace(' ','_').replace(',id.,',',backup_server_id,').replace(',id,',',pgsql_node_id,')
@@ -6439,6 +7058,60 @@ class PgbackmanCli(cmd.Cmd):
             print json.dumps(output,sort_keys=False,indent=2)
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def new_output_table(self,colnames,left_columns):
+        '''A function to create the PrettyTable used by generate_output'''
+
+        x = PrettyTable(colnames)
+        x.padding_width = 1
+
+        for column in left_columns:
+            x.align[column] = "l"
+
+        return x
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def generate_json_stream_output(self,cur,colnames,result_type):
+        '''A function to print json output from a server-side cursor one entry at a time'''
+
+        first = True
+
+        for records in cur:
+            attributes = OrderedDict()
+
+            for index in range(len(colnames)):
+
+                if colnames[index].lower() == 'id.':
+                    attr = 'backup_server_id'
+                elif colnames[index].lower() == 'id':
+                    attr = 'pgsql_node_id'
+                else:
+                    attr = colnames[index].lower().replace(' ','_')
+
+                attributes[attr]=str(records[index])
+
+            if first:
+                sys.stdout.write('{\n  ' + json.dumps(result_type) + ': [\n')
+                first = False
+            else:
+                sys.stdout.write(', \n')
+
+            entry = json.dumps(attributes,sort_keys=False,indent=2)
+            sys.stdout.write('\n'.join(['    ' + line for line in entry.splitlines()]))
+
+        if first:
+            print json.dumps({result_type:[]},sort_keys=False,indent=2)
+        else:
+            sys.stdout.write('\n  ]\n}\n')
+
+
     # ############################################
     # Method
     # ############################################
@@ -6571,6 +7244,61 @@ class PgbackmanCli(cmd.Cmd):
 
 
 
+    # ############################################
+    # Method get_pagination_options
+    # ############################################
+
+    def get_pagination_options(self,arg_list,after_option):
+        '''
+        Remove --limit, --since, --until and after_option (e.g.
+        --after-bckid) from arg_list. Options can be used as
+        '--limit 10' or '--limit=10'.
+
+        Returns a tuple (arg_list,options) where options is a
+        dictionary with the keys limit, after, since and until.
+        '''
+
+        option_names = {'--limit':'limit',
+                        after_option:'after',
+                        '--since':'since',
+                        '--until':'until'}
+
+        options = {'limit':None,'after':None,'since':None,'until':None}
+        remaining_list = []
+
+        index = 0
+
+        while index < len(arg_list):
+            name = arg_list[index].split('=',1)[0]
+
+            if name in option_names:
+
+                if '=' in arg_list[index]:
+                    value = arg_list[index].split('=',1)[1]
+                else:
+                    index += 1
+
+                    if index == len(arg_list):
+                        raise ValueError('Option ' + name + ' needs a value')
+
+                    value = arg_list[index]
+
+                if option_names[name] in ['limit','after']:
+                    if not value.isdigit():
+                        raise ValueError('Option ' + name + ' must be a positive integer')
+
+                    value = int(value)
+
+                options[option_names[name]] = value
+
+            else:
+                remaining_list.append(arg_list[index])
+
+            index += 1
+
+        return remaining_list,options
+
+
     # ############################################
     # Method check_port
     # ############################################
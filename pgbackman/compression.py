@@ -0,0 +1,221 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from distutils.spawn import find_executable
+
+
+# ###########################
+# Class: PgbackmanCompression
+# ###########################
+
+
+class PgbackmanCompression():
+    """
+    Compression codec used for CLUSTER dumps.
+
+    The codec is defined with a string 'codec[:level[:threads]]',
+    e.g. 'gzip', 'pigz::8', 'zstd:3:8', 'lz4' or 'none'. An empty
+    level or threads value uses the default of the program. The codec
+    name is saved in the backup catalog and is used to get the
+    command that decompresses the dump.
+    """
+
+    # codec: [program, file extension, level option, threads option, decompress options]
+
+    codecs = {'gzip': ['gzip', '.gz', '-', None, '-dc'],
+              'pigz': ['pigz', '.gz', '-', '-p ', '-dc'],
+              'zstd': ['zstd', '.zst', '-', '-T', '-dcq'],
+              'lz4': ['lz4', '.lz4', '-', None, '-dc'],
+              'none': [None, '', None, None, None]}
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,compression='gzip'):
+        """ The Constructor."""
+
+        values = compression.strip().lower().split(':')
+
+        self.codec = values[0]
+        self.level = ''
+        self.threads = ''
+
+        if self.codec not in self.codecs:
+            raise ValueError('Unknown compression codec [%s]. Valid values: %s' % (self.codec,', '.join(sorted(self.codecs.keys()))))
+
+        if len(values) > 1:
+            self.level = values[1]
+
+        if len(values) > 2:
+            self.threads = values[2]
+
+        for value in [self.level,self.threads]:
+            if value != '' and not value.isdigit():
+                raise ValueError('Wrong compression definition [%s]. Use codec[:level[:threads]]' % compression)
+
+        self.program = None
+
+        if self.codecs[self.codec][0] is not None:
+            self.program = find_executable(self.codecs[self.codec][0],os.getenv('PATH','') + os.pathsep + '/bin:/usr/bin')
+
+
+    # ############################################
+    # Method is_available()
+    # ############################################
+
+    def is_available(self):
+        """A function to check if the program used by the codec is installed"""
+
+        return self.codec == 'none' or self.program is not None
+
+
+    # ############################################
+    # Method get_file_extension()
+    # ############################################
+
+    def get_file_extension(self):
+        """A function to get the file extension of a dump compressed with this codec"""
+
+        return self.codecs[self.codec][1]
+
+
+    # ############################################
+    # Method get_compress_command()
+    # ############################################
+
+    def get_compress_command(self):
+        """A function to get the command that compresses stdin to stdout. Returns '' for the codec none"""
+
+        if self.codec == 'none':
+            return ''
+
+        program,extension,level_option,threads_option,decompress_options = self.codecs[self.codec]
+
+        command = self.program
+
+        if self.level != '' and level_option is not None:
+            command = command + ' ' + level_option + self.level
+
+        if self.threads != '' and threads_option is not None:
+            command = command + ' ' + threads_option + self.threads
+
+        return command + ' -c'
+
+
+    # ############################################
+    # Method get_decompress_command()
+    # ############################################
+
+    def get_decompress_command(self,dump_file):
+        """A function to get the command that writes a decompressed dump file to stdout"""
+
+        if self.codec == 'none':
+            return 'cat ' + dump_file
+
+        program = self.program
+
+        if program is None:
+            program = self.codecs[self.codec][0]
+
+        return program + ' ' + self.codecs[self.codec][4] + ' ' + dump_file
+
+
+# ############################################
+# Function check_dump_compression()
+# ############################################
+
+def check_dump_compression(dump_compression,backup_code='FULL'):
+    """
+    A function to check the compression of a FULL, DATA or SCHEMA
+    dump. Valid values are a level 0-9 or method[:level] with method
+    gzip, lz4, zstd or none, e.g. 6, lz4, zstd:19
+
+    The compression of a CLUSTER dump is a PgbackmanCompression
+    codec[:level[:threads]], e.g. pigz::8 or zstd:3:8
+    """
+
+    if backup_code == 'CLUSTER':
+        try:
+            PgbackmanCompression(dump_compression)
+            return True
+
+        except ValueError:
+            return False
+
+    values = dump_compression.strip().lower().split(':')
+
+    if len(values) == 1 and values[0].isdigit():
+        return int(values[0]) <= 9
+
+    if len(values) > 2 or values[0] not in ['gzip','lz4','zstd','none']:
+        return False
+
+    if len(values) == 2:
+        if values[0] == 'none' or not values[1].isdigit():
+            return False
+
+    return True
+
+
+# ############################################
+# Function get_pg_dump_compress_parameter()
+# ############################################
+
+def get_pg_dump_compress_parameter(dump_compression,pg_dump_release):
+    """
+    A function to get the --compress parameter for pg_dump. Methods
+    other than gzip need pg_dump >= 16. Returns '' if the value can
+    not be used with this pg_dump release.
+    """
+
+    if dump_compression is None or dump_compression.strip() == '':
+        return ''
+
+    if not check_dump_compression(dump_compression):
+        return ''
+
+    dump_compression = dump_compression.strip().lower()
+
+    if dump_compression.isdigit():
+        return ' --compress=' + dump_compression
+
+    if int(pg_dump_release.split('_')[0]) < 16:
+
+        #
+        # Older pg_dump releases only understand a gzip level
+        #
+
+        values = dump_compression.split(':')
+
+        if values[0] == 'none':
+            return ' --compress=0'
+        elif values[0] == 'gzip' and len(values) == 2:
+            return ' --compress=' + values[1]
+        else:
+            return ''
+
+    return ' --compress=' + dump_compression
@@ -48,15 +48,62 @@ class PgbackmanConfiguration():
         self.dbuser = 'pgbackman_role_rw'
         self.dbpassword = ''
         self.dsn = ''
+        self.ro_host = ''
+        self.ro_port = ''
+        self.ro_user = 'pgbackman_role_ro'
+        self.ro_password = ''
+        self.ro_max_lag = 30
+        self.ro_dsn_list = []
         self.pg_connect_retry_interval = 10
         self.database_source_dir = '/usr/share/pgbackman'
+        self.persistent_connections = 'ON'
+        self.pg_health_check_interval = 30
+        self.lookup_cache_size = 1000
+        self.lookup_cache_ttl = 300
+        self.stream_itersize = 2000
+        self.query_stats_sample_size = 1024
+        self.query_stats_interval = 3600
+
+        # pgbackman_pool section
+        self.connection_pool = 'ON'
+        self.pool_min_size = 1
+        self.pool_max_size = 4
+        self.pool_idle_timeout = 300
+        self.pool_checkout_timeout = 30
+        self.pool_stats_interval = 3600
 
         # pgbackman_dump section
         self.tmp_dir = '/tmp'
         self.pause_recovery_process_on_slave = 'OFF'
+        self.parallel_jobs_budget = 0
+        self.cluster_compression = 'gzip'
+        self.role_discovery = 'CATALOG'
+        self.pg_dumpall_cache_ttl = 600
+        self.max_concurrent_dumps = 0
+        self.max_concurrent_dumps_per_node = 0
+        self.dump_queue_check_interval = 5
+        self.progress_interval = 30
+        self.free_space_check = 'ON'
+        self.free_space_margin = 10
+        self.free_space_wait = 0
+        self.encryption_backend = 'age'
+        self.encryption_recipients = ''
+        self.encryption_identity_file = ''
+        self.encryption_jobs = 4
+        self.dump_manifest = 'ON'
+        self.manifest_algorithm = 'sha256'
+        self.manifest_jobs = 4
+
+        # pgbackman_worker section
+        self.dump_worker = 'OFF'
+        self.worker_queue_dir = ''
+        self.max_workers = 8
+        self.worker_check_interval = 1
 
         # pgbackman_maintenance section
         self.maintenance_interval = 70
+        self.stats_snapshot = 'OFF'
+        self.stats_snapshot_interval = 600
 
         # pgbackman_alerts section
         self.smtp_alerts = 'OFF'
@@ -130,12 +177,67 @@ class PgbackmanConfiguration():
             if config.has_option('pgbackman_database', 'password'):
                 self.dbpassword = config.get('pgbackman_database', 'password')
 
+            if config.has_option('pgbackman_database', 'ro_host'):
+                self.ro_host = config.get('pgbackman_database', 'ro_host')
+
+            if config.has_option('pgbackman_database', 'ro_port'):
+                self.ro_port = config.get('pgbackman_database', 'ro_port')
+
+            if config.has_option('pgbackman_database', 'ro_user'):
+                self.ro_user = config.get('pgbackman_database', 'ro_user')
+
+            if config.has_option('pgbackman_database', 'ro_password'):
+                self.ro_password = config.get('pgbackman_database', 'ro_password')
+
+            if config.has_option('pgbackman_database', 'ro_max_lag'):
+                self.ro_max_lag = int(config.get('pgbackman_database', 'ro_max_lag'))
+
             if config.has_option('pgbackman_database', 'pg_connect_retry_interval'):
                 self.pg_connect_retry_interval = int(config.get('pgbackman_database', 'pg_connect_retry_interval'))
 
             if config.has_option('pgbackman_database', 'database_source_dir'):
                 self.database_source_dir = config.get('pgbackman_database', 'database_source_dir')
 
+            if config.has_option('pgbackman_database', 'persistent_connections'):
+                self.persistent_connections = config.get('pgbackman_database', 'persistent_connections').upper()
+
+            if config.has_option('pgbackman_database', 'pg_health_check_interval'):
+                self.pg_health_check_interval = int(config.get('pgbackman_database', 'pg_health_check_interval'))
+
+            if config.has_option('pgbackman_database', 'lookup_cache_size'):
+                self.lookup_cache_size = int(config.get('pgbackman_database', 'lookup_cache_size'))
+
+            if config.has_option('pgbackman_database', 'lookup_cache_ttl'):
+                self.lookup_cache_ttl = int(config.get('pgbackman_database', 'lookup_cache_ttl'))
+
+            if config.has_option('pgbackman_database', 'stream_itersize'):
+                self.stream_itersize = int(config.get('pgbackman_database', 'stream_itersize'))
+
+            if config.has_option('pgbackman_database', 'query_stats_sample_size'):
+                self.query_stats_sample_size = int(config.get('pgbackman_database', 'query_stats_sample_size'))
+
+            if config.has_option('pgbackman_database', 'query_stats_interval'):
+                self.query_stats_interval = int(config.get('pgbackman_database', 'query_stats_interval'))
+
+            # pgbackman_pool section
+            if config.has_option('pgbackman_pool', 'connection_pool'):
+                self.connection_pool = config.get('pgbackman_pool', 'connection_pool').upper()
+
+            if config.has_option('pgbackman_pool', 'min_size'):
+                self.pool_min_size = int(config.get('pgbackman_pool', 'min_size'))
+
+            if config.has_option('pgbackman_pool', 'max_size'):
+                self.pool_max_size = int(config.get('pgbackman_pool', 'max_size'))
+
+            if config.has_option('pgbackman_pool', 'idle_timeout'):
+                self.pool_idle_timeout = int(config.get('pgbackman_pool', 'idle_timeout'))
+
+            if config.has_option('pgbackman_pool', 'checkout_timeout'):
+                self.pool_checkout_timeout = int(config.get('pgbackman_pool', 'checkout_timeout'))
+
+            if config.has_option('pgbackman_pool', 'stats_interval'):
+                self.pool_stats_interval = int(config.get('pgbackman_pool', 'stats_interval'))
+
             # pgbackman_dump section
             if config.has_option('pgbackman_dump', 'tmp_dir'):
                 self.tmp_dir = config.get('pgbackman_dump', 'tmp_dir')
@@ -144,10 +246,83 @@ class PgbackmanConfiguration():
                 self.pause_recovery_process_on_slave = config.get('pgbackman_dump',
                                                                   'pause_recovery_process_on_slave').upper()
 
+            if config.has_option('pgbackman_dump', 'parallel_jobs_budget'):
+                self.parallel_jobs_budget = int(config.get('pgbackman_dump', 'parallel_jobs_budget'))
+
+            if config.has_option('pgbackman_dump', 'cluster_compression'):
+                self.cluster_compression = config.get('pgbackman_dump', 'cluster_compression')
+
+            if config.has_option('pgbackman_dump', 'role_discovery'):
+                self.role_discovery = config.get('pgbackman_dump', 'role_discovery').upper()
+
+            if config.has_option('pgbackman_dump', 'pg_dumpall_cache_ttl'):
+                self.pg_dumpall_cache_ttl = int(config.get('pgbackman_dump', 'pg_dumpall_cache_ttl'))
+
+            if config.has_option('pgbackman_dump', 'max_concurrent_dumps'):
+                self.max_concurrent_dumps = int(config.get('pgbackman_dump', 'max_concurrent_dumps'))
+
+            if config.has_option('pgbackman_dump', 'max_concurrent_dumps_per_node'):
+                self.max_concurrent_dumps_per_node = int(config.get('pgbackman_dump', 'max_concurrent_dumps_per_node'))
+
+            if config.has_option('pgbackman_dump', 'dump_queue_check_interval'):
+                self.dump_queue_check_interval = float(config.get('pgbackman_dump', 'dump_queue_check_interval'))
+
+            if config.has_option('pgbackman_dump', 'progress_interval'):
+                self.progress_interval = int(config.get('pgbackman_dump', 'progress_interval'))
+
+            if config.has_option('pgbackman_dump', 'free_space_check'):
+                self.free_space_check = config.get('pgbackman_dump', 'free_space_check')
+
+            if config.has_option('pgbackman_dump', 'free_space_margin'):
+                self.free_space_margin = int(config.get('pgbackman_dump', 'free_space_margin'))
+
+            if config.has_option('pgbackman_dump', 'free_space_wait'):
+                self.free_space_wait = int(config.get('pgbackman_dump', 'free_space_wait'))
+
+            if config.has_option('pgbackman_dump', 'encryption_backend'):
+                self.encryption_backend = config.get('pgbackman_dump', 'encryption_backend').lower()
+
+            if config.has_option('pgbackman_dump', 'encryption_recipients'):
+                self.encryption_recipients = config.get('pgbackman_dump', 'encryption_recipients')
+
+            if config.has_option('pgbackman_dump', 'encryption_identity_file'):
+                self.encryption_identity_file = config.get('pgbackman_dump', 'encryption_identity_file')
+
+            if config.has_option('pgbackman_dump', 'encryption_jobs'):
+                self.encryption_jobs = int(config.get('pgbackman_dump', 'encryption_jobs'))
+
+            if config.has_option('pgbackman_dump', 'dump_manifest'):
+                self.dump_manifest = config.get('pgbackman_dump', 'dump_manifest').upper()
+
+            if config.has_option('pgbackman_dump', 'manifest_algorithm'):
+                self.manifest_algorithm = config.get('pgbackman_dump', 'manifest_algorithm').lower()
+
+            if config.has_option('pgbackman_dump', 'manifest_jobs'):
+                self.manifest_jobs = int(config.get('pgbackman_dump', 'manifest_jobs'))
+
+            # pgbackman_worker section
+            if config.has_option('pgbackman_worker', 'dump_worker'):
+                self.dump_worker = config.get('pgbackman_worker', 'dump_worker').upper()
+
+            if config.has_option('pgbackman_worker', 'queue_dir'):
+                self.worker_queue_dir = config.get('pgbackman_worker', 'queue_dir')
+
+            if config.has_option('pgbackman_worker', 'max_workers'):
+                self.max_workers = int(config.get('pgbackman_worker', 'max_workers'))
+
+            if config.has_option('pgbackman_worker', 'queue_check_interval'):
+                self.worker_check_interval = float(config.get('pgbackman_worker', 'queue_check_interval'))
+
             # pgbackman_maintenance section
             if config.has_option('pgbackman_maintenance', 'maintenance_interval'):
                 self.maintenance_interval = int(config.get('pgbackman_maintenance', 'maintenance_interval'))
 
+            if config.has_option('pgbackman_maintenance', 'stats_snapshot'):
+                self.stats_snapshot = config.get('pgbackman_maintenance', 'stats_snapshot').upper()
+
+            if config.has_option('pgbackman_maintenance', 'stats_snapshot_interval'):
+                self.stats_snapshot_interval = int(config.get('pgbackman_maintenance', 'stats_snapshot_interval'))
+
                 # pgbackman_alerts section
             if config.has_option('pgbackman_alerts', 'smtp_alerts'):
                 self.smtp_alerts = config.get('pgbackman_alerts', 'smtp_alerts').upper()
@@ -205,3 +380,34 @@ class PgbackmanConfiguration():
 
         for parameter in dsn_parameters:
             self.dsn = self.dsn + parameter + ' '
+
+        # Queue directory of pgbackman_worker
+
+        if self.worker_queue_dir == '':
+            self.worker_queue_dir = self.tmp_dir + '/pgbackman_worker_queue'
+
+        # Generate one DSN string per read only standby server
+
+        if self.ro_port == '':
+            self.ro_port = self.dbport
+
+        for ro_host in self.ro_host.replace(' ','').split(','):
+
+            if ro_host == '':
+                continue
+
+            ro_dsn = 'host=' + ro_host + ' '
+
+            if self.ro_port != '':
+                ro_dsn = ro_dsn + 'port=' + self.ro_port + ' '
+
+            if self.dbname != '':
+                ro_dsn = ro_dsn + 'dbname=' + self.dbname + ' '
+
+            if self.ro_user != '':
+                ro_dsn = ro_dsn + 'user=' + self.ro_user + ' '
+
+            if self.ro_password != '':
+                ro_dsn = ro_dsn + 'password=' + self.ro_password + ' '
+
+            self.ro_dsn_list.append(ro_dsn)
@@ -23,16 +23,50 @@
 # along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
+import time
 import psycopg2
 import psycopg2.extensions
 import psycopg2.extras
 
 from pgbackman.prettytable import *
 from pgbackman.ordereddict import OrderedDict
+from pgbackman.lookup_cache import PgbackmanLookupCache
+from pgbackman.query_stats import PgbackmanQueryStats, PgbackmanStatsCursor
 
 psycopg2.extensions.register_type(psycopg2.extensions.UNICODE)
 psycopg2.extensions.register_type(psycopg2.extensions.UNICODEARRAY)
 
+# ##############################
+# Class: PgbackmanStreamCursor
+# ##############################
+
+
+class PgbackmanStreamCursor():
+    """
+    Wrapper around a named server-side cursor. The first batch of
+    rows is fetched when it is created, so description is available
+    before the rows are iterated as with a normal cursor.
+    """
+
+    def __init__(self,cur):
+        """ The Constructor."""
+
+        self.cur = cur
+        self.rows = cur.fetchmany(cur.itersize)
+        self.description = cur.description
+
+    def __iter__(self):
+        while self.rows:
+            rows = self.rows
+            self.rows = self.cur.fetchmany(self.cur.itersize)
+
+            for row in rows:
+                yield row
+
+    def close(self):
+        self.cur.close()
+
+
 # #####################
 # Class: PgbackmanDB
 # ######################
@@ -45,7 +79,9 @@ class PgbackmanDB():
     # Constructor
     # ############################################
 
-    def __init__(self, dsn,application):
+    def __init__(self, dsn,application,persistent=False,health_check_interval=30,pool=None,
+                 lookup_cache_size=1000,lookup_cache_ttl=300,query_stats_sample_size=1024,
+                 ro_dsn_list=None,ro_max_lag=30):
         """ The Constructor."""
 
         self.dsn = dsn
@@ -54,6 +90,70 @@ class PgbackmanDB():
         self.server_version = None
         self.cur = None
 
+        #
+        # With persistent=True the connection is kept open between
+        # method calls and only re-established when it is found dead.
+        # The connection is pinged with 'SELECT 1' before being reused
+        # if it has been idle more than health_check_interval seconds.
+        #
+
+        self.persistent = persistent
+        self.health_check_interval = health_check_interval
+        self.last_used = 0
+
+        #
+        # With a PgbackmanPool the connection is checked out from the
+        # pool in pg_connect() and given back in the next pg_connect()
+        # or in pg_close().
+        #
+
+        self.pool = pool
+
+        #
+        # ID <-> FQDN mappings of backup servers and PgSQL nodes
+        # are cached. pgbackman_control drops the PgSQL node
+        # entries when it gets a NOTIFY about a changed node.
+        #
+
+        self.lookup_cache = PgbackmanLookupCache(lookup_cache_size,lookup_cache_ttl)
+
+        #
+        # Listings like show_backup_catalog use named server-side
+        # cursors that fetch stream_itersize rows at a time when
+        # stream_itersize > 0. They run in a read only transaction
+        # on a separate connection.
+        #
+
+        self.stream_itersize = 0
+        self.stream_conn = None
+        self.stream_dsn = None
+        self.stream_cursor_count = 0
+
+        #
+        # Calls, errors, rows and latency of the queries run by
+        # every method. query_stats_sample_size = 0 deactivates them.
+        #
+
+        if query_stats_sample_size > 0:
+            self.query_stats = PgbackmanQueryStats(query_stats_sample_size)
+        else:
+            self.query_stats = None
+
+        #
+        # Read only methods (show_*, get_status_info, ...) use the
+        # first standby in ro_dsn_list that is available and not
+        # lagging more than ro_max_lag seconds. The primary is used
+        # if none is. The lag is checked again after
+        # health_check_interval seconds.
+        #
+
+        self.ro_dsn_list = ro_dsn_list or []
+        self.ro_max_lag = ro_max_lag
+        self.ro_conn = None
+        self.ro_dsn = None
+        self.ro_last_check = 0
+        self.ro_down_until = 0
+
         self.output_format = 'table'
 
 
@@ -65,13 +165,42 @@ class PgbackmanDB():
         """A function to connect to PostgreSQL using Psycopg2"""
 
         try:
+
+            #
+            # In persistent mode we reuse a healthy connection and only
+            # open a new cursor. Callers can still be iterating over a
+            # cursor returned by a previous method, so it must not be
+            # reused.
+            #
+
+            if self.pool:
+                if self.conn is not None:
+                    self.pool.putconn(self.conn)
+                    self.conn = None
+
+                self.conn = self.pool.getconn()
+                self.cur = self.new_cursor(self.conn)
+                self.server_version = self.conn.server_version
+                return
+
+            if self.persistent and self.connection_is_alive():
+                self.cur = self.new_cursor(self.conn)
+                self.last_used = time.time()
+                return
+
+            reconnect = self.persistent and self.conn is not None
+
             self.conn = psycopg2.connect(self.dsn)
+            self.last_used = time.time()
+
+            if self.query_stats:
+                self.query_stats.record_connection(reconnect)
 
             if self.conn:
                 self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
                 psycopg2.extras.wait_select(self.conn)
 
-                self.cur = self.conn.cursor()
+                self.cur = self.new_cursor(self.conn)
 
                 self.server_version = self.conn.server_version
 
@@ -87,6 +216,29 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method new_cursor()
+    # ############################################
+
+    def new_cursor(self,conn,name=None):
+        """A function to get a cursor that registers query stats if they are active"""
+
+        if self.query_stats is None:
+            if name:
+                return conn.cursor(name)
+
+            return conn.cursor()
+
+        if name:
+            cur = conn.cursor(name,cursor_factory=PgbackmanStatsCursor)
+        else:
+            cur = conn.cursor(cursor_factory=PgbackmanStatsCursor)
+
+        cur.query_stats = self.query_stats
+
+        return cur
+
+
     # ############################################
     # Method pg_close()
     # ############################################
@@ -100,6 +252,21 @@ class PgbackmanDB():
             except psycopg2.Error as e:
                 raise e
 
+        if self.pool:
+            if self.conn is not None:
+                self.pool.putconn(self.conn)
+                self.conn = None
+
+            return
+
+        #
+        # A persistent connection is kept open until pg_disconnect()
+        # is called.
+        #
+
+        if self.persistent:
+            return
+
         if self.conn:
             try:
                 self.conn.close()
@@ -107,6 +274,286 @@ class PgbackmanDB():
                 raise e
 
 
+    # ############################################
+    # Method pg_disconnect()
+    # ############################################
+
+    def pg_disconnect(self):
+        """A function to close the postgreSQL connection, also in persistent mode"""
+
+        if self.stream_conn:
+            try:
+                self.stream_conn.close()
+            except psycopg2.Error as e:
+                raise e
+
+            self.stream_conn = None
+
+        self.close_ro_connection()
+
+        if self.pool:
+            if self.conn is not None:
+                self.pool.putconn(self.conn,close=True)
+                self.conn = None
+
+            return
+
+        persistent = self.persistent
+
+        try:
+            self.persistent = False
+            self.pg_close()
+
+        finally:
+            self.persistent = persistent
+
+
+    # ############################################
+    # Method pg_stream_cursor()
+    # ############################################
+
+    def pg_stream_cursor(self):
+        """A function to get a named server-side cursor that fetches stream_itersize rows at a time"""
+
+        try:
+
+            #
+            # Listings read from a standby server if one is
+            # available. The stream connection is opened again if
+            # the server to use has changed.
+            #
+
+            if self.get_ro_connection() is not None:
+                stream_dsn = self.ro_dsn
+            else:
+                stream_dsn = self.dsn
+
+            if self.stream_conn is not None and self.stream_dsn != stream_dsn:
+                self.stream_conn.close()
+                self.stream_conn = None
+
+            if self.stream_conn is None or self.stream_conn.closed:
+                self.stream_conn = psycopg2.connect(stream_dsn)
+                self.stream_dsn = stream_dsn
+                self.stream_conn.set_session(readonly=True,autocommit=False)
+
+                if self.query_stats:
+                    self.query_stats.record_connection()
+
+                if (self.stream_conn.server_version >= 90000 and 'application_name=' not in stream_dsn):
+                    cur = self.stream_conn.cursor()
+                    cur.execute('SET application_name TO %s',(self.application,))
+                    cur.close()
+
+                    self.stream_conn.commit()
+
+            else:
+
+                #
+                # Closes the transaction and the named cursor of the
+                # previous listing.
+                #
+
+                self.stream_conn.rollback()
+
+            self.stream_cursor_count += 1
+
+            cur = self.new_cursor(self.stream_conn,'pgbackman_stream_' + str(self.stream_cursor_count))
+            cur.itersize = self.stream_itersize
+
+            return cur
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method pg_connect_ro()
+    # ############################################
+
+    def pg_connect_ro(self):
+        """A function to get a cursor for read only queries, on a standby server if one is available"""
+
+        try:
+            conn = self.get_ro_connection()
+
+            if conn is None:
+                self.pg_connect()
+                return
+
+            self.cur = self.new_cursor(conn)
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method get_ro_connection()
+    # ############################################
+
+    def get_ro_connection(self):
+        """A function to get a connection to a standby server not lagging more than ro_max_lag, or None"""
+
+        if len(self.ro_dsn_list) == 0:
+            return None
+
+        now = time.time()
+
+        if self.ro_conn is not None and not self.ro_conn.closed:
+
+            if now - self.ro_last_check < self.health_check_interval:
+                return self.ro_conn
+
+            try:
+                if self.get_replication_lag(self.ro_conn) <= self.ro_max_lag:
+                    self.ro_last_check = now
+                    return self.ro_conn
+
+            except psycopg2.Error:
+                pass
+
+            self.close_ro_connection()
+
+        #
+        # After all standby servers have failed we use the primary
+        # for health_check_interval seconds before trying again.
+        #
+
+        if now < self.ro_down_until:
+            return None
+
+        for ro_dsn in self.ro_dsn_list:
+            conn = None
+
+            try:
+                conn = psycopg2.connect(ro_dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+
+                if self.query_stats:
+                    self.query_stats.record_connection()
+
+                if (conn.server_version >= 90000 and 'application_name=' not in ro_dsn):
+                    cur = conn.cursor()
+                    cur.execute('SET application_name TO %s',(self.application,))
+                    cur.close()
+
+                if self.get_replication_lag(conn) <= self.ro_max_lag:
+                    self.ro_conn = conn
+                    self.ro_dsn = ro_dsn
+                    self.ro_last_check = now
+
+                    return conn
+
+                conn.close()
+
+            except psycopg2.Error:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+        self.ro_down_until = now + self.health_check_interval
+
+        return None
+
+
+    # ############################################
+    # Method get_replication_lag()
+    # ############################################
+
+    def get_replication_lag(self,conn):
+        """A function to get the replication lag in seconds of a standby server. A server that is not in recovery has no lag"""
+
+        if conn.server_version >= 100000:
+            receive_function = 'pg_last_wal_receive_lsn()'
+            replay_function = 'pg_last_wal_replay_lsn()'
+        else:
+            receive_function = 'pg_last_xlog_receive_location()'
+            replay_function = 'pg_last_xlog_replay_location()'
+
+        #
+        # A standby that has replayed all it has received is not
+        # lagging, even if the primary has been idle for a while.
+        #
+
+        cur = conn.cursor()
+        cur.execute('SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 '
+                    'WHEN ' + receive_function + ' = ' + replay_function + ' THEN 0 '
+                    'ELSE COALESCE(extract(epoch FROM now() - pg_last_xact_replay_timestamp()),0) END')
+
+        lag = cur.fetchone()[0]
+        cur.close()
+
+        return lag
+
+
+    # ############################################
+    # Method close_ro_connection()
+    # ############################################
+
+    def close_ro_connection(self):
+        """A function to close the connection to the standby server"""
+
+        if self.ro_conn is not None:
+            try:
+                if not self.ro_conn.closed:
+                    self.ro_conn.close()
+            except psycopg2.Error:
+                pass
+
+        self.ro_conn = None
+        self.ro_dsn = None
+
+
+    # ############################################
+    # Method execute_listing()
+    # ############################################
+
+    def execute_listing(self,sql,params):
+        """A function to run a show_* listing with a server-side cursor if stream_itersize > 0"""
+
+        try:
+            if self.stream_itersize > 0:
+                cur = self.pg_stream_cursor()
+                cur.execute(sql,params)
+
+                return PgbackmanStreamCursor(cur)
+
+            self.cur.execute(sql,params)
+            return self.cur
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method connection_is_alive()
+    # ############################################
+
+    def connection_is_alive(self):
+        """A function to check if the current connection can be reused"""
+
+        if self.conn is None or self.conn.closed:
+            return False
+
+        if time.time() - self.last_used < self.health_check_interval:
+            return True
+
+        try:
+            cur = self.conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+
+            return True
+
+        except (psycopg2.OperationalError,psycopg2.InterfaceError):
+
+            try:
+                self.conn.close()
+            except psycopg2.Error:
+                pass
+
+            return False
+
+
     # ############################################
     # Method
     # ############################################
@@ -129,12 +576,11 @@ class PgbackmanDB():
         """A function to get a list of all backup servers available"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT "SrvID","FQDN","Remarks" FROM show_backup_servers')
-                    self.conn.commit()
 
                     return self.cur
 
@@ -162,6 +608,8 @@ class PgbackmanDB():
                     self.cur.execute('SELECT register_backup_server(%s,%s,%s,%s)',(hostname,domain,status,remarks))
                     self.conn.commit()
 
+                    self.lookup_cache.invalidate('backup_server_id','backup_server_fqdn')
+
                 except psycopg2.Error as  e:
                     raise e
 
@@ -186,6 +634,8 @@ class PgbackmanDB():
                     self.cur.execute('SELECT delete_backup_server(%s)',(server_id,))
                     self.conn.commit()
 
+                    self.lookup_cache.invalidate('backup_server_id','backup_server_fqdn')
+
                 except psycopg2.Error as e:
                     raise e
 
@@ -203,12 +653,11 @@ class PgbackmanDB():
         """A function to generate the output of the show_pgsql_nodes command"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT * FROM show_pgsql_nodes')
-                    self.conn.commit()
 
                     return self.cur
 
@@ -236,6 +685,8 @@ class PgbackmanDB():
                     self.cur.execute('SELECT register_pgsql_node(%s,%s,%s,%s,%s,%s)',(hostname,domain,port,admin_user,status,remarks))
                     self.conn.commit()
 
+                    self.lookup_cache.invalidate('pgsql_node_id','pgsql_node_fqdn')
+
                 except psycopg2.Error as  e:
                     raise e
 
@@ -260,6 +711,8 @@ class PgbackmanDB():
                     self.cur.execute('SELECT delete_pgsql_node(%s)',(node_id,))
                     self.conn.commit()
 
+                    self.lookup_cache.invalidate('pgsql_node_id','pgsql_node_fqdn')
+
                 except psycopg2.Error as e:
                     raise e
 
@@ -397,58 +850,127 @@ class PgbackmanDB():
     # Method
     # ############################################
 
-    def show_backup_definitions(self,backup_server_list,pgsql_node_list,dbname_list):
-        """A function to get a list of backup definitions"""
+    def get_backup_server_filter_sql(self,column,backup_server_list):
+        """A function to generate a WHERE condition for a list of backup server IDs and/or FQDNs"""
 
-        try:
-            self.pg_connect()
+        return self.get_id_filter_sql(column,backup_server_list,'backup_server','server_id')
 
-            if self.cur:
-                try:
 
-                    if backup_server_list != None:
-                        server_sql = 'AND (FALSE '
+    # ############################################
+    # Method
+    # ############################################
 
-                        for server in backup_server_list:
-                            if server.isdigit():
-                                server_sql = server_sql + 'OR backup_server_id = ' + str(server) + ' '
-                            else:
-                                server_sql = server_sql + 'OR backup_server_id = ' +  str(self.get_backup_server_id(server.lower())) + ' '
+    def get_pgsql_node_filter_sql(self,column,pgsql_node_list):
+        """A function to generate a WHERE condition for a list of PgSQL node IDs and/or FQDNs"""
 
-                        server_sql = server_sql + ') '
+        return self.get_id_filter_sql(column,pgsql_node_list,'pgsql_node','node_id')
 
-                    else:
-                        server_sql = ''
 
-                    if pgsql_node_list != None:
-                        node_sql = 'AND (FALSE '
+    # ############################################
+    # Method
+    # ############################################
 
-                        for node in pgsql_node_list:
-                            if node.isdigit():
-                                node_sql = node_sql + 'OR pgsql_node_id = ' + str(node) + ' '
-                            else:
-                                node_sql = node_sql + 'OR pgsql_node_id = ' +  str(self.get_pgsql_node_id(node.lower())) + ' '
+    def get_id_filter_sql(self,column,value_list,table,id_column):
+        """
+        A function to generate a WHERE condition for a list of IDs
+        and/or FQDNs. FQDNs are resolved to IDs inside the query, so
+        the whole list costs one array parameter and no extra round
+        trips.
 
-                        node_sql = node_sql + ') '
+        Returns a tuple (sql,params). sql is '' if value_list is None.
+        """
 
-                    else:
-                        node_sql = ''
+        if value_list == None:
+            return '',[]
 
+        id_list = []
+        fqdn_list = []
 
-                    if dbname_list != None:
-                        dbname_sql = 'AND (FALSE '
+        for value in value_list:
+            if value.isdigit():
+                id_list.append(int(value))
+            else:
+                fqdn_list.append(value.lower())
 
-                        for dbname in dbname_list:
-                            dbname_sql = dbname_sql + 'OR "DBname" = \'' + dbname + '\' '
+        sql = 'AND ' + column + ' = ANY(ARRAY(SELECT ' + id_column + ' FROM ' + table + \
+            ' WHERE ' + id_column + ' = ANY(%s::bigint[]) OR hostname || \'.\' || domain_name = ANY(%s::text[]))) '
 
-                        dbname_sql = dbname_sql + ') '
+        return sql,[id_list,fqdn_list]
 
-                    else:
-                        dbname_sql = ''
 
-                    self.cur.execute('SELECT \"DefID\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Schedule\",\"Code\",\"Retention\",\"Status\",\"Parameters\" FROM show_backup_definitions WHERE TRUE ' + server_sql + node_sql + dbname_sql)
+    # ############################################
+    # Method
+    # ############################################
 
-                    return self.cur
+    def get_value_filter_sql(self,column,value_list,array_type):
+        """
+        A function to generate a WHERE condition for a list of values.
+        Returns a tuple (sql,params). sql is '' if value_list is None.
+        """
+
+        if value_list == None:
+            return '',[]
+
+        return 'AND ' + column + ' = ANY(%s::' + array_type + ') ',[list(value_list)]
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_keyset_sql(self,key_column,after_id,since,until,limit):
+        """
+        A function to generate the WHERE/ORDER BY/LIMIT part of a
+        keyset paginated catalog query. Entries are returned newest
+        first, after_id returns the entries older than this ID.
+        Returns a tuple (sql,params).
+        """
+
+        sql = ''
+        params = []
+
+        if after_id != None:
+            sql = sql + 'AND ' + key_column + ' < %s '
+            params.append(after_id)
+
+        if since != None:
+            sql = sql + 'AND finished >= %s::timestamptz '
+            params.append(since)
+
+        if until != None:
+            sql = sql + 'AND finished < %s::timestamptz '
+            params.append(until)
+
+        sql = sql + 'ORDER BY ' + key_column + ' DESC '
+
+        if limit != None:
+            sql = sql + 'LIMIT %s '
+            params.append(limit)
+
+        return sql,params
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def show_backup_definitions(self,backup_server_list,pgsql_node_list,dbname_list):
+        """A function to get a list of backup definitions"""
+
+        try:
+            self.pg_connect_ro()
+
+            if self.cur:
+                try:
+
+                    server_sql,server_params = self.get_backup_server_filter_sql('backup_server_id',backup_server_list)
+
+                    node_sql,node_params = self.get_pgsql_node_filter_sql('pgsql_node_id',pgsql_node_list)
+
+                    dbname_sql,dbname_params = self.get_value_filter_sql('"DBname"',dbname_list,'text[]')
+
+                    return self.execute_listing('SELECT \"DefID\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Schedule\",\"Spread schedule\",\"Code\",\"Retention\",\"Status\",\"Parameters\" FROM show_backup_definitions WHERE TRUE ' + server_sql + node_sql + dbname_sql,
+                                                server_params + node_params + dbname_params)
 
                 except psycopg2.Error as e:
                     raise e
@@ -492,54 +1014,19 @@ class PgbackmanDB():
         """A function to get a list with snapshot definitions"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
 
-                    if backup_server_list != None:
-                        server_sql = 'AND (FALSE '
-
-                        for server in backup_server_list:
-                            if server.isdigit():
-                                server_sql = server_sql + 'OR backup_server_id = ' + str(server) + ' '
-                            else:
-                                server_sql = server_sql + 'OR backup_server_id = ' +  str(self.get_backup_server_id(server.lower())) + ' '
-
-                        server_sql = server_sql + ') '
-
-                    else:
-                        server_sql = ''
-
-                    if pgsql_node_list != None:
-                        node_sql = 'AND (FALSE '
+                    server_sql,server_params = self.get_backup_server_filter_sql('backup_server_id',backup_server_list)
 
-                        for node in pgsql_node_list:
-                            if node.isdigit():
-                                node_sql = node_sql + 'OR pgsql_node_id = ' + str(node) + ' '
-                            else:
-                                node_sql = node_sql + 'OR pgsql_node_id = ' +  str(self.get_pgsql_node_id(node.lower())) + ' '
+                    node_sql,node_params = self.get_pgsql_node_filter_sql('pgsql_node_id',pgsql_node_list)
 
-                        node_sql = node_sql + ') '
+                    dbname_sql,dbname_params = self.get_value_filter_sql('"DBname"',dbname_list,'text[]')
 
-                    else:
-                        node_sql = ''
-
-
-                    if dbname_list != None:
-                        dbname_sql = 'AND (FALSE '
-
-                        for dbname in dbname_list:
-                            dbname_sql = dbname_sql + 'OR "DBname" = \'' + dbname + '\' '
-
-                        dbname_sql = dbname_sql + ') '
-
-                    else:
-                        dbname_sql = ''
-
-                    self.cur.execute('SELECT \"SnapshotID\",\"Registered\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"AT time\",\"Code\",\"Retention\",\"Parameters\",\"Status\" FROM show_snapshot_definitions WHERE TRUE ' + server_sql + node_sql + dbname_sql)
-
-                    return self.cur
+                    return self.execute_listing('SELECT \"SnapshotID\",\"Registered\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"AT time\",\"Code\",\"Retention\",\"Parameters\",\"Status\" FROM show_snapshot_definitions WHERE TRUE ' + server_sql + node_sql + dbname_sql,
+                                                server_params + node_params + dbname_params)
 
                 except psycopg2.Error as e:
                     raise e
@@ -557,54 +1044,19 @@ class PgbackmanDB():
         """A function to get a list with restore definitions"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
 
-                    if backup_server_list != None:
-                        server_sql = 'AND (FALSE '
-
-                        for server in backup_server_list:
-                            if server.isdigit():
-                                server_sql = server_sql + 'OR backup_server_id = ' + str(server) + ' '
-                            else:
-                                server_sql = server_sql + 'OR backup_server_id = ' +  str(self.get_backup_server_id(server.lower())) + ' '
-
-                        server_sql = server_sql + ') '
-
-                    else:
-                        server_sql = ''
-
-                    if pgsql_node_list != None:
-                        node_sql = 'AND (FALSE '
-
-                        for node in pgsql_node_list:
-                            if node.isdigit():
-                                node_sql = node_sql + 'OR target_pgsql_node_id = ' + str(node) + ' '
-                            else:
-                                node_sql = node_sql + 'OR target_pgsql_node_id = ' +  str(self.get_pgsql_node_id(node.lower())) + ' '
-
-                        node_sql = node_sql + ') '
-
-                    else:
-                        node_sql = ''
+                    server_sql,server_params = self.get_backup_server_filter_sql('backup_server_id',backup_server_list)
 
+                    node_sql,node_params = self.get_pgsql_node_filter_sql('target_pgsql_node_id',pgsql_node_list)
 
-                    if dbname_list != None:
-                        dbname_sql = 'AND (FALSE '
+                    dbname_sql,dbname_params = self.get_value_filter_sql('"Target DBname"',dbname_list,'text[]')
 
-                        for dbname in dbname_list:
-                            dbname_sql = dbname_sql + 'OR "Target DBname" = \'' + dbname + '\' '
-
-                        dbname_sql = dbname_sql + ') '
-
-                    else:
-                        dbname_sql = ''
-
-                    self.cur.execute('SELECT \"RestoreDef\",\"Registered\",\"BckID\",target_pgsql_node_id AS \"ID\",\"Target PgSQL node\",\"Target DBname\",\"Renamed database\",\"AT time\",\"Extra parameters\",\"Status\" FROM show_restore_definitions WHERE TRUE ' + server_sql + node_sql + dbname_sql)
-
-                    return self.cur
+                    return self.execute_listing('SELECT \"RestoreDef\",\"Registered\",\"BckID\",target_pgsql_node_id AS \"ID\",\"Target PgSQL node\",\"Target DBname\",\"Renamed database\",\"AT time\",\"Extra parameters\",\"Status\" FROM show_restore_definitions WHERE TRUE ' + server_sql + node_sql + dbname_sql,
+                                                server_params + node_params + dbname_params)
 
                 except psycopg2.Error as e:
                     raise e
@@ -619,80 +1071,41 @@ class PgbackmanDB():
     # Method
     # ############################################
 
-    def show_backup_catalog(self,backup_server_list,pgsql_node_list,dbname_list,def_id_list,status_list):
-        """A function to get a list of a backup catalog"""
+    def show_backup_catalog(self,backup_server_list,pgsql_node_list,dbname_list,def_id_list,status_list,
+                            limit=None,after_bck_id=None,since=None,until=None):
+        """
+        A function to get a list of a backup catalog.
+
+        If limit, after_bck_id, since or until are used, the entries
+        are read from show_backup_catalog_keyset ordered by BckID
+        descending, so a page is an index range scan instead of a sort
+        of the whole catalog.
+        """
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
 
-                    if backup_server_list != None:
-                        server_sql = 'AND (FALSE '
-
-                        for server in backup_server_list:
-                            if server.isdigit():
-                                server_sql = server_sql + 'OR backup_server_id = ' + str(server) + ' '
-                            else:
-                                server_sql = server_sql + 'OR backup_server_id = ' +  str(self.get_backup_server_id(server.lower())) + ' '
-
-                        server_sql = server_sql + ') '
-
-                    else:
-                        server_sql = ''
-
-                    if pgsql_node_list != None:
-                        node_sql = 'AND (FALSE '
-
-                        for node in pgsql_node_list:
-                            if node.isdigit():
-                                node_sql = node_sql + 'OR pgsql_node_id = ' + str(node) + ' '
-                            else:
-                                node_sql = node_sql + 'OR pgsql_node_id = ' +  str(self.get_pgsql_node_id(node.lower())) + ' '
-
-                        node_sql = node_sql + ') '
-
-                    else:
-                        node_sql = ''
-
-                    if dbname_list != None:
-                        dbname_sql = 'AND (FALSE '
-
-                        for dbname in dbname_list:
-                            dbname_sql = dbname_sql + 'OR "DBname" = \'' + dbname + '\' '
+                    server_sql,server_params = self.get_backup_server_filter_sql('backup_server_id',backup_server_list)
 
-                        dbname_sql = dbname_sql + ') '
+                    node_sql,node_params = self.get_pgsql_node_filter_sql('pgsql_node_id',pgsql_node_list)
 
-                    else:
-                        dbname_sql = ''
+                    dbname_sql,dbname_params = self.get_value_filter_sql('"DBname"',dbname_list,'text[]')
 
-                    if def_id_list != None:
-                        def_id_sql = 'AND (FALSE '
+                    def_id_sql,def_id_params = self.get_value_filter_sql('def_id',def_id_list,'bigint[]')
 
-                        for def_id in def_id_list:
-                            def_id_sql = def_id_sql + 'OR def_id = \'' + def_id + '\' '
+                    status_sql,status_params = self.get_value_filter_sql('"Status"',status_list,'text[]')
 
-                        def_id_sql = def_id_sql + ') '
+                    if limit == None and after_bck_id == None and since == None and until == None:
+                        return self.execute_listing('SELECT \"BckID\",\"DefID\",\"SnapshotID\",\"Finished\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Duration\",\"Size\",\"Code\",\"Execution\",\"Status\" FROM show_backup_catalog WHERE TRUE ' + server_sql + node_sql + dbname_sql + def_id_sql + status_sql,
+                                                    server_params + node_params + dbname_params + def_id_params + status_params)
 
-                    else:
-                        def_id_sql = ''
+                    keyset_sql,keyset_params = self.get_keyset_sql('bck_id',after_bck_id,since,until,limit)
 
-                    if status_list != None:
-                        status_sql = 'AND (FALSE '
-
-                        for status in status_list:
-                            status_sql = status_sql + 'OR "Status" = \'' + status + '\' '
-
-                        status_sql = status_sql + ') '
-
-                    else:
-                        status_sql = ''
-
-
-                    self.cur.execute('SELECT \"BckID\",\"DefID\",\"SnapshotID\",\"Finished\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Duration\",\"Size\",\"Code\",\"Execution\",\"Status\" FROM show_backup_catalog WHERE TRUE ' + server_sql + node_sql + dbname_sql + def_id_sql + status_sql)
-
-                    return self.cur
+                    return self.execute_listing('SELECT \"BckID\",\"DefID\",\"SnapshotID\",\"Finished\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Duration\",\"Size\",\"Code\",\"Execution\",\"Status\" FROM show_backup_catalog_keyset WHERE TRUE ' + server_sql + node_sql + dbname_sql + def_id_sql + status_sql + keyset_sql,
+                                                server_params + node_params + dbname_params + def_id_params + status_params + keyset_params)
 
                 except psycopg2.Error as e:
                     raise e
@@ -706,57 +1119,36 @@ class PgbackmanDB():
     # Method
     # ############################################
 
-    def show_restore_catalog(self,backup_server_list,pgsql_node_list,dbname_list):
-        """A function to get a list of a restore catalog"""
+    def show_restore_catalog(self,backup_server_list,pgsql_node_list,dbname_list,
+                             limit=None,after_restore_id=None,since=None,until=None):
+        """
+        A function to get a list of a restore catalog.
+
+        If limit, after_restore_id, since or until are used, the
+        entries are read from show_restore_catalog_keyset ordered by
+        RestoreID descending.
+        """
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
 
-                    if backup_server_list != None:
-                        server_sql = 'AND (FALSE '
-
-                        for server in backup_server_list:
-                            if server.isdigit():
-                                server_sql = server_sql + 'OR backup_server_id = ' + str(server) + ' '
-                            else:
-                                server_sql = server_sql + 'OR backup_server_id = ' +  str(self.get_backup_server_id(server.lower())) + ' '
-
-                        server_sql = server_sql + ') '
-
-                    else:
-                        server_sql = ''
+                    server_sql,server_params = self.get_backup_server_filter_sql('backup_server_id',backup_server_list)
 
-                    if pgsql_node_list != None:
-                        node_sql = 'AND (FALSE '
+                    node_sql,node_params = self.get_pgsql_node_filter_sql('target_pgsql_node_id',pgsql_node_list)
 
-                        for node in pgsql_node_list:
-                            if node.isdigit():
-                                node_sql = node_sql + 'OR target_pgsql_node_id = ' + str(node) + ' '
-                            else:
-                                node_sql = node_sql + 'OR target_pgsql_node_id = ' +  str(self.get_pgsql_node_id(node.lower())) + ' '
+                    dbname_sql,dbname_params = self.get_value_filter_sql('"Target DBname"',dbname_list,'text[]')
 
-                        node_sql = node_sql + ') '
+                    if limit == None and after_restore_id == None and since == None and until == None:
+                        return self.execute_listing('SELECT \"RestoreID\",\"RestoreDef\",\"BckID\",\"Finished\",backup_server_id AS \"ID.\",\"Backup server\",target_pgsql_node_id AS \"ID\",\"Target PgSQL node\",\"Target DBname\",\"Duration\",\"Status\" FROM show_restore_catalog WHERE TRUE ' + server_sql + node_sql + dbname_sql,
+                                                    server_params + node_params + dbname_params)
 
-                    else:
-                        node_sql = ''
-
-                    if dbname_list != None:
-                        dbname_sql = 'AND (FALSE '
-
-                        for dbname in dbname_list:
-                            dbname_sql = dbname_sql + 'OR "Target DBname" = \'' + dbname + '\' '
-
-                        dbname_sql = dbname_sql + ') '
-
-                    else:
-                        dbname_sql = ''
+                    keyset_sql,keyset_params = self.get_keyset_sql('restore_id',after_restore_id,since,until,limit)
 
-                    self.cur.execute('SELECT \"RestoreID\",\"RestoreDef\",\"BckID\",\"Finished\",backup_server_id AS \"ID.\",\"Backup server\",target_pgsql_node_id AS \"ID\",\"Target PgSQL node\",\"Target DBname\",\"Duration\",\"Status\" FROM show_restore_catalog WHERE TRUE ' + server_sql + node_sql + dbname_sql)
-
-                    return self.cur
+                    return self.execute_listing('SELECT \"RestoreID\",\"RestoreDef\",\"BckID\",\"Finished\",backup_server_id AS \"ID.\",\"Backup server\",target_pgsql_node_id AS \"ID\",\"Target PgSQL node\",\"Target DBname\",\"Duration\",\"Status\" FROM show_restore_catalog_keyset WHERE TRUE ' + server_sql + node_sql + dbname_sql + keyset_sql,
+                                                server_params + node_params + dbname_params + keyset_params)
 
                 except psycopg2.Error as e:
                     raise e
@@ -775,7 +1167,7 @@ class PgbackmanDB():
         """A function to get all details of a backup job"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
@@ -792,7 +1184,11 @@ class PgbackmanDB():
                         result['Started'] = str(record[3])
                         result['Finished'] = str(record[4])
                         result['Duration'] = str(record[6])
+                        result['Queue wait'] = str(record[40])
+                        result['Throttled'] = str(record[41])
                         result['Total size'] = str(record[29])
+                        result['Estimated size'] = str(record[44])
+                        result['DBname size'] = str(record[43])
                         result['Execution method'] = str(record[32])
                         result['Execution status'] = str(record[31])
                         result['##'] = ''
@@ -809,6 +1205,10 @@ class PgbackmanDB():
                         result['Retention'] = str(record[10])
                         result['Backup code'] = str(record[30])
                         result['Extra parameters'] = str(record[14])
+                        result['Dump compression'] = str(record[39])
+                        result['Parallel jobs'] = str(record[37])
+                        result['Compression'] = str(record[38])
+                        result['Bandwidth limit'] = str(record[42])
                         result['####'] = ''
                         result['DB dump file'] = str(record[20]) + " (" + str(record[22]) + ")"
                         result['DB log file'] = str(record[21])
@@ -821,6 +1221,8 @@ class PgbackmanDB():
                         result['DB config dump file'] = str(record[26]) + " (" + str(record[28]) + ")"
                         result['DB config log file'] = str(record[27])
                         result['########'] = ''
+                        result['Manifest file'] = str(record[45])
+                        result['#########'] = ''
                         result['On disk until'] = str(record[5])
                         result['Error message'] = str(record[33])
 
@@ -842,7 +1244,7 @@ class PgbackmanDB():
         """A function to get all details of a restore job"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
@@ -965,7 +1367,7 @@ class PgbackmanDB():
         """A function to get a list with snapshot jobs in progress"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
@@ -983,6 +1385,32 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def show_backups_in_progress(self):
+        """A function to get a list with backup jobs in progress"""
+
+        try:
+            self.pg_connect_ro()
+
+            if self.cur:
+                try:
+
+                    self.cur.execute('SELECT \"ProcPID\",\"DefID\",\"SnapshotID\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Code\",\"Started\",\"Elapsed time\",\"Tables\",\"Size\",\"Previous size\",\"Progress\",\"ETA\" FROM show_backups_in_progress')
+
+                    return self.cur
+
+                except psycopg2.Error as e:
+                    raise e
+
+            self.pg_close()
+
+        except psycopg2.Error as e:
+            raise e
+
+
     # ############################################
     # Method
     # ############################################
@@ -991,7 +1419,7 @@ class PgbackmanDB():
         """A function to get a list with restores jobs in progress"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
@@ -1120,6 +1548,11 @@ class PgbackmanDB():
     def get_backup_server_fqdn(self,param):
         """A function to get the FQDN of a backup server"""
 
+        data = self.lookup_cache.get('backup_server_fqdn',str(param))
+
+        if data is not None:
+            return data
+
         try:
             self.pg_connect()
 
@@ -1128,6 +1561,9 @@ class PgbackmanDB():
                     self.cur.execute('SELECT get_backup_server_fqdn(%s)',(param,))
 
                     data = self.cur.fetchone()[0]
+
+                    self.lookup_cache.set('backup_server_fqdn',str(param),data)
+
                     return data
 
                 except Exception as e:
@@ -1146,6 +1582,11 @@ class PgbackmanDB():
     def get_backup_server_id(self,param):
         """A function to get the ID of a backup server"""
 
+        data = self.lookup_cache.get('backup_server_id',str(param))
+
+        if data is not None:
+            return data
+
         try:
             self.pg_connect()
 
@@ -1154,6 +1595,10 @@ class PgbackmanDB():
                     self.cur.execute('SELECT get_backup_server_id(%s)',(param,))
 
                     data = self.cur.fetchone()[0]
+
+                    self.lookup_cache.set('backup_server_id',str(param),data)
+                    self.lookup_cache.set('backup_server_fqdn',str(data),param)
+
                     return data
 
                 except psycopg2.Error as e:
@@ -1172,6 +1617,11 @@ class PgbackmanDB():
     def get_pgsql_node_fqdn(self,param):
         """A function to get the FQDN of a PgSQL node"""
 
+        data = self.lookup_cache.get('pgsql_node_fqdn',str(param))
+
+        if data is not None:
+            return data
+
         try:
             self.pg_connect()
 
@@ -1180,6 +1630,9 @@ class PgbackmanDB():
                     self.cur.execute('SELECT get_pgsql_node_fqdn(%s)',(param,))
 
                     data = self.cur.fetchone()[0]
+
+                    self.lookup_cache.set('pgsql_node_fqdn',str(param),data)
+
                     return data
 
                 except psycopg2.Error as e:
@@ -1198,6 +1651,11 @@ class PgbackmanDB():
     def get_pgsql_node_id(self,param):
         """A function to get the ID of a PgSQL node"""
 
+        data = self.lookup_cache.get('pgsql_node_id',str(param))
+
+        if data is not None:
+            return data
+
         try:
             self.pg_connect()
 
@@ -1206,6 +1664,10 @@ class PgbackmanDB():
                     self.cur.execute('SELECT get_pgsql_node_id(%s)',(param,))
 
                     data = self.cur.fetchone()[0]
+
+                    self.lookup_cache.set('pgsql_node_id',str(param),data)
+                    self.lookup_cache.set('pgsql_node_fqdn',str(data),param)
+
                     return data
 
                 except psycopg2.Error as e:
@@ -1217,6 +1679,26 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def invalidate_pgsql_node_lookup_cache(self):
+        """A function to drop cached PgSQL node IDs and FQDNs"""
+
+        self.lookup_cache.invalidate('pgsql_node_id','pgsql_node_fqdn')
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def invalidate_lookup_cache(self):
+        """A function to drop all cached backup server and PgSQL node IDs and FQDNs"""
+
+        self.lookup_cache.invalidate()
+
+
     # ############################################
     # Method
     # ############################################
@@ -1373,6 +1855,42 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def update_backup_in_progress(self,backup_server_id,procpid,pgsql_node_id,dbname,def_id,snapshot_id,backup_code,started,
+                                  tables_dumped,tables_total,bytes_written):
+        """A function to update the progress of a running backup"""
+
+        try:
+            self.pg_connect()
+
+            if self.cur:
+                try:
+
+                    self.cur.execute('SELECT update_backup_in_progress(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(backup_server_id,
+                                                                                                            procpid,
+                                                                                                            pgsql_node_id,
+                                                                                                            dbname,
+                                                                                                            def_id,
+                                                                                                            snapshot_id,
+                                                                                                            backup_code,
+                                                                                                            started,
+                                                                                                            tables_dumped,
+                                                                                                            tables_total,
+                                                                                                            bytes_written))
+                    self.conn.commit()
+
+                except psycopg2.Error as e:
+                    raise e
+
+            self.pg_close()
+
+        except psycopg2.Error as e:
+            raise e
+
+
     # ############################################
     # Method
     # ############################################
@@ -1380,7 +1898,8 @@ class PgbackmanDB():
     def register_backup_catalog(self,def_id,procpid,backup_server_id,pgsql_node_id,dbname,started,finished,duration,pg_dump_file,
                                     pg_dump_file_size,pg_dump_log_file,pg_dump_roles_file,pg_dump_roles_file_size,pg_dump_roles_log_file,
                                     pg_dump_dbconfig_file,pg_dump_dbconfig_file_size,pg_dump_dbconfig_log_file,global_log_file,execution_status,
-                                    execution_method,error_message,snapshot_id,role_list,pgsql_node_release,pg_dump_release):
+                                    execution_method,error_message,snapshot_id,role_list,pgsql_node_release,pg_dump_release,parallel_jobs=None,compression=None,queue_wait=None,throttled=None,
+                                    dbname_size=None,estimated_size=None,manifest_file=None,checksum=None):
 
         """A function to update the backup job catalog"""
 
@@ -1391,7 +1910,7 @@ class PgbackmanDB():
             if self.cur:
                 try:
 
-                    self.cur.execute('SELECT register_backup_catalog(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(def_id,
+                    self.cur.execute('SELECT register_backup_catalog(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(def_id,
                                                                                                                                                    procpid,
                                                                                                                                                    backup_server_id,
                                                                                                                                                    pgsql_node_id,
@@ -1415,7 +1934,15 @@ class PgbackmanDB():
                                                                                                                                                    snapshot_id,
                                                                                                                                                    role_list,
                                                                                                                                                    pgsql_node_release,
-                                                                                                                                                   pg_dump_release))
+                                                                                                                                                   pg_dump_release,
+                                                                                                                                                   parallel_jobs,
+                                                                                                                                                   compression,
+                                                                                                                                                   queue_wait,
+                                                                                                                                                   throttled,
+                                                                                                                                                   dbname_size,
+                                                                                                                                                   estimated_size,
+                                                                                                                                                   manifest_file,
+                                                                                                                                                   checksum))
                     self.conn.commit()
 
                 except psycopg2.Error as e:
@@ -1427,6 +1954,51 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def register_backup_catalog_batch(self,catalog_records):
+        """
+        A function to update the backup job catalog with the backups
+        of a node batch in one transaction. Every record has the
+        arguments of register_backup_catalog()
+        """
+
+        try:
+            self.pg_connect()
+
+            if self.cur:
+
+                #
+                # Connections are in autocommit mode. The records are
+                # registered in an explicit transaction, if one of
+                # them fails none of them is saved and the caller can
+                # save all of them as pending updates.
+                #
+
+                self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_READ_COMMITTED)
+
+                try:
+                    for catalog_record in catalog_records:
+                        self.cur.execute('SELECT register_backup_catalog(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',tuple(catalog_record))
+
+                    self.conn.commit()
+
+                except psycopg2.Error as e:
+                    self.conn.rollback()
+                    raise e
+
+                finally:
+                    if not self.conn.closed:
+                        self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+
+            self.pg_close()
+
+        except psycopg2.Error as e:
+            raise e
+
+
     # ############################################
     # Method
     # ############################################
@@ -1781,12 +2353,11 @@ class PgbackmanDB():
         """A function to get a list with all jobs waiting to be processed by pgbackman_control"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT * FROM show_jobs_queue')
-                    self.conn.commit()
 
                     return self.cur
 
@@ -1807,12 +2378,11 @@ class PgbackmanDB():
         """A function to get the default configuration for a backup server"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT "Parameter","Value","Description" FROM show_backup_server_config WHERE server_id = %s',(backup_server_id,))
-                    self.conn.commit()
 
                     return self.cur
 
@@ -1832,12 +2402,11 @@ class PgbackmanDB():
         """A function to get the default configuration for a pgsql node"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT "Parameter","Value","Description" FROM show_pgsql_node_config WHERE node_id = %s',(pgsql_node_id,))
-                    self.conn.commit()
 
                     return self.cur
 
@@ -1854,103 +2423,137 @@ class PgbackmanDB():
     # Method
     # ############################################
 
-    def show_pgbackman_stats(self):
-        """A function to get pgbackman global stats"""
+    def get_stats_sql(self,id_column=None):
+        """A function to build the query used by the show_*_stats functions. Every table is read once using FILTER aggregates"""
+
+        if id_column:
+            where_sql = 'WHERE ' + id_column + ' = %(id)s '
+        else:
+            where_sql = ''
+
+        sql = ('SELECT * FROM '
+               '(SELECT count(DISTINCT backup_server_id) AS backup_server_cnt, '
+               'count(DISTINCT pgsql_node_id) AS pgsql_node_cnt, '
+               'count(DISTINCT (pgsql_node_id,dbname)) AS dbname_cnt, '
+               'count(*) FILTER (WHERE job_status = \'ACTIVE\') AS backup_jobs_active_cnt, '
+               'count(*) FILTER (WHERE job_status = \'STOPPED\') AS backup_jobs_stopped_cnt, '
+               'count(*) FILTER (WHERE backup_code = \'CLUSTER\') AS backup_jobs_cluster_cnt, '
+               'count(*) FILTER (WHERE backup_code = \'DATA\') AS backup_jobs_data_cnt, '
+               'count(*) FILTER (WHERE backup_code = \'FULL\') AS backup_jobs_full_cnt, '
+               'count(*) FILTER (WHERE backup_code = \'SCHEMA\') AS backup_jobs_schema_cnt '
+               'FROM backup_definition ' + where_sql + ') AS bd, '
+               '(SELECT count(*) FILTER (WHERE execution_status = \'SUCCEEDED\') AS backup_catalog_succeeded_cnt, '
+               'count(*) FILTER (WHERE execution_status = \'ERROR\') AS backup_catalog_error_cnt, '
+               'pg_size_pretty(sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size)) AS backup_space, '
+               'sum(duration) AS backup_duration, '
+               'date_trunc(\'seconds\',min(finished)) AS oldest_backup_job, '
+               'date_trunc(\'seconds\',max(finished)) AS newest_backup_job '
+               'FROM backup_catalog ' + where_sql + ') AS bc, '
+               '(SELECT count(*) AS job_queue_cnt FROM job_queue ' + where_sql + ') AS jq')
+
+        if id_column != 'pgsql_node_id':
+            sql = sql + (', (SELECT count(*) AS defid_force_deletion_cnt FROM catalog_entries_to_delete ' + where_sql + ') AS ce')
+
+        if id_column is None:
+            sql = sql + (', (SELECT count(*) FILTER (WHERE status = \'RUNNING\') AS backup_server_running_cnt, '
+                         'count(*) FILTER (WHERE status = \'STOPPED\') AS backup_server_stopped_cnt '
+                         'FROM backup_server) AS bs, '
+                         '(SELECT count(*) FILTER (WHERE status = \'RUNNING\') AS pgsql_node_running_cnt, '
+                         'count(*) FILTER (WHERE status = \'STOPPED\') AS pgsql_node_stopped_cnt '
+                         'FROM pgsql_node) AS pn')
+
+        return sql
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_stats_data(self,id_column=None,ref_id=None,scope=None):
+        """A function to get the stats used by the show_*_stats functions as a dictionary, from pgbackman_stats_snapshot if scope is defined"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
-                    self.cur.execute("SELECT count(*) FROM backup_server WHERE status = 'RUNNING'")
-                    backup_server_running_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_server WHERE status = 'STOPPED'")
-                    backup_server_stopped_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM pgsql_node WHERE status = 'RUNNING'")
-                    pgsql_node_running_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM pgsql_node WHERE status = 'STOPPED'")
-                    pgsql_node_stopped_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM (SELECT DISTINCT ON (pgsql_node_id,dbname) def_id FROM backup_definition) AS cnt")
-                    dbname_cnt = self.cur.fetchone()[0]
+                    if scope:
+                        self.cur.execute('SELECT *,pg_size_pretty(backup_space) AS backup_space FROM pgbackman_stats_snapshot WHERE scope = %s AND ref_id = %s',(scope,ref_id))
+                    else:
+                        self.cur.execute(self.get_stats_sql(id_column),{'id':ref_id})
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE job_status = 'ACTIVE'")
-                    backup_jobs_active_cnt = self.cur.fetchone()[0]
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE job_status = 'STOPPED'")
-                    backup_jobs_stopped_cnt = self.cur.fetchone()[0]
+                    colnames = [desc[0] for desc in self.cur.description]
+                    row = self.cur.fetchone()
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'CLUSTER'")
-                    backup_jobs_cluster_cnt = self.cur.fetchone()[0]
+                    if row is None:
+                        raise psycopg2.ProgrammingError('No stats snapshot available. Check stats_snapshot in the pgbackman_maintenance section of the configuration')
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'DATA'")
-                    backup_jobs_data_cnt = self.cur.fetchone()[0]
+                    return dict(zip(colnames,row))
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'FULL'")
-                    backup_jobs_full_cnt = self.cur.fetchone()[0]
+                except psycopg2.Error as e:
+                    raise e
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'SCHEMA'")
-                    backup_jobs_schema_cnt = self.cur.fetchone()[0]
+            self.pg_close()
 
-                    self.cur.execute("SELECT count(*) FROM backup_catalog WHERE execution_status = 'SUCCEEDED'")
-                    backup_catalog_succeeded_cnt = self.cur.fetchone()[0]
+        except psycopg2.Error as e:
+            raise e
 
-                    self.cur.execute("SELECT count(*) FROM backup_catalog WHERE execution_status = 'ERROR'")
-                    backup_catalog_error_cnt = self.cur.fetchone()[0]
+    # ############################################
+    # Method
+    # ############################################
 
-                    self.cur.execute("SELECT pg_size_pretty(sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size)) FROM backup_catalog")
-                    backup_space = self.cur.fetchone()[0]
+    def get_stats_result(self,data,result):
+        """A function to add the backup definition and catalog stats to the result of the show_*_stats functions"""
 
-                    self.cur.execute("SELECT sum(duration) FROM backup_catalog")
-                    backup_duration = self.cur.fetchone()[0]
+        result['Different databases'] = str(data['dbname_cnt'])
+        result['Active Backup job defs'] = str(data['backup_jobs_active_cnt'])
+        result['Stopped Backup job defs'] = str(data['backup_jobs_stopped_cnt'])
+        result['Backup job defs with CLUSTER code'] = str(data['backup_jobs_cluster_cnt'])
+        result['Backup job defs with DATA code'] = str(data['backup_jobs_data_cnt'])
+        result['Backup job defs with FULL code'] = str(data['backup_jobs_full_cnt'])
+        result['Backup job defs with SCHEMA code'] = str(data['backup_jobs_schema_cnt'])
+        result['###'] = ''
+        result['Succeeded backups in catalog'] = str(data['backup_catalog_succeeded_cnt'])
+        result['Faulty backups in catalog'] = str(data['backup_catalog_error_cnt'])
+        result['Total size of backups in catalog'] = str(data['backup_space'])
+        result['Total running time of backups in catalog'] = str(data['backup_duration'])
+        result['Oldest backup in catalog'] = str(data['oldest_backup_job'])
+        result['Newest backup in catalog'] = str(data['newest_backup_job'])
+        result['####'] = ''
+        result['Jobs waiting to be processed by pgbackman_control'] = str(data['job_queue_cnt'])
 
-                    self.cur.execute("select date_trunc('seconds',min(finished)) from backup_catalog;")
-                    oldest_backup_job = self.cur.fetchone()[0]
+        if 'defid_force_deletion_cnt' in data and data['defid_force_deletion_cnt'] is not None:
+            result['Forced deletion of backups waiting to be processed'] = str(data['defid_force_deletion_cnt'])
 
-                    self.cur.execute("select date_trunc('seconds',max(finished)) from backup_catalog;")
-                    newest_backup_job = self.cur.fetchone()[0]
+        if 'refreshed' in data:
+            result['#####'] = ''
+            result['Stats snapshot refreshed'] = str(data['refreshed'])
 
-                    self.cur.execute("SELECT count(*) FROM job_queue")
-                    job_queue_cnt = self.cur.fetchone()[0]
+        return result
 
-                    self.cur.execute("SELECT count(*) FROM catalog_entries_to_delete")
-                    defid_force_deletion_cnt = self.cur.fetchone()[0]
+    # ############################################
+    # Method
+    # ############################################
 
-                    result =  OrderedDict()
+    def show_pgbackman_stats(self,snapshot=False):
+        """A function to get pgbackman global stats"""
 
-                    result['Running Backup servers'] = str(backup_server_running_cnt)
-                    result['Stopped Backup servers'] = str(backup_server_stopped_cnt)
-                    result['#'] = ''
-                    result['Running PgSQL nodes'] = str(pgsql_node_running_cnt)
-                    result['Stopped PgSQL nodes'] = str(pgsql_node_stopped_cnt)
-                    result['##'] = ''
-                    result['Different databases'] = str(dbname_cnt)
-                    result['Active Backup job defs'] = str(backup_jobs_active_cnt)
-                    result['Stopped Backup job defs'] = str(backup_jobs_stopped_cnt)
-                    result['Backup job defs with CLUSTER code'] = str(backup_jobs_cluster_cnt)
-                    result['Backup job defs with DATA code'] = str(backup_jobs_data_cnt)
-                    result['Backup job defs with FULL code'] = str(backup_jobs_full_cnt)
-                    result['Backup job defs with SCHEMA code'] = str(backup_jobs_schema_cnt)
-                    result['###'] = ''
-                    result['Succeeded backups in catalog'] = str(backup_catalog_succeeded_cnt)
-                    result['Faulty backups in catalog'] = str(backup_catalog_error_cnt)
-                    result['Total size of backups in catalog'] = str(backup_space)
-                    result['Total running time of backups in catalog'] = str(backup_duration)
-                    result['Oldest backup in catalog'] = str(oldest_backup_job)
-                    result['Newest backup in catalog'] = str(newest_backup_job)
-                    result['####'] = ''
-                    result['Jobs waiting to be processed by pgbackman_control'] = str(job_queue_cnt)
-                    result['Forced deletion of backups waiting to be processed'] = str(defid_force_deletion_cnt)
+        try:
+            if snapshot:
+                data = self.get_stats_data(None,0,'GLOBAL')
+            else:
+                data = self.get_stats_data()
 
-                    return result
+            result =  OrderedDict()
 
-                except psycopg2.Error as e:
-                    raise e
+            result['Running Backup servers'] = str(data['backup_server_running_cnt'])
+            result['Stopped Backup servers'] = str(data['backup_server_stopped_cnt'])
+            result['#'] = ''
+            result['Running PgSQL nodes'] = str(data['pgsql_node_running_cnt'])
+            result['Stopped PgSQL nodes'] = str(data['pgsql_node_stopped_cnt'])
+            result['##'] = ''
 
-            self.pg_close()
+            return self.get_stats_result(data,result)
 
         except psycopg2.Error as e:
             raise e
@@ -1960,95 +2563,53 @@ class PgbackmanDB():
     # Method
     # ############################################
 
-    def show_backup_server_stats(self,backup_server_id):
+    def show_backup_server_stats(self,backup_server_id,snapshot=False):
         """A function to get global stats for a backup server"""
 
         try:
-            self.pg_connect()
-
-            if self.cur:
-                try:
-
-                    backup_server_fqdn = self.get_backup_server_fqdn(backup_server_id)
-
-                    self.cur.execute("SELECT count(*) FROM (SELECT DISTINCT ON (pgsql_node_id) pgsql_node_id FROM backup_definition WHERE backup_server_id = %s) AS cnt",(backup_server_id,))
-                    pgsql_node_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM (SELECT DISTINCT ON (pgsql_node_id,dbname) def_id FROM backup_definition WHERE backup_server_id = %s) AS cnt",(backup_server_id,))
-                    dbname_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE job_status = 'ACTIVE' AND backup_server_id = %s",(backup_server_id,))
-                    backup_jobs_active_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE job_status = 'STOPPED' AND backup_server_id = %s",(backup_server_id,))
-                    backup_jobs_stopped_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'CLUSTER' AND backup_server_id = %s",(backup_server_id,))
-                    backup_jobs_cluster_cnt = self.cur.fetchone()[0]
+            backup_server_fqdn = self.get_backup_server_fqdn(backup_server_id)
 
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'DATA' AND backup_server_id = %s",(backup_server_id,))
-                    backup_jobs_data_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'FULL' AND backup_server_id = %s",(backup_server_id,))
-                    backup_jobs_full_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'SCHEMA' AND backup_server_id = %s",(backup_server_id,))
-                    backup_jobs_schema_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_catalog WHERE execution_status = 'SUCCEEDED' AND backup_server_id = %s",(backup_server_id,))
-                    backup_catalog_succeeded_cnt = self.cur.fetchone()[0]
+            if snapshot:
+                data = self.get_stats_data(None,backup_server_id,'BACKUP_SERVER')
+            else:
+                data = self.get_stats_data('backup_server_id',backup_server_id)
 
-                    self.cur.execute("SELECT count(*) FROM backup_catalog WHERE execution_status = 'ERROR' AND backup_server_id = %s",(backup_server_id,))
-                    backup_catalog_error_cnt = self.cur.fetchone()[0]
+            result =  OrderedDict()
 
-                    self.cur.execute("SELECT pg_size_pretty(sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size)) FROM backup_catalog WHERE backup_server_id = %s",(backup_server_id,))
-                    backup_space = self.cur.fetchone()[0]
+            result['Backup server'] = backup_server_fqdn
+            result['#'] = ''
+            result['PgSQL nodes using this backup server'] = str(data['pgsql_node_cnt'])
+            result['##'] = ''
 
-                    self.cur.execute("SELECT sum(duration) FROM backup_catalog WHERE backup_server_id = %s",(backup_server_id,))
-                    backup_duration = self.cur.fetchone()[0]
+            return self.get_stats_result(data,result)
 
-                    self.cur.execute("select date_trunc('seconds',min(finished)) from backup_catalog WHERE backup_server_id = %s",(backup_server_id,))
-                    oldest_backup_job = self.cur.fetchone()[0]
+        except psycopg2.Error as e:
+            raise e
 
-                    self.cur.execute("select date_trunc('seconds',max(finished)) from backup_catalog WHERE backup_server_id = %s",(backup_server_id,))
-                    newest_backup_job = self.cur.fetchone()[0]
 
-                    self.cur.execute("SELECT count(*) FROM job_queue WHERE backup_server_id = %s",(backup_server_id,))
-                    job_queue_cnt = self.cur.fetchone()[0]
+    # ############################################
+    # Method
+    # ############################################
 
-                    self.cur.execute("SELECT count(*) FROM catalog_entries_to_delete WHERE backup_server_id = %s",(backup_server_id,))
-                    defid_force_deletion_cnt = self.cur.fetchone()[0]
+    def show_pgsql_node_stats(self,pgsql_node_id,snapshot=False):
+        """A function to get global stats for a PgSQL node"""
 
-                    result =  OrderedDict()
+        try:
+            pgsql_node_fqdn = self.get_pgsql_node_fqdn(pgsql_node_id)
 
-                    result['Backup server'] = backup_server_fqdn
-                    result['#'] = ''
-                    result['PgSQL nodes using this backup server'] = str(pgsql_node_cnt)
-                    result['##'] = ''
-                    result['Different databases'] = str(dbname_cnt)
-                    result['Active Backup job defs'] = str(backup_jobs_active_cnt)
-                    result['Stopped Backup job defs'] = str(backup_jobs_stopped_cnt)
-                    result['Backup job defs with CLUSTER code'] = str(backup_jobs_cluster_cnt)
-                    result['Backup job defs with DATA code'] = str(backup_jobs_data_cnt)
-                    result['Backup job defs with FULL code'] = str(backup_jobs_full_cnt)
-                    result['Backup job defs with SCHEMA code'] = str(backup_jobs_schema_cnt)
-                    result['###'] = ''
-                    result['Succeeded backups in catalog'] = str(backup_catalog_succeeded_cnt)
-                    result['Faulty backups in catalog'] = str(backup_catalog_error_cnt)
-                    result['Total size of backups in catalog'] = str(backup_space)
-                    result['Total running time of backups in catalog'] = str(backup_duration)
-                    result['Oldest backup in catalog'] = str(oldest_backup_job)
-                    result['Newest backup in catalog'] = str(newest_backup_job)
-                    result['####'] = ''
-                    result['Jobs waiting to be processed by pgbackman_control'] = str(job_queue_cnt)
-                    result['Forced deletion of backups waiting to be processed'] = str(defid_force_deletion_cnt)
+            if snapshot:
+                data = self.get_stats_data(None,pgsql_node_id,'PGSQL_NODE')
+            else:
+                data = self.get_stats_data('pgsql_node_id',pgsql_node_id)
 
-                    return result
+            result =  OrderedDict()
 
-                except psycopg2.Error as e:
-                    raise e
+            result['PgSQL node'] = "[" + str(pgsql_node_id) + "] " + pgsql_node_fqdn
+            result['#'] = ''
+            result['Backup servers running backups for this Node'] = str(data['backup_server_cnt'])
+            result['##'] = ''
 
-            self.pg_close()
+            return self.get_stats_result(data,result)
 
         except psycopg2.Error as e:
             raise e
@@ -2058,86 +2619,16 @@ class PgbackmanDB():
     # Method
     # ############################################
 
-    def show_pgsql_node_stats(self,pgsql_node_id):
-        """A function to get global stats for a backup server"""
+    def refresh_stats_snapshot(self):
+        """A function to refresh the stats in pgbackman_stats_snapshot"""
 
         try:
             self.pg_connect()
 
             if self.cur:
                 try:
-
-                    pgsql_node_fqdn = self.get_pgsql_node_fqdn(pgsql_node_id)
-
-                    self.cur.execute("SELECT count(*) FROM (SELECT DISTINCT ON (backup_server_id) backup_server_id FROM backup_definition WHERE pgsql_node_id = %s) AS cnt",(pgsql_node_id,))
-                    backup_server_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM (SELECT DISTINCT ON (pgsql_node_id,dbname) def_id FROM backup_definition WHERE pgsql_node_id = %s) AS cnt",(pgsql_node_id,))
-                    dbname_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE job_status = 'ACTIVE' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_jobs_active_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE job_status = 'STOPPED' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_jobs_stopped_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'CLUSTER' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_jobs_cluster_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'DATA' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_jobs_data_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'FULL' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_jobs_full_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_definition WHERE backup_code = 'SCHEMA' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_jobs_schema_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_catalog WHERE execution_status = 'SUCCEEDED' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_catalog_succeeded_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM backup_catalog WHERE execution_status = 'ERROR' AND pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_catalog_error_cnt = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT pg_size_pretty(sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size)) FROM backup_catalog WHERE pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_space = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT sum(duration) FROM backup_catalog WHERE pgsql_node_id = %s",(pgsql_node_id,))
-                    backup_duration = self.cur.fetchone()[0]
-
-                    self.cur.execute("select date_trunc('seconds',min(finished)) from backup_catalog WHERE pgsql_node_id = %s",(pgsql_node_id,))
-                    oldest_backup_job = self.cur.fetchone()[0]
-
-                    self.cur.execute("select date_trunc('seconds',max(finished)) from backup_catalog WHERE pgsql_node_id = %s",(pgsql_node_id,))
-                    newest_backup_job = self.cur.fetchone()[0]
-
-                    self.cur.execute("SELECT count(*) FROM job_queue WHERE pgsql_node_id = %s",(pgsql_node_id,))
-                    job_queue_cnt = self.cur.fetchone()[0]
-
-                    result =  OrderedDict()
-
-                    result['PgSQL node'] = "[" + str(pgsql_node_id) + "] " + pgsql_node_fqdn
-                    result['#'] = ''
-                    result['Backup servers running backups for this Node'] = str(backup_server_cnt)
-                    result['##'] = ''
-                    result['Different databases'] = str(dbname_cnt)
-                    result['Active Backup job defs'] = str(backup_jobs_active_cnt)
-                    result['Stopped Backup job defs'] = str(backup_jobs_stopped_cnt)
-                    result['Backup job defs with CLUSTER code'] = str(backup_jobs_cluster_cnt)
-                    result['Backup job defs with DATA code'] = str(backup_jobs_data_cnt)
-                    result['Backup job defs with FULL code'] = str(backup_jobs_full_cnt)
-                    result['Backup job defs with SCHEMA code'] = str(backup_jobs_schema_cnt)
-                    result['###'] = ''
-                    result['Succeeded backups in catalog'] = str(backup_catalog_succeeded_cnt)
-                    result['Faulty backups in catalog'] = str(backup_catalog_error_cnt)
-                    result['Total size of backups in catalog'] = str(backup_space)
-                    result['Total running time of backups in catalog'] = str(backup_duration)
-                    result['Oldest backup in catalog'] = str(oldest_backup_job)
-                    result['Newest backup in catalog'] = str(newest_backup_job)
-                    result['####'] = ''
-                    result['Jobs waiting to be processed by pgbackman_control'] = str(job_queue_cnt)
-
-                    return result
+                    self.cur.execute('SELECT refresh_pgbackman_stats_snapshot()')
+                    self.conn.commit()
 
                 except psycopg2.Error as e:
                     raise e
@@ -2231,12 +2722,11 @@ class PgbackmanDB():
         """A function to get a list with all backup definitions with empty catalogs"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT \"DefID\",\"Registered\",backup_server_id AS \"ID.\",\"Backup server\",pgsql_node_id AS \"ID\",\"PgSQL node\",\"DBname\",\"Schedule\",\"Code\",\"Retention\",\"Status\",\"Parameters\" FROM show_empty_backup_catalogs')
-                    self.conn.commit()
 
                     return self.cur
 
@@ -2393,7 +2883,8 @@ class PgbackmanDB():
     def update_pgsql_node_config(self,pgsql_node_id,backup_minutes_interval,backup_hours_interval,backup_weekday_cron,
                                  backup_month_cron,backup_day_month_cron,backup_code,retention_period,retention_redundancy,automatic_deletion_retention,
                                  extra_backup_parameters,extra_restore_parameters,backup_job_status,domain,logs_email,admin_user,pgport,pgnode_backup_partition,
-                                 pgnode_crontab_file,pgsql_node_status):
+                                 pgnode_crontab_file,pgsql_node_status,parallel_jobs=None,backup_spread=None,backup_spread_max_concurrency=None,bandwidth_limit=None,
+                                 backup_batch=None,backup_batch_jobs=None):
         """A function to update the configuration of a pgsql node"""
 
         try:
@@ -2401,7 +2892,7 @@ class PgbackmanDB():
 
             if self.cur:
                 try:
-                    self.cur.execute('SELECT update_pgsql_node_config(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(pgsql_node_id,
+                    self.cur.execute('SELECT update_pgsql_node_config(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(pgsql_node_id,
                                                                                                                                      backup_minutes_interval,
                                                                                                                                      backup_hours_interval,
                                                                                                                                      backup_weekday_cron,
@@ -2420,7 +2911,13 @@ class PgbackmanDB():
                                                                                                                                      pgport,
                                                                                                                                      pgnode_backup_partition,
                                                                                                                                      pgnode_crontab_file,
-                                                                                                                                     pgsql_node_status))
+                                                                                                                                     pgsql_node_status,
+                                                                                                                                     parallel_jobs,
+                                                                                                                                     backup_spread,
+                                                                                                                                     backup_spread_max_concurrency,
+                                                                                                                                     bandwidth_limit,
+                                                                                                                                     backup_batch,
+                                                                                                                                     backup_batch_jobs))
 
                     self.conn.commit()
 
@@ -2762,6 +3259,58 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_backup_manifest(self,bck_id):
+        """A function to get the manifest file, its checksum and the backup server FQDN of a backup"""
+
+        try:
+            self.pg_connect_ro()
+
+            if self.cur:
+                try:
+                    self.cur.execute('SELECT manifest_file,checksum,get_backup_server_fqdn(backup_server_id) FROM backup_catalog WHERE bck_id = %s',(bck_id,))
+
+                    data = self.cur.fetchone()
+                    return data
+
+                except psycopg2.Error as e:
+                    raise e
+
+            self.pg_close()
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_backup_size_ratio(self,pgsql_node_id,dbname,backup_code,def_id):
+        """A function to get the dump size / database size ratio of the last backups of a backup definition or snapshot"""
+
+        try:
+            self.pg_connect()
+
+            if self.cur:
+                try:
+                    self.cur.execute('SELECT get_backup_size_ratio(%s,%s,%s,%s)',(pgsql_node_id,dbname,backup_code,def_id))
+
+                    data = self.cur.fetchone()[0]
+                    return data
+
+                except psycopg2.Error as e:
+                    raise e
+
+            self.pg_close()
+
+        except Exception as e:
+            raise e
+
+
     # ############################################
     # Method
     # ############################################
@@ -2925,7 +3474,7 @@ class PgbackmanDB():
     # ############################################
 
     def update_backup_definition(self,def_id,minutes_cron,hours_cron,day_month_cron,month_cron,weekday_cron,retention_period,
-                                 retention_redundancy,extra_backup_parameters,job_status,remarks):
+                                 retention_redundancy,extra_backup_parameters,job_status,remarks,parallel_jobs=None,dump_compression=None,bandwidth_limit=None):
         """A function to update a backup definition"""
 
         try:
@@ -2933,7 +3482,7 @@ class PgbackmanDB():
 
             if self.cur:
                 try:
-                    self.cur.execute('SELECT update_backup_definition(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(def_id,
+                    self.cur.execute('SELECT update_backup_definition(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',(def_id,
                                                                                                           minutes_cron,
                                                                                                           hours_cron,
                                                                                                           day_month_cron,
@@ -2943,7 +3492,10 @@ class PgbackmanDB():
                                                                                                           retention_redundancy,
                                                                                                           extra_backup_parameters,
                                                                                                           job_status,
-                                                                                                          remarks))
+                                                                                                          remarks,
+                                                                                                          parallel_jobs,
+                                                                                                          dump_compression,
+                                                                                                          bandwidth_limit))
                     self.conn.commit()
 
                 except psycopg2.Error as e:
@@ -2969,53 +3521,23 @@ class PgbackmanDB():
                 try:
 
                     if from_backup_server.isdigit():
-                        from_server_id = str(from_backup_server)
+                        from_server_id = int(from_backup_server)
                     else:
-                        from_server_id = str(self.get_backup_server_id(from_backup_server.lower()))
+                        from_server_id = self.get_backup_server_id(from_backup_server.lower())
 
                     if to_backup_server.isdigit():
-                        to_server_id = str(to_backup_server)
-                    else:
-                        to_server_id = str(self.get_backup_server_id(to_backup_server.lower()))
-
-                    if pgsql_node_list != None:
-                        node_sql = 'AND (FALSE '
-
-                        for node in pgsql_node_list:
-                            if node.isdigit():
-                                node_sql = node_sql + 'OR pgsql_node_id = ' + str(node) + ' '
-                            else:
-                                node_sql = node_sql + 'OR pgsql_node_id = ' +  str(self.get_pgsql_node_id(node.lower())) + ' '
-
-                        node_sql = node_sql + ') '
-
-                    else:
-                        node_sql = ''
-
-                    if dbname_list != None:
-                        dbname_sql = 'AND (FALSE '
-
-                        for dbname in dbname_list:
-                            dbname_sql = dbname_sql + 'OR "dbname" = \'' + dbname + '\' '
-
-                        dbname_sql = dbname_sql + ') '
-
+                        to_server_id = int(to_backup_server)
                     else:
-                        dbname_sql = ''
+                        to_server_id = self.get_backup_server_id(to_backup_server.lower())
 
-                    if def_id_list != None:
-                        def_id_sql = 'AND (FALSE '
+                    node_sql,node_params = self.get_pgsql_node_filter_sql('pgsql_node_id',pgsql_node_list)
 
-                        for def_id in def_id_list:
-                            def_id_sql = def_id_sql + 'OR def_id = \'' + def_id + '\' '
+                    dbname_sql,dbname_params = self.get_value_filter_sql('"dbname"',dbname_list,'text[]')
 
-                        def_id_sql = def_id_sql + ') '
-
-                    else:
-                        def_id_sql = ''
+                    def_id_sql,def_id_params = self.get_value_filter_sql('def_id',def_id_list,'bigint[]')
 
-
-                    self.cur.execute('UPDATE backup_definition SET backup_server_id = ' + to_server_id + ' WHERE backup_server_id = ' + from_server_id + ' ' + node_sql + dbname_sql + def_id_sql)
+                    self.cur.execute('UPDATE backup_definition SET backup_server_id = %s WHERE backup_server_id = %s ' + node_sql + dbname_sql + def_id_sql,
+                                     [to_server_id,from_server_id] + node_params + dbname_params + def_id_params)
 
                     self.conn.commit()
 
@@ -3111,6 +3633,66 @@ class PgbackmanDB():
     # Method
     # ############################################
 
+    def get_pgsql_node_config(self,pgsql_node_id):
+        """A function to get all default configuration parameters for a PgSQL node as a dictionary"""
+
+        try:
+            self.pg_connect()
+
+            if self.cur:
+                try:
+                    self.cur.execute('SELECT parameter,value FROM pgsql_node_config WHERE node_id = %s',(pgsql_node_id,))
+                    self.conn.commit()
+
+                    data = dict(self.cur.fetchall())
+
+                    if len(data) == 0:
+                        raise psycopg2.ProgrammingError('NodeID: %s does not exist in the system' % pgsql_node_id)
+
+                    return data
+
+                except psycopg2.Error as e:
+                    raise e
+
+            self.pg_close()
+
+        except psycopg2.Error as e:
+            raise e
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_backup_server_config(self,backup_server_id):
+        """A function to get all default configuration parameters for a backup server as a dictionary"""
+
+        try:
+            self.pg_connect()
+
+            if self.cur:
+                try:
+                    self.cur.execute('SELECT parameter,value FROM backup_server_config WHERE server_id = %s',(backup_server_id,))
+                    self.conn.commit()
+
+                    data = dict(self.cur.fetchall())
+
+                    if len(data) == 0:
+                        raise psycopg2.ProgrammingError('SrvID: %s does not exist in the system' % backup_server_id)
+
+                    return data
+
+                except psycopg2.Error as e:
+                    raise e
+
+            self.pg_close()
+
+        except psycopg2.Error as e:
+            raise e
+
+    # ############################################
+    # Method
+    # ############################################
+
     def get_pgsql_node_def_value(self,pgsql_node_id,parameter):
         """A function to get the value of an attribute from pgsql_node"""
 
@@ -3398,12 +3980,11 @@ class PgbackmanDB():
         """
         
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT "DefID"::bigint,"PgSQL node","DBname" FROM show_backup_definitions WHERE "Status" = \'ACTIVE\' AND backup_server_id = %s ORDER BY "PgSQL node","DBname"',(backup_server_id,))
-                    self.conn.commit()
 
                     return self.cur
 
@@ -3423,12 +4004,11 @@ class PgbackmanDB():
         """A function to get a list of all postgresql versions that have been configured for a backup server"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT parameter FROM backup_server_config WHERE parameter ~ $$^pgsql_bin_$$ and server_id = %s',(backup_server_id,))
-                    self.conn.commit()
 
                     return self.cur
 
@@ -3448,12 +4028,11 @@ class PgbackmanDB():
         """A function to get a list of all postgresql version that have been configured by default"""
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
                     self.cur.execute('SELECT replace(replace(parameter,$$pgsql_bin_$$,$$$$),$$_$$,$$.$$), value FROM backup_server_default_config WHERE parameter ~ $$^pgsql_bin_$$')
-                    self.conn.commit()
 
                     return self.cur
 
@@ -3587,6 +4166,117 @@ class PgbackmanDB():
             raise e
 
 
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_database_size(self,all_databases=False):
+        """
+        A function to get the size of the database of the
+        connection, or of all the databases of the PgSQL node if
+        all_databases is True.
+        """
+
+        try:
+            if self.cur:
+
+                if all_databases:
+                    self.cur.execute('SELECT sum(pg_database_size(oid))::bigint FROM pg_database WHERE datallowconn')
+                else:
+                    self.cur.execute('SELECT pg_database_size(current_database())')
+
+                self.conn.commit()
+
+                return self.cur.fetchone()[0]
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_database_table_count(self):
+        """
+        A function to get the number of tables in the database of the
+        connection, the tables pg_dump dumps the contents of.
+        """
+
+        try:
+            if self.cur:
+
+                self.cur.execute('SELECT count(*) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace ' +
+                                 'WHERE c.relkind = $$r$$ AND n.nspname !~ $$^pg_$$ AND n.nspname <> $$information_schema$$')
+                self.conn.commit()
+
+                return self.cur.fetchone()[0]
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method
+    # ############################################
+
+    def get_database_roles(self):
+        """
+        A function to get the roles owning something or having
+        privileges in the database of the connection, and all the
+        roles they are members of. Role names are returned quoted as
+        in a pg_dumpall output.
+        """
+
+        user_schema = '%s.nspname !~ $$^pg_$$ AND %s.nspname <> $$information_schema$$'
+
+        objects = ['SELECT datdba AS owner, datacl AS acl FROM pg_database WHERE datname = current_database()',
+                   'SELECT n.nspowner, n.nspacl FROM pg_namespace n WHERE ' + user_schema % ('n','n'),
+                   'SELECT c.relowner, c.relacl FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT NULL::oid, a.attacl FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid JOIN pg_namespace n ON n.oid = c.relnamespace WHERE a.attacl IS NOT NULL AND ' + user_schema % ('n','n'),
+                   'SELECT p.proowner, p.proacl FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT t.typowner, t.typacl FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT o.oprowner, NULL FROM pg_operator o JOIN pg_namespace n ON n.oid = o.oprnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT c.collowner, NULL FROM pg_collation c JOIN pg_namespace n ON n.oid = c.collnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT c.conowner, NULL FROM pg_conversion c JOIN pg_namespace n ON n.oid = c.connamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT o.opcowner, NULL FROM pg_opclass o JOIN pg_namespace n ON n.oid = o.opcnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT o.opfowner, NULL FROM pg_opfamily o JOIN pg_namespace n ON n.oid = o.opfnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT d.dictowner, NULL FROM pg_ts_dict d JOIN pg_namespace n ON n.oid = d.dictnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT c.cfgowner, NULL FROM pg_ts_config c JOIN pg_namespace n ON n.oid = c.cfgnamespace WHERE ' + user_schema % ('n','n'),
+                   'SELECT lanowner, lanacl FROM pg_language WHERE lanispl',
+                   'SELECT lomowner, lomacl FROM pg_largeobject_metadata',
+                   'SELECT fdwowner, fdwacl FROM pg_foreign_data_wrapper',
+                   'SELECT srvowner, srvacl FROM pg_foreign_server',
+                   'SELECT defaclrole, defaclacl FROM pg_default_acl']
+
+        try:
+            if self.cur:
+
+                if self.conn.server_version >= 90300:
+                    objects.append('SELECT evtowner, NULL FROM pg_event_trigger')
+
+                if self.conn.server_version >= 100000:
+                    objects.append('SELECT pubowner, NULL FROM pg_publication')
+                    objects.append('SELECT s.stxowner, NULL FROM pg_statistic_ext s JOIN pg_namespace n ON n.oid = s.stxnamespace WHERE ' + user_schema % ('n','n'))
+
+                self.cur.execute('WITH RECURSIVE objects(owner,acl) AS (' + ' UNION ALL '.join(objects) + '), ' +
+                                 'direct_roles(oid) AS (' +
+                                 'SELECT owner FROM objects WHERE owner IS NOT NULL ' +
+                                 'UNION ' +
+                                 'SELECT (aclexplode(acl)).grantee FROM objects WHERE acl IS NOT NULL), ' +
+                                 'roles(oid) AS (' +
+                                 'SELECT oid FROM direct_roles ' +
+                                 'UNION ' +
+                                 'SELECT m.roleid FROM pg_auth_members m JOIN roles r ON m.member = r.oid) ' +
+                                 'SELECT quote_ident(a.rolname) FROM roles r JOIN pg_roles a ON a.oid = r.oid ORDER BY 1')
+                self.conn.commit()
+
+                return [row[0] for row in self.cur.fetchall()]
+
+        except psycopg2.Error as e:
+            raise e
+
+
     # ############################################
     # Method
     # ############################################
@@ -3598,7 +4288,7 @@ class PgbackmanDB():
         """
 
         try:
-            self.pg_connect()
+            self.pg_connect_ro()
 
             if self.cur:
                 try:
@@ -3621,7 +4311,6 @@ class PgbackmanDB():
                     if parameter_status in ['job_queue']:
 
                         self.cur.execute('SELECT count(*) AS cnt FROM job_queue')
-                        self.conn.commit()
 
                         return self.cur.fetchone()[0]
 
@@ -3637,7 +4326,6 @@ class PgbackmanDB():
                     elif parameter_status in ['backup_last_status']:
 
                         self.cur.execute('SELECT lower("Status") FROM show_backup_catalog WHERE def_id = %s ORDER BY "Finished" DESC LIMIT 1',(def_id,))
-                        self.conn.commit()
 
                         data = self.cur.fetchone()
 
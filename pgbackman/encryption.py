@@ -0,0 +1,698 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import errno
+import fcntl
+import pipes
+import re
+import subprocess
+import time
+
+from distutils.spawn import find_executable
+
+from pgbackman.throttle import get_group_pids
+
+
+# ###########################
+# Class: PgbackmanEncryption
+# ###########################
+
+
+class PgbackmanEncryption():
+    """
+    Public-key encryption of dump files.
+
+    The backend is age or gpg (GnuPG). The files are encrypted for
+    the recipients defined in encryption_recipients, age public keys
+    or recipient files for age and key IDs for gpg. Only the public
+    keys are needed in the backup server to take backups, the
+    private key (the age identity file or the GnuPG secret key) is
+    only needed by pgbackman_restore.
+
+    The backend of an encrypted file is found with its file
+    extension, see get_file_encryption().
+    """
+
+    # backend: [program, file extension]
+
+    backends = {'age': ['age', '.age'],
+                'gpg': ['gpg', '.gpg']}
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,backend='age',recipients='',identity_file=''):
+        """ The Constructor."""
+
+        self.backend = backend.strip().lower()
+
+        if self.backend not in self.backends:
+            raise ValueError('Unknown encryption backend [%s]. Valid values: %s' % (self.backend,', '.join(sorted(self.backends.keys()))))
+
+        self.recipients = [recipient for recipient in re.split(r'[\s,]+',recipients) if recipient != '']
+        self.identity_file = identity_file.strip()
+
+        self.program = find_executable(self.backends[self.backend][0],os.getenv('PATH','') + os.pathsep + '/bin:/usr/bin')
+
+
+    # ############################################
+    # Method is_available()
+    # ############################################
+
+    def is_available(self):
+        """A function to check if the program used by the backend is installed"""
+
+        return self.program is not None
+
+
+    # ############################################
+    # Method get_file_extension()
+    # ############################################
+
+    def get_file_extension(self):
+        """A function to get the file extension of a file encrypted with this backend"""
+
+        return self.backends[self.backend][1]
+
+
+    # ############################################
+    # Method get_encrypt_args()
+    # ############################################
+
+    def get_encrypt_args(self):
+        """
+        A function to get the command that encrypts stdin to stdout
+        as a list of arguments. Raises ValueError if no recipients
+        are defined.
+        """
+
+        if self.recipients == []:
+            raise ValueError('No encryption recipients defined for the encryption backend [%s]' % self.backend)
+
+        if self.backend == 'age':
+            args = [self.program]
+
+            for recipient in self.recipients:
+
+                #
+                # A recipient starting with / is a file with age
+                # public keys
+                #
+
+                if recipient.startswith('/'):
+                    args = args + ['-R',recipient]
+                else:
+                    args = args + ['-r',recipient]
+
+        else:
+            args = [self.program,'--batch','--yes','--quiet','--trust-model','always','--encrypt']
+
+            for recipient in self.recipients:
+                args = args + ['-r',recipient]
+
+            args = args + ['-o','-']
+
+        return args
+
+
+    # ############################################
+    # Method get_encrypt_command()
+    # ############################################
+
+    def get_encrypt_command(self):
+        """A function to get the shell command that encrypts stdin to stdout"""
+
+        return ' '.join([pipes.quote(arg) for arg in self.get_encrypt_args()])
+
+
+    # ############################################
+    # Method get_decrypt_args()
+    # ############################################
+
+    def get_decrypt_args(self,dump_file):
+        """A function to get the command that writes a decrypted file to stdout as a list of arguments"""
+
+        program = self.program
+
+        if program is None:
+            program = self.backends[self.backend][0]
+
+        if self.backend == 'age':
+            args = [program,'-d']
+
+            if self.identity_file != '':
+                args = args + ['-i',self.identity_file]
+
+            return args + [dump_file]
+
+        return [program,'--batch','--quiet','--decrypt',dump_file]
+
+
+# ###########################
+# Class: PgbackmanEncryptedFile
+# ###########################
+
+
+class PgbackmanEncryptedFile():
+    """
+    File object writing encrypted data to a file.
+
+    The data written is encrypted by the program of the backend
+    while it is written, there is not a plaintext copy of the file
+    in the backup server. close() raises IOError if the program
+    fails.
+    """
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,encryption,file_name):
+        """ The Constructor."""
+
+        self.name = file_name
+
+        with open(file_name,'w') as output_file:
+            self.proc = subprocess.Popen(encryption.get_encrypt_args(),stdin=subprocess.PIPE,stdout=output_file,close_fds=True)
+
+
+    # ############################################
+    # Method write()
+    # ############################################
+
+    def write(self,data):
+        """A function to write data to the encrypted file"""
+
+        self.proc.stdin.write(data)
+
+
+    # ############################################
+    # Method close()
+    # ############################################
+
+    def close(self):
+        """A function to close the file and wait for the encryption program"""
+
+        if self.proc.stdin.closed:
+            return
+
+        self.proc.stdin.close()
+        self.proc.wait()
+
+        if self.proc.returncode != 0:
+            raise IOError('Could not encrypt %s. Return code = %s' % (self.name,self.proc.returncode))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.close()
+        return False
+
+
+# ###########################
+# Class: PgbackmanEncryptionPool
+# ###########################
+
+
+class PgbackmanEncryptionPool():
+    """
+    Pool of processes encrypting the files of a directory-format
+    dump.
+
+    A file is encrypted to <file><extension>.tmp, renamed to
+    <file><extension> and the plaintext file is removed. At most
+    max_jobs files are encrypted at the same time, so the encryption
+    of a dump with many tables does not run in one process.
+
+    submit_files() can be called while pg_dump is running, only the
+    files pg_dump has closed are encrypted. poll() starts and reaps
+    the encryption processes, wait() waits for all of them and
+    returns the errors found.
+    """
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,encryption,max_jobs=4):
+        """ The Constructor."""
+
+        self.encryption = encryption
+        self.max_jobs = max(max_jobs,1)
+        self.extension = encryption.get_file_extension()
+
+        self.submitted = set()
+        self.pending = []
+        self.running = {}
+        self.errors = []
+
+
+    # ############################################
+    # Method submit_files()
+    # ############################################
+
+    def submit_files(self,dump_dir,pgid=None):
+        """
+        A function to submit the files in dump_dir that are not
+        encrypted. If pgid is defined, only the files not open by a
+        process of the process group pgid are submitted.
+        """
+
+        try:
+            #
+            # The directory is listed before the open files are read.
+            # pg_dump creates a file when it opens it and does not
+            # open it again after closing it, a listed file that is
+            # not open is complete.
+            #
+
+            file_names = os.listdir(dump_dir)
+
+        except OSError:
+            return
+
+        open_files = set()
+
+        if pgid != None:
+            open_files = get_open_files(pgid)
+
+            if open_files is None:
+                return
+
+        for file_name in file_names:
+            path = dump_dir + '/' + file_name
+
+            if path in self.submitted or file_name.endswith(self.extension) or file_name.endswith(self.extension + '.tmp'):
+                continue
+
+            try:
+                file_stat = os.lstat(path)
+
+            except OSError:
+                continue
+
+            if (file_stat.st_dev,file_stat.st_ino) in open_files:
+                continue
+
+            self.submitted.add(path)
+            self.pending.append(path)
+
+        self.poll()
+
+
+    # ############################################
+    # Method start_job()
+    # ############################################
+
+    def start_job(self,file_name):
+        """A function to start the encryption of a file"""
+
+        temp_file = file_name + self.extension + '.tmp'
+
+        try:
+            with open(file_name,'r') as input_file:
+                with open(temp_file,'w') as output_file:
+                    self.running[file_name] = subprocess.Popen(self.encryption.get_encrypt_args(),stdin=input_file,stdout=output_file,close_fds=True)
+
+        except (IOError,OSError,ValueError) as e:
+            self.errors.append('Could not encrypt %s - %s' % (file_name,e))
+
+
+    # ############################################
+    # Method poll()
+    # ############################################
+
+    def poll(self):
+        """A function to reap the finished jobs and start the pending ones. Returns the jobs left"""
+
+        for file_name,proc in self.running.items():
+            if proc.poll() is None:
+                continue
+
+            del self.running[file_name]
+            temp_file = file_name + self.extension + '.tmp'
+
+            try:
+                if proc.returncode == 0:
+                    os.rename(temp_file,file_name + self.extension)
+                    os.remove(file_name)
+                else:
+                    self.errors.append('Could not encrypt %s. Return code = %s' % (file_name,proc.returncode))
+                    os.remove(temp_file)
+
+            except OSError as e:
+                self.errors.append('Could not encrypt %s - %s' % (file_name,e))
+
+        while self.pending != [] and len(self.running) < self.max_jobs:
+            self.start_job(self.pending.pop(0))
+
+        return len(self.running) + len(self.pending)
+
+
+    # ############################################
+    # Method wait()
+    # ############################################
+
+    def wait(self,interval=0.1):
+        """A function to wait for all the jobs. Returns the list of errors"""
+
+        while self.poll() > 0:
+            time.sleep(interval)
+
+        return self.errors
+
+
+# ###########################
+# Class: PgbackmanDecryptedFile
+# ###########################
+
+
+class PgbackmanDecryptedFile():
+    """
+    File object reading the decrypted data of an encrypted file.
+
+    The file is decrypted by the program of the backend while it is
+    read, there is not a plaintext copy of the file in the backup
+    server. close() raises IOError if the program fails.
+    """
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,encryption,file_name):
+        """ The Constructor."""
+
+        self.name = file_name
+
+        if not os.path.isfile(file_name):
+            raise IOError(errno.ENOENT,'No such file',file_name)
+
+        self.proc = subprocess.Popen(encryption.get_decrypt_args(file_name),stdout=subprocess.PIPE,close_fds=True)
+
+
+    # ############################################
+    # Method read()
+    # ############################################
+
+    def read(self,size=-1):
+        """A function to read decrypted data"""
+
+        return self.proc.stdout.read(size)
+
+
+    def __iter__(self):
+        return iter(self.proc.stdout)
+
+
+    # ############################################
+    # Method close()
+    # ############################################
+
+    def close(self):
+        """A function to close the file and wait for the decryption program"""
+
+        if self.proc.stdout.closed:
+            return
+
+        self.proc.stdout.close()
+        self.proc.wait()
+
+        if self.proc.returncode != 0:
+            raise IOError('Could not decrypt %s. Return code = %s' % (self.name,self.proc.returncode))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.close()
+        return False
+
+
+# ###########################
+# Class: PgbackmanDecryptionFeeder
+# ###########################
+
+
+class PgbackmanDecryptionFeeder():
+    """
+    Decryption of a directory-format dump read by pg_restore.
+
+    pg_restore reads the restore directory. toc.dat is decrypted to
+    a regular file, pg_restore does not accept anything else. It
+    only has the table of contents, not table data. Every other file
+    is a FIFO with the name of the plaintext file. feed() writes the
+    decrypted file to a FIFO when pg_restore opens it, with at most
+    max_jobs files decrypted at the same time, so the table data is
+    never written decrypted to disk.
+    """
+
+    toc_file = 'toc.dat'
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,encryption,dump_dir,restore_dir,max_jobs=4):
+        """ The Constructor."""
+
+        self.encryption = encryption
+        self.dump_dir = dump_dir
+        self.restore_dir = restore_dir
+        self.max_jobs = max(max_jobs,1)
+        self.extension = encryption.get_file_extension()
+
+        self.pending = {}
+        self.running = {}
+        self.errors = []
+
+
+    # ############################################
+    # Method prepare()
+    # ############################################
+
+    def prepare(self):
+        """A function to create the files of the restore directory. Raises IOError or OSError if it fails"""
+
+        for file_name in sorted(os.listdir(self.dump_dir)):
+            path = self.dump_dir + '/' + file_name
+            restore_path = self.restore_dir + '/' + file_name[:-len(self.extension)]
+
+            if not file_name.endswith(self.extension):
+                os.symlink(path,self.restore_dir + '/' + file_name)
+
+            elif file_name == self.toc_file + self.extension:
+                fd = os.open(restore_path,os.O_WRONLY | os.O_CREAT | os.O_EXCL,0600)
+
+                with os.fdopen(fd,'w') as toc_file:
+                    returncode = subprocess.call(self.encryption.get_decrypt_args(path),stdout=toc_file,close_fds=True)
+
+                if returncode != 0:
+                    raise IOError('Could not decrypt %s. Return code = %s' % (path,returncode))
+
+            else:
+                os.mkfifo(restore_path,0600)
+                self.pending[restore_path] = path
+
+
+    # ############################################
+    # Method poll()
+    # ############################################
+
+    def poll(self):
+        """
+        A function to reap the finished jobs and start a job for every
+        FIFO opened by pg_restore. Returns True if a job was started.
+        """
+
+        started = False
+
+        for restore_path,proc in self.running.items():
+            if proc.poll() is None:
+                continue
+
+            del self.running[restore_path]
+
+            if proc.returncode != 0:
+                self.errors.append('Could not decrypt %s. Return code = %s' % (restore_path,proc.returncode))
+
+        for restore_path in self.pending.keys():
+            if len(self.running) >= self.max_jobs:
+                break
+
+            try:
+                #
+                # A FIFO can not be opened for writing without
+                # blocking until pg_restore opens it for reading
+                #
+
+                fd = os.open(restore_path,os.O_WRONLY | os.O_NONBLOCK)
+
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    continue
+
+                self.errors.append('Could not open %s - %s' % (restore_path,e))
+                del self.pending[restore_path]
+                continue
+
+            try:
+                fcntl.fcntl(fd,fcntl.F_SETFL,fcntl.fcntl(fd,fcntl.F_GETFL) & ~os.O_NONBLOCK)
+                self.running[restore_path] = subprocess.Popen(self.encryption.get_decrypt_args(self.pending[restore_path]),stdout=fd,close_fds=True)
+                started = True
+
+            except OSError as e:
+                self.errors.append('Could not decrypt %s - %s' % (self.pending[restore_path],e))
+
+            finally:
+                os.close(fd)
+
+            del self.pending[restore_path]
+
+        return started
+
+
+    # ############################################
+    # Method feed()
+    # ############################################
+
+    def feed(self,proc,interval=0.02):
+        """
+        A function to feed the FIFOs of the restore directory until
+        the pg_restore process proc finishes. Returns the list of
+        errors.
+        """
+
+        while proc.poll() is None:
+            if not self.poll():
+                time.sleep(interval)
+
+        #
+        # pg_restore has finished, the jobs left can not write
+        # anything more
+        #
+
+        for restore_path,decrypt_proc in self.running.items():
+            if decrypt_proc.poll() is None:
+                decrypt_proc.terminate()
+
+            decrypt_proc.wait()
+
+        self.running = {}
+
+        return self.errors
+
+
+# ############################################
+# Function get_open_files()
+# ############################################
+
+def get_open_files(pgid):
+    """
+    A function to get the files open by the processes of a process
+    group as a set of (st_dev,st_ino). Returns None if they can not
+    be read.
+    """
+
+    open_files = set()
+
+    if not os.path.isdir('/proc/self/fd'):
+        return None
+
+    for pid in get_group_pids(pgid):
+        fd_dir = '/proc/' + str(pid) + '/fd'
+
+        try:
+            fds = os.listdir(fd_dir)
+
+        except OSError as e:
+
+            #
+            # The process has finished
+            #
+
+            if e.errno == errno.ENOENT:
+                continue
+
+            return None
+
+        for fd in fds:
+            try:
+                fd_stat = os.stat(fd_dir + '/' + fd)
+
+            except OSError as e:
+
+                #
+                # The file has been closed
+                #
+
+                if e.errno == errno.ENOENT:
+                    continue
+
+                return None
+
+            open_files.add((fd_stat.st_dev,fd_stat.st_ino))
+
+    return open_files
+
+
+# ############################################
+# Function get_file_encryption()
+# ############################################
+
+def get_file_encryption(file_name,identity_file=''):
+    """
+    A function to get the encryption used by a file from its file
+    extension. Returns None if the file is not encrypted.
+    """
+
+    for backend,values in PgbackmanEncryption.backends.items():
+        if file_name.endswith(values[1]):
+            return PgbackmanEncryption(backend,'',identity_file)
+
+    return None
+
+
+# ############################################
+# Function get_dump_directory_encryption()
+# ############################################
+
+def get_dump_directory_encryption(dump_dir,identity_file=''):
+    """
+    A function to get the encryption used by a directory-format
+    dump. Returns None if the dump is not encrypted.
+    """
+
+    for backend,values in PgbackmanEncryption.backends.items():
+        if os.path.isfile(dump_dir + '/' + PgbackmanDecryptionFeeder.toc_file + values[1]):
+            return PgbackmanEncryption(backend,'',identity_file)
+
+    return None
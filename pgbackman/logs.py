@@ -34,14 +34,22 @@ class PgbackmanLogs(logging.Logger):
     # Constructor    
     # ############################################
 
-    def __init__(self, logger_name,pgsql_node,dbname):
+    def __init__(self, logger_name,pgsql_node,dbname,conf=None):
         """ The Constructor."""
      
         self.logger_name = logger_name
         self.pgsql_node = pgsql_node
         self.dbname = dbname
 
-        self.conf = PgbackmanConfiguration()
+        #
+        # A configuration already read by the program can be used
+        # instead of reading the configuration file again
+        #
+
+        if conf == None:
+            self.conf = PgbackmanConfiguration()
+        else:
+            self.conf = conf
         
         self.logger = logging.getLogger(logger_name)
         self.level = logging.getLevelName(self.conf.log_level.upper())
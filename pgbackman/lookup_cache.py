@@ -0,0 +1,119 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from pgbackman.ordereddict import OrderedDict
+
+
+# ###########################
+# Class: PgbackmanLookupCache
+# ###########################
+
+
+class PgbackmanLookupCache():
+    """
+    LRU cache with a time to live used by PgbackmanDB to remember
+    ID <-> FQDN mappings of backup servers and PgSQL nodes.
+
+    Keys are (kind,value) tuples, e.g. ('pgsql_node_id','pg01.example.org').
+    A max_size or ttl of 0 deactivates the cache.
+    """
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,max_size=1000,ttl=300):
+        """ The Constructor."""
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    # ############################################
+    # Method get()
+    # ############################################
+
+    def get(self,kind,key):
+        """A function to get a cached value. Returns None if it is not cached or it has expired"""
+
+        if self.max_size <= 0 or self.ttl <= 0:
+            return None
+
+        try:
+            value,expires = self.entries.pop((kind,key))
+
+        except KeyError:
+            self.misses += 1
+            return None
+
+        if expires < time.time():
+            self.misses += 1
+            return None
+
+        # Move the entry to the end of the LRU order
+        self.entries[(kind,key)] = (value,expires)
+        self.hits += 1
+
+        return value
+
+
+    # ############################################
+    # Method set()
+    # ############################################
+
+    def set(self,kind,key,value):
+        """A function to cache a value"""
+
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+
+        if (kind,key) in self.entries:
+            del self.entries[(kind,key)]
+
+        self.entries[(kind,key)] = (value,time.time() + self.ttl)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+    # ############################################
+    # Method invalidate()
+    # ############################################
+
+    def invalidate(self,*kinds):
+        """A function to drop all cached entries of the given kinds, or all entries if no kind is given"""
+
+        if len(kinds) == 0:
+            self.entries.clear()
+            return
+
+        for entry in self.entries.keys():
+            if entry[0] in kinds:
+                del self.entries[entry]
@@ -0,0 +1,287 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import errno
+import hashlib
+import json
+import tempfile
+
+from multiprocessing.pool import ThreadPool
+from distutils.spawn import find_executable
+
+
+# ###########################
+# Class: PgbackmanManifest
+# ###########################
+
+
+class PgbackmanManifest():
+    """
+    Manifest with the size and checksum of the dump files of a
+    backup.
+
+    The manifest is a JSON file saved next to the dump. It has one
+    entry per file with the path relative to the directory of the
+    manifest, the size and the checksum. The files of a directory
+    dump have one entry each.
+
+    The files are hashed by a pool of jobs threads. hashlib does not
+    hold the GIL while it hashes large blocks, so the files are read
+    and hashed in parallel.
+    """
+
+    block_size = 1024 * 1024
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,manifest_file,algorithm='sha256',jobs=4):
+        """ The Constructor."""
+
+        self.manifest_file = manifest_file
+        self.base_dir = os.path.dirname(manifest_file)
+        self.algorithm = algorithm.strip().lower()
+        self.jobs = max(jobs,1)
+
+        self.files = []
+
+        #
+        # hashlib.new() raises ValueError if the algorithm is unknown
+        #
+
+        hashlib.new(self.algorithm)
+
+
+    # ############################################
+    # Method get_hash_command()
+    # ############################################
+
+    def get_hash_command(self):
+        """
+        A function to get the command that writes the checksum of
+        stdin to stdout, e.g. sha256sum. Returns None if it is not
+        installed.
+        """
+
+        return find_executable(self.algorithm + 'sum',os.getenv('PATH','') + os.pathsep + '/bin:/usr/bin')
+
+
+    # ############################################
+    # Method hash_file()
+    # ############################################
+
+    def hash_file(self,path):
+        """A function to get the size and checksum of a file"""
+
+        checksum = hashlib.new(self.algorithm)
+        size = 0
+
+        with open(path,'rb') as dump_file:
+            while True:
+                data = dump_file.read(self.block_size)
+
+                if not data:
+                    break
+
+                checksum.update(data)
+                size += len(data)
+
+        return [size,checksum.hexdigest()]
+
+
+    # ############################################
+    # Method run_jobs()
+    # ############################################
+
+    def run_jobs(self,function,items):
+        """A function to run function for every item with the thread pool"""
+
+        if self.jobs == 1 or len(items) <= 1:
+            return map(function,items)
+
+        pool = ThreadPool(min(self.jobs,len(items)))
+
+        try:
+            return pool.map(function,items,1)
+
+        finally:
+            pool.close()
+            pool.join()
+
+
+    # ############################################
+    # Method add_files()
+    # ############################################
+
+    def add_files(self,paths,checksums=None):
+        """
+        A function to add dump files or dump directories to the
+        manifest. checksums has the checksums already calculated
+        while a file was written, these files are not read again.
+        """
+
+        if checksums == None:
+            checksums = {}
+
+        file_list = []
+
+        for path in paths:
+            if os.path.isdir(path):
+                for dir_path,dir_names,file_names in os.walk(path):
+                    dir_names.sort()
+
+                    for file_name in sorted(file_names):
+                        file_list.append(os.path.join(dir_path,file_name))
+            else:
+                file_list.append(path)
+
+        results = self.run_jobs(self.hash_file,[path for path in file_list if path not in checksums])
+        results.reverse()
+
+        for path in file_list:
+            if path in checksums:
+                entry = [os.path.getsize(path),checksums[path]]
+            else:
+                entry = results.pop()
+
+            self.files.append({'file': os.path.relpath(path,self.base_dir),
+                               'size': entry[0],
+                               'checksum': entry[1]})
+
+
+    # ############################################
+    # Method save()
+    # ############################################
+
+    def save(self):
+        """
+        A function to write the manifest file. Returns the checksum
+        of the manifest file, 'algorithm:checksum'.
+        """
+
+        data = json.dumps({'algorithm': self.algorithm,
+                           'files': self.files},indent=1,sort_keys=True)
+
+        fd,temp_file = tempfile.mkstemp(prefix='.',dir=self.base_dir)
+
+        try:
+            os.fchmod(fd,0644)
+
+            with os.fdopen(fd,'w') as manifest_file:
+                manifest_file.write(data + '\n')
+
+            os.rename(temp_file,self.manifest_file)
+
+        except (IOError,OSError):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+            raise
+
+        return self.algorithm + ':' + hashlib.new(self.algorithm,data + '\n').hexdigest()
+
+
+    # ############################################
+    # Method load()
+    # ############################################
+
+    def load(self,checksum=None):
+        """
+        A function to read the manifest file. If checksum is defined,
+        the manifest file is checked against it. Raises IOError or
+        ValueError if the manifest can not be used.
+        """
+
+        with open(self.manifest_file,'rb') as manifest_file:
+            data = manifest_file.read()
+
+        if checksum != None and checksum != '':
+            algorithm,hexdigest = checksum.split(':',1)
+
+            if hashlib.new(algorithm,data).hexdigest() != hexdigest:
+                raise ValueError('The manifest file %s does not match the checksum in the backup catalog' % self.manifest_file)
+
+        manifest = json.loads(data)
+
+        self.algorithm = str(manifest['algorithm'])
+        hashlib.new(self.algorithm)
+
+        self.files = manifest['files']
+
+
+    # ############################################
+    # Method verify_file()
+    # ############################################
+
+    def verify_file(self,entry):
+        """A function to check a file of the manifest. Returns None or the error found"""
+
+        path = os.path.join(self.base_dir,entry['file'])
+
+        try:
+            if os.path.getsize(path) != entry['size']:
+                return 'Wrong size: ' + str(os.path.getsize(path)) + ' bytes, expected ' + str(entry['size'])
+
+            size,checksum = self.hash_file(path)
+
+        except (IOError,OSError) as e:
+            if e.errno == errno.ENOENT:
+                return 'Missing file'
+
+            return str(e)
+
+        if size != entry['size'] or checksum != entry['checksum']:
+            return 'Wrong ' + self.algorithm + ' checksum'
+
+        return None
+
+
+    # ############################################
+    # Method verify()
+    # ############################################
+
+    def verify(self):
+        """
+        A function to check the files of the manifest with the thread
+        pool. Returns a list of [file, error] for the files with
+        errors.
+        """
+
+        results = self.run_jobs(self.verify_file,self.files)
+
+        return [[os.path.join(self.base_dir,entry['file']),error] for entry,error in zip(self.files,results) if error != None]
+
+
+    # ############################################
+    # Method get_total_size()
+    # ############################################
+
+    def get_total_size(self):
+        """A function to get the size of the files in the manifest"""
+
+        return sum([entry['size'] for entry in self.files])
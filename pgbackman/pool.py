@@ -0,0 +1,356 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import threading
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
+
+from pgbackman.ordereddict import OrderedDict
+
+
+# #####################
+# Class: PgbackmanPool
+# ######################
+
+
+class PgbackmanPool():
+    """
+    Bounded pool of connections to the pgbackman database.
+
+    All PgbackmanDB instances in a process created with the same pool
+    share at most max_size connections. Idle connections above
+    min_size are closed after idle_timeout seconds, and a connection
+    idle for more than health_check_interval seconds is checked with
+    'SELECT 1' before it is handed out.
+    """
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,dsn,application,min_size=1,max_size=4,idle_timeout=300,checkout_timeout=30,health_check_interval=30):
+        """ The Constructor."""
+
+        self.dsn = dsn
+        self.application = application
+        self.min_size = min_size
+        self.max_size = max(max_size,1)
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self.lock = threading.Condition()
+
+        # List of [conn,last_used] for connections not in use.
+        self.idle = []
+        self.size = 0
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.health_check_failures = 0
+
+        self.last_stats_log = time.time()
+
+
+    # ############################################
+    # Method new_connection()
+    # ############################################
+
+    def new_connection(self):
+        """A function to open a new connection for the pool"""
+
+        try:
+            conn = psycopg2.connect(self.dsn)
+
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            psycopg2.extras.wait_select(conn)
+
+            if (conn.server_version >= 90000 and 'application_name=' not in self.dsn):
+                cur = conn.cursor()
+                cur.execute('SET application_name TO %s',(self.application,))
+                cur.close()
+
+            return conn
+
+        except psycopg2.Error as e:
+            raise e
+
+
+    # ############################################
+    # Method check_connection()
+    # ############################################
+
+    def check_connection(self,conn,last_used):
+        """A function to check if an idle connection can be handed out"""
+
+        if conn.closed:
+            return False
+
+        if time.time() - last_used < self.health_check_interval:
+            return True
+
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+
+            return True
+
+        except (psycopg2.OperationalError,psycopg2.InterfaceError):
+            return False
+
+
+    # ############################################
+    # Method close_connection()
+    # ############################################
+
+    def close_connection(self,conn):
+        """A function to close a connection that leaves the pool"""
+
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+        self.connections_closed += 1
+
+
+    # ############################################
+    # Method expire_idle_connections()
+    # ############################################
+
+    def expire_idle_connections(self):
+        """A function to close connections idle for more than idle_timeout. Called with the lock held"""
+
+        now = time.time()
+
+        while len(self.idle) > 0 and self.size > self.min_size:
+            conn,last_used = self.idle[0]
+
+            if now - last_used < self.idle_timeout:
+                break
+
+            self.idle.pop(0)
+            self.size -= 1
+            self.close_connection(conn)
+
+
+    # ############################################
+    # Method getconn()
+    # ############################################
+
+    def getconn(self):
+        """A function to check out a healthy connection from the pool"""
+
+        start = time.time()
+        deadline = start + self.checkout_timeout
+        waited = False
+
+        while True:
+            conn = None
+            last_used = None
+            create = False
+
+            self.lock.acquire()
+
+            try:
+                self.expire_idle_connections()
+
+                if len(self.idle) > 0:
+
+                    # Most recently used connection first
+                    conn,last_used = self.idle.pop()
+
+                elif self.size < self.max_size:
+                    self.size += 1
+                    create = True
+
+                else:
+                    remaining = deadline - time.time()
+
+                    if remaining <= 0:
+                        raise psycopg2.pool.PoolError('Timeout waiting %s seconds for a free connection in the pool (max_size: %s)' % (self.checkout_timeout,self.max_size))
+
+                    waited = True
+                    self.lock.wait(remaining)
+                    continue
+
+            finally:
+                self.lock.release()
+
+            if create:
+                try:
+                    conn = self.new_connection()
+
+                except psycopg2.Error as e:
+                    self.lock.acquire()
+
+                    try:
+                        self.size -= 1
+                        self.lock.notify()
+                    finally:
+                        self.lock.release()
+
+                    raise e
+
+                self.connections_created += 1
+
+            elif not self.check_connection(conn,last_used):
+                self.lock.acquire()
+
+                try:
+                    self.size -= 1
+                    self.health_check_failures += 1
+                    self.close_connection(conn)
+                finally:
+                    self.lock.release()
+
+                continue
+
+            self.register_checkout(time.time() - start,waited)
+            return conn
+
+
+    # ############################################
+    # Method register_checkout()
+    # ############################################
+
+    def register_checkout(self,wait_time,waited):
+        """A function to update the checkout statistics"""
+
+        self.lock.acquire()
+
+        try:
+            self.checkouts += 1
+
+            if waited:
+                self.waits += 1
+
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max,wait_time)
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method putconn()
+    # ############################################
+
+    def putconn(self,conn,close=False):
+        """A function to return a connection to the pool"""
+
+        self.lock.acquire()
+
+        try:
+            if close or conn.closed or conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                self.size -= 1
+                self.close_connection(conn)
+            else:
+                self.idle.append([conn,time.time()])
+
+            self.lock.notify()
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method closeall()
+    # ############################################
+
+    def closeall(self):
+        """A function to close all idle connections in the pool"""
+
+        self.lock.acquire()
+
+        try:
+            for conn,last_used in self.idle:
+                self.size -= 1
+                self.close_connection(conn)
+
+            self.idle = []
+            self.lock.notify_all()
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method get_stats()
+    # ############################################
+
+    def get_stats(self):
+        """A function to get the pool statistics"""
+
+        self.lock.acquire()
+
+        try:
+            stats = OrderedDict()
+
+            stats['size'] = self.size
+            stats['idle'] = len(self.idle)
+            stats['in_use'] = self.size - len(self.idle)
+            stats['max_size'] = self.max_size
+            stats['checkouts'] = self.checkouts
+            stats['waits'] = self.waits
+
+            if self.checkouts > 0:
+                stats['avg_wait_ms'] = round(self.wait_time_total * 1000 / self.checkouts,3)
+            else:
+                stats['avg_wait_ms'] = 0.0
+
+            stats['max_wait_ms'] = round(self.wait_time_max * 1000,3)
+            stats['created'] = self.connections_created
+            stats['closed'] = self.connections_closed
+            stats['health_check_failures'] = self.health_check_failures
+
+            return stats
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method log_stats()
+    # ############################################
+
+    def log_stats(self,logger,interval):
+        """A function to log the pool statistics every interval seconds"""
+
+        if time.time() - self.last_stats_log < interval:
+            return
+
+        self.last_stats_log = time.time()
+
+        logger.info('Connection pool [%s] stats: %s',self.application,
+                    ', '.join(['%s=%s' % (key,value) for key,value in self.get_stats().items()]))
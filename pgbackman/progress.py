@@ -0,0 +1,99 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+from pgbackman.throttle import get_output_size
+
+
+# ###########################
+# Class: PgbackmanProgress
+# ###########################
+
+
+class PgbackmanProgress():
+    """
+    Progress of a running pg_dump / pg_dumpall command.
+
+    The log file of the command is read from the position reached in
+    the previous call, the tables dumped are the 'dumping contents of
+    table' lines written by pg_dump --verbose. The bytes written are
+    the size of the dump file or directory.
+    """
+
+    table_message = 'dumping contents of table'
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,log_file,output_path):
+        """ The Constructor."""
+
+        self.log_file = log_file
+        self.output_path = output_path
+
+        self.position = 0
+        self.partial_line = ''
+        self.tables_dumped = 0
+
+
+    # ############################################
+    # Method read_log()
+    # ############################################
+
+    def read_log(self):
+        """A function to count the tables dumped in the lines added to the log file"""
+
+        try:
+            with open(self.log_file,'r') as log_file:
+                log_file.seek(self.position)
+                data = log_file.read()
+                self.position = log_file.tell()
+
+        except (IOError,OSError):
+            return self.tables_dumped
+
+        lines = (self.partial_line + data).split('\n')
+
+        #
+        # The last line can be incomplete, it is read again with the
+        # data added in the next call
+        #
+
+        self.partial_line = lines.pop()
+
+        for line in lines:
+            if self.table_message in line:
+                self.tables_dumped += 1
+
+        return self.tables_dumped
+
+
+    # ############################################
+    # Method get_bytes_written()
+    # ############################################
+
+    def get_bytes_written(self):
+        """A function to get the size of the dump file or directory"""
+
+        return get_output_size(self.output_path)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import time
+import threading
+import collections
+import psycopg2
+import psycopg2.extensions
+
+from pgbackman.ordereddict import OrderedDict
+
+
+# ###########################
+# Class: PgbackmanQueryStats
+# ###########################
+
+
+class PgbackmanQueryStats():
+    """
+    Per method query statistics of a PgbackmanDB instance.
+
+    For every PgbackmanDB method running queries we count calls,
+    errors and rows, and keep the latency of the last sample_size
+    calls to calculate p50/p95/p99. Recording a call is O(1), the
+    percentiles are only calculated when the stats are requested.
+    """
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,sample_size=1024):
+        """ The Constructor."""
+
+        self.sample_size = sample_size
+        self.lock = threading.Lock()
+
+        # method -> [calls,errors,rows,total_time,max_time,samples]
+        self.methods = {}
+
+        self.connections = 0
+        self.reconnects = 0
+
+        self.started = time.time()
+        self.last_stats_log = time.time()
+
+
+    # ############################################
+    # Method record()
+    # ############################################
+
+    def record(self,method,elapsed,rows,error=False):
+        """A function to register the execution of a query"""
+
+        self.lock.acquire()
+
+        try:
+            try:
+                entry = self.methods[method]
+
+            except KeyError:
+                entry = [0,0,0,0.0,0.0,collections.deque(maxlen=self.sample_size)]
+                self.methods[method] = entry
+
+            entry[0] += 1
+
+            if error:
+                entry[1] += 1
+
+            if rows > 0:
+                entry[2] += rows
+
+            entry[3] += elapsed
+
+            if elapsed > entry[4]:
+                entry[4] = elapsed
+
+            entry[5].append(elapsed)
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method record_connection()
+    # ############################################
+
+    def record_connection(self,reconnect=False):
+        """A function to register a new connection to the pgbackman database"""
+
+        self.lock.acquire()
+
+        try:
+            self.connections += 1
+
+            if reconnect:
+                self.reconnects += 1
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method reset()
+    # ############################################
+
+    def reset(self):
+        """A function to drop all statistics"""
+
+        self.lock.acquire()
+
+        try:
+            self.methods = {}
+            self.connections = 0
+            self.reconnects = 0
+            self.started = time.time()
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method percentile()
+    # ############################################
+
+    def percentile(self,sorted_samples,percent):
+        """A function to get a percentile from a sorted list of samples"""
+
+        if len(sorted_samples) == 0:
+            return 0.0
+
+        index = int(round(percent / 100.0 * (len(sorted_samples) - 1)))
+        return sorted_samples[index]
+
+
+    # ############################################
+    # Method get_stats()
+    # ############################################
+
+    def get_stats(self):
+        """A function to get the statistics per method, ordered by total time. Times are in milliseconds"""
+
+        self.lock.acquire()
+
+        try:
+            methods = [(method,entry[0],entry[1],entry[2],entry[3],entry[4],list(entry[5]))
+                       for method,entry in self.methods.items()]
+
+        finally:
+            self.lock.release()
+
+        stats = []
+
+        for method,calls,errors,rows,total_time,max_time,samples in sorted(methods,key=lambda entry: entry[4],reverse=True):
+            samples.sort()
+
+            method_stats = OrderedDict()
+
+            method_stats['Method'] = method
+            method_stats['Calls'] = calls
+            method_stats['Errors'] = errors
+            method_stats['Rows'] = rows
+            method_stats['Total ms'] = round(total_time * 1000,3)
+            method_stats['Avg ms'] = round(total_time * 1000 / calls,3)
+            method_stats['p50 ms'] = round(self.percentile(samples,50) * 1000,3)
+            method_stats['p95 ms'] = round(self.percentile(samples,95) * 1000,3)
+            method_stats['p99 ms'] = round(self.percentile(samples,99) * 1000,3)
+            method_stats['Max ms'] = round(max_time * 1000,3)
+
+            stats.append(method_stats)
+
+        return stats
+
+
+    # ############################################
+    # Method get_summary()
+    # ############################################
+
+    def get_summary(self):
+        """A function to get the totals for all methods"""
+
+        self.lock.acquire()
+
+        try:
+            summary = OrderedDict()
+
+            summary['calls'] = sum([entry[0] for entry in self.methods.values()])
+            summary['errors'] = sum([entry[1] for entry in self.methods.values()])
+            summary['rows'] = sum([entry[2] for entry in self.methods.values()])
+            summary['total_ms'] = round(sum([entry[3] for entry in self.methods.values()]) * 1000,3)
+            summary['connections'] = self.connections
+            summary['reconnects'] = self.reconnects
+            summary['seconds'] = int(time.time() - self.started)
+
+            return summary
+
+        finally:
+            self.lock.release()
+
+
+    # ############################################
+    # Method log_stats()
+    # ############################################
+
+    def log_stats(self,logger,interval,application):
+        """A function to log the query statistics every interval seconds"""
+
+        if time.time() - self.last_stats_log < interval:
+            return
+
+        self.last_stats_log = time.time()
+
+        logger.info('Query stats [%s]: %s',application,
+                    ', '.join(['%s=%s' % (key,value) for key,value in self.get_summary().items()]))
+
+        for method_stats in self.get_stats():
+            logger.info('Query stats [%s]: %s',application,
+                        ', '.join(['%s=%s' % (key.lower().replace(' ','_'),value) for key,value in method_stats.items()]))
+
+
+# ###########################
+# Class: PgbackmanStatsCursor
+# ###########################
+
+
+class PgbackmanStatsCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that registers the time used by execute() in
+    PgbackmanQueryStats under the name of the PgbackmanDB method
+    running the query. query_stats is set by PgbackmanDB after the
+    cursor is created.
+    """
+
+    # Helper methods that run queries for other PgbackmanDB methods
+    helper_methods = frozenset(['execute_listing','get_stats_data'])
+
+    query_stats = None
+
+    def execute(self,query,vars=None):
+        if self.query_stats is None:
+            return super(PgbackmanStatsCursor,self).execute(query,vars)
+
+        frame = sys._getframe(1)
+
+        while frame.f_code.co_name in self.helper_methods and frame.f_back is not None:
+            frame = frame.f_back
+
+        method = frame.f_code.co_name
+
+        start = time.time()
+        error = True
+
+        try:
+            result = super(PgbackmanStatsCursor,self).execute(query,vars)
+            error = False
+
+            return result
+
+        finally:
+            self.query_stats.record(method,time.time() - start,self.rowcount,error)
+
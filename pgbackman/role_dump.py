@@ -0,0 +1,124 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Statements in a pg_dumpall -r output we need to restore the roles
+# of a database. Role names are used as they are written in the
+# dump, quoted if needed.
+#
+
+CREATE_ROLE = 'CREATE ROLE'
+ALTER_ROLE = 'ALTER ROLE'
+COMMENT_ON_ROLE = 'COMMENT ON ROLE'
+GRANT_ROLE = 'GRANT'
+
+
+# ############################################
+# Function read_identifier()
+# ############################################
+
+def read_identifier(line,start):
+    """
+    A function to read an SQL identifier starting at position start
+    of a line. Returns the identifier as written in the line and the
+    position after it, or (None,start) if there is no identifier.
+    """
+
+    if line.startswith('"',start):
+
+        #
+        # Quoted identifier. A double quote inside it is written as ""
+        #
+
+        end = start + 1
+
+        while True:
+            end = line.find('"',end)
+
+            if end < 0:
+                return None,start
+
+            if line.startswith('""',end):
+                end = end + 2
+            else:
+                return line[start:end + 1],end + 1
+
+    end = start
+
+    while end < len(line) and line[end] not in ' ;,\n':
+        end = end + 1
+
+    if end == start:
+        return None,start
+
+    return line[start:end],end
+
+
+# ############################################
+# Function parse_role_statement()
+# ############################################
+
+def parse_role_statement(line):
+    """
+    A function to parse a line of a pg_dumpall -r output. Returns
+    (statement,role,granted_role) for CREATE ROLE, ALTER ROLE,
+    COMMENT ON ROLE and role membership GRANT statements, or None
+    for any other line. granted_role is only defined for GRANT
+    statements, role is the member role in this case.
+    """
+
+    for statement in [CREATE_ROLE,ALTER_ROLE,COMMENT_ON_ROLE]:
+        if line.startswith(statement + ' '):
+            role,end = read_identifier(line,len(statement) + 1)
+
+            if role is None:
+                return None
+
+            if statement == CREATE_ROLE and not line.startswith(';',end):
+                return None
+
+            if statement != CREATE_ROLE and not line.startswith(' ',end):
+                return None
+
+            return statement,role,None
+
+    if line.startswith(GRANT_ROLE + ' '):
+
+        #
+        # GRANT granted_role TO role [WITH ...] [GRANTED BY grantor];
+        #
+
+        granted_role,end = read_identifier(line,len(GRANT_ROLE) + 1)
+
+        if granted_role is None or not line.startswith(' TO ',end):
+            return None
+
+        role,end = read_identifier(line,end + 4)
+
+        if role is None or role == 'PUBLIC':
+            return None
+
+        return GRANT_ROLE,role,granted_role
+
+    return None
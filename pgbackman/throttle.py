@@ -0,0 +1,256 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import errno
+import signal
+import time
+
+
+# ###########################
+# Class: PgbackmanThrottle
+# ###########################
+
+
+class PgbackmanThrottle():
+    """
+    Bandwidth limit for a pg_dump / pg_dumpall command.
+
+    The command has to run in its own process group. The bytes read
+    by the pg_dump and pg_dumpall processes of the group (data
+    received from the PgSQL node) are checked every check_interval
+    seconds. When they are over the limit, the process group is
+    stopped with SIGSTOP for the time needed to get back under the
+    limit and continued with SIGCONT. Compression programs in the
+    same pipeline are stopped too, so the writes to the backup
+    server are limited as well.
+
+    get_limit is a function returning the limit in bytes per second,
+    0 for no limit. It is called at every check, the limit can
+    change while the command is running.
+
+    If /proc/<pid>/io is not available, the size of output_path is
+    used instead.
+
+    check() is called by the loop waiting for the command, wait()
+    can be used when there is nothing else to do in this loop.
+    """
+
+    programs = ['pg_dump','pg_dumpall']
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,get_limit,output_path='',check_interval=1.0,burst=2.0):
+        """ The Constructor."""
+
+        self.get_limit = get_limit
+        self.output_path = output_path
+        self.check_interval = check_interval
+        self.burst = burst
+
+        self.throttled = 0.0
+        self.bytes_read = {}
+        self.use_proc_io = os.path.exists('/proc/self/io')
+
+        self.tokens = 0.0
+        self.last_bytes = 0
+        self.last_check = time.time()
+
+
+    # ############################################
+    # Method get_group_pids()
+    # ############################################
+
+    def get_group_pids(self,pgid):
+        """A function to get the pids of the pg_dump / pg_dumpall processes in a process group"""
+
+        return get_group_pids(pgid,self.programs)
+
+
+    # ############################################
+    # Method get_bytes()
+    # ############################################
+
+    def get_bytes(self,pgid):
+        """A function to get the bytes transferred by the command until now"""
+
+        if self.use_proc_io:
+            for pid in self.get_group_pids(pgid):
+                try:
+                    with open('/proc/' + str(pid) + '/io') as io_file:
+                        for line in io_file:
+                            if line.startswith('rchar:'):
+                                self.bytes_read[pid] = int(line.split()[1])
+                                break
+
+                except (IOError,OSError,ValueError):
+                    continue
+
+            #
+            # Processes that have finished, e.g. pg_dump workers,
+            # keep the last value read
+            #
+
+            return sum(self.bytes_read.values())
+
+        return get_output_size(self.output_path)
+
+
+    # ############################################
+    # Method signal_group()
+    # ############################################
+
+    def signal_group(self,pgid,signum):
+        """A function to send a signal to a process group that can be gone"""
+
+        try:
+            os.killpg(pgid,signum)
+
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+
+    # ############################################
+    # Method check()
+    # ############################################
+
+    def check(self,proc):
+        """
+        A function to apply the bandwidth limit to a command started
+        with preexec_fn=os.setsid. The process group of the command
+        is stopped if it is over the limit.
+        """
+
+        pgid = proc.pid
+
+        now = time.time()
+        limit = self.get_limit()
+        transferred = self.get_bytes(pgid)
+
+        delta = max(transferred - self.last_bytes,0)
+        self.last_bytes = transferred
+
+        if limit <= 0:
+            self.tokens = 0.0
+            self.last_check = now
+            return
+
+        self.tokens = min(self.tokens + limit * (now - self.last_check),limit * self.burst) - delta
+        self.last_check = now
+
+        if self.tokens < 0 and proc.poll() is None:
+            pause = -self.tokens / limit
+
+            self.signal_group(pgid,signal.SIGSTOP)
+
+            try:
+                time.sleep(pause)
+            finally:
+                self.signal_group(pgid,signal.SIGCONT)
+
+            self.throttled += pause
+            self.tokens = 0.0
+            self.last_check = time.time()
+
+
+    # ############################################
+    # Method wait()
+    # ############################################
+
+    def wait(self,proc):
+        """
+        A function to wait for a command started with
+        preexec_fn=os.setsid while the bandwidth limit is applied.
+        Returns the return code of the command.
+        """
+
+        while proc.poll() is None:
+            time.sleep(self.check_interval)
+            self.check(proc)
+
+        return proc.returncode
+
+
+# ############################################
+# Function get_group_pids()
+# ############################################
+
+def get_group_pids(pgid,programs=None):
+    """
+    A function to get the pids of the processes in a process group.
+    Only processes running one of programs are returned if programs
+    is defined.
+    """
+
+    pids = []
+
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+
+        try:
+            with open('/proc/' + pid + '/stat') as stat_file:
+                stat = stat_file.read()
+
+            #
+            # /proc/<pid>/stat: pid (comm) state ppid pgrp ...
+            # comm can have spaces, we read after the last ')'
+            #
+
+            comm = stat[stat.find('(') + 1:stat.rfind(')')]
+            pgrp = int(stat[stat.rfind(')') + 2:].split()[2])
+
+        except (IOError,OSError,ValueError,IndexError):
+            continue
+
+        if pgrp == pgid and (programs is None or comm in programs):
+            pids.append(int(pid))
+
+    return pids
+
+
+# ############################################
+# Function get_output_size()
+# ############################################
+
+def get_output_size(output_path):
+    """A function to get the size of a dump file or a dump directory"""
+
+    size = 0
+
+    try:
+        if os.path.isdir(output_path):
+            for file_name in os.listdir(output_path):
+                size += os.path.getsize(output_path + '/' + file_name)
+
+        elif os.path.exists(output_path):
+            size = os.path.getsize(output_path)
+
+    except OSError:
+        pass
+
+    return size
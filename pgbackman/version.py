@@ -1,2 +1,2 @@
 #!/usr/bin/env python2
-__version__ = '5:1.3.2'
+__version__ = '6:1.4.0'
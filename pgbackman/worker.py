@@ -0,0 +1,233 @@
+#!/usr/bin/env python2
+#
+# Copyright (c) 2013-2014 Rafael Martinez Guerrero / PostgreSQL-es
+#
+# Copyright (c) 2014 USIT-University of Oslo
+#
+# Copyright (c) 2023 James Miller
+#
+# This file is part of PgBackMan
+# https://github.com/jvaskonen/pgbackman
+#
+# PgBackMan is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PgBackMan is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Pgbackman.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import errno
+import fcntl
+import json
+import stat
+import tempfile
+import time
+
+
+# ###########################
+# Class: PgbackmanWorkerQueue
+# ###########################
+
+
+class PgbackmanWorkerQueue():
+    """
+    Queue of backup jobs run by pgbackman_worker.
+
+    Every job is a file in queue_dir with the pgbackman_dump program
+    and its arguments. pgbackman_dump adds jobs to the queue only if
+    a pgbackman_worker is running, i.e. the lock file in queue_dir is
+    locked. Jobs are taken in the order they were added.
+
+    The worker only runs jobs from files owned by its own user or by
+    root in a queue_dir owned by its own user that other users can
+    not write to.
+    """
+
+    lock_file_name = 'pgbackman_worker.lock'
+    job_suffix = '.job'
+
+    # ############################################
+    # Constructor
+    # ############################################
+
+    def __init__(self,queue_dir):
+        """ The Constructor."""
+
+        self.queue_dir = queue_dir
+        self.lock_file = None
+
+
+    # ############################################
+    # Method lock()
+    # ############################################
+
+    def lock(self):
+        """
+        A function used by pgbackman_worker to create queue_dir and
+        lock the lock file. Returns False if another worker has the
+        lock. Raises OSError if queue_dir can not be used safely.
+        """
+
+        if not os.path.isdir(self.queue_dir):
+            os.makedirs(self.queue_dir,0700)
+
+        dir_stat = os.stat(self.queue_dir)
+
+        if dir_stat.st_uid != os.getuid() or dir_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise OSError(errno.EPERM,'Queue directory not owned by this user or writable by other users',self.queue_dir)
+
+        self.lock_file = open(self.queue_dir + '/' + self.lock_file_name,'a')
+
+        try:
+            fcntl.flock(self.lock_file,fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        except IOError as e:
+            if e.errno in [errno.EAGAIN,errno.EACCES]:
+                self.close()
+                return False
+
+            raise
+
+        return True
+
+
+    # ############################################
+    # Method close()
+    # ############################################
+
+    def close(self):
+        """
+        A function to close the lock file. Processes forked by the
+        worker have to close it, if not the lock is held until they
+        finish.
+        """
+
+        if self.lock_file != None:
+            self.lock_file.close()
+            self.lock_file = None
+
+
+    # ############################################
+    # Method worker_running()
+    # ############################################
+
+    def worker_running(self):
+        """A function to check if a pgbackman_worker has the lock of queue_dir"""
+
+        try:
+            with open(self.queue_dir + '/' + self.lock_file_name,'r') as lock_file:
+                try:
+                    fcntl.flock(lock_file,fcntl.LOCK_SH | fcntl.LOCK_NB)
+
+                except IOError as e:
+                    if e.errno in [errno.EAGAIN,errno.EACCES]:
+                        return True
+
+                    raise
+
+        except (IOError,OSError):
+            return False
+
+        return False
+
+
+    # ############################################
+    # Method enqueue()
+    # ############################################
+
+    def enqueue(self,program,argv):
+        """
+        A function to add a job to the queue. The job file is written
+        with a temporary name and renamed, the worker never reads an
+        incomplete file. Returns False if no worker is running.
+        """
+
+        if not self.worker_running():
+            return False
+
+        job = json.dumps({'program': program,
+                          'argv': argv,
+                          'enqueued': time.time()})
+
+        fd,temp_file = tempfile.mkstemp(prefix='.',dir=self.queue_dir)
+
+        try:
+            #
+            # Jobs queued by root (at jobs) have to be readable by
+            # the worker
+            #
+
+            os.fchmod(fd,0644)
+
+            with os.fdopen(fd,'w') as job_file:
+                job_file.write(job)
+
+            os.rename(temp_file,self.queue_dir + '/' + '%.6f-%d' % (time.time(),os.getpid()) + self.job_suffix)
+
+        except (IOError,OSError):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+            raise
+
+        return True
+
+
+    # ############################################
+    # Method get_jobs()
+    # ############################################
+
+    def get_jobs(self):
+        """A function to get the job files in the queue, oldest first"""
+
+        return sorted([job_file for job_file in os.listdir(self.queue_dir) if job_file.endswith(self.job_suffix)],
+                      key=lambda job_file: float(job_file.split('-')[0]))
+
+
+    # ############################################
+    # Method take()
+    # ############################################
+
+    def take(self,job_file):
+        """
+        A function to read a job and remove it from the queue.
+        Returns None if the job file can not be used.
+        """
+
+        job_path = self.queue_dir + '/' + job_file
+
+        try:
+            try:
+                if os.stat(job_path).st_uid not in [os.getuid(),0]:
+                    return None
+
+                with open(job_path,'r') as job_data:
+                    job = json.load(job_data)
+
+            finally:
+                os.remove(job_path)
+
+        except (IOError,OSError,ValueError):
+            return None
+
+        if not isinstance(job,dict) or not isinstance(job.get('program'),basestring) or not isinstance(job.get('argv'),list):
+            return None
+
+        #
+        # json returns unicode strings, pgbackman_dump expects the
+        # same byte strings it gets from the command line
+        #
+
+        job['program'] = job['program'].encode('utf-8')
+        job['argv'] = [unicode(arg).encode('utf-8') for arg in job['argv']]
+
+        return job
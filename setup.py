@@ -51,7 +51,8 @@ try:
                      ('/usr/share/pgbackman/', ['sql/pgbackman_2.sql']),
                      ('/usr/share/pgbackman/', ['sql/pgbackman_3.sql']),
                      ('/usr/share/pgbackman/', ['sql/pgbackman_4.sql']),
-                     ('/usr/share/pgbackman/', ['sql/pgbackman_5.sql'])]
+                     ('/usr/share/pgbackman/', ['sql/pgbackman_5.sql']),
+                     ('/usr/share/pgbackman/', ['sql/pgbackman_6.sql'])]
     #
     # Check linux distribution and define init script
     #
@@ -67,6 +68,7 @@ try:
         install_files.append(('/lib/systemd/system', ['etc/pgbackman-alerts.service']))
         install_files.append(('/lib/systemd/system', ['etc/pgbackman-control.service']))
         install_files.append(('/lib/systemd/system', ['etc/pgbackman-maintenance.service']))
+        install_files.append(('/lib/systemd/system', ['etc/pgbackman-worker.service']))
 
     else:
         
@@ -83,7 +85,7 @@ try:
           author_email='jvaskonen@toastaddict.org',
           url='https://github.com/jvaskonen/pgbackman',
           packages=['pgbackman',],
-          scripts=['bin/pgbackman','bin/pgbackman_control','bin/pgbackman_maintenance','bin/pgbackman_dump','bin/pgbackman_restore','bin/pgbackman_zabbix_autodiscovery','bin/pgbackman_status_info','bin/pgbackman_alerts','bin/pgbackman-bulk-update'],
+          scripts=['bin/pgbackman','bin/pgbackman_control','bin/pgbackman_maintenance','bin/pgbackman_dump','bin/pgbackman_worker','bin/pgbackman_restore','bin/pgbackman_zabbix_autodiscovery','bin/pgbackman_status_info','bin/pgbackman_alerts','bin/pgbackman-bulk-update'],
           data_files=install_files,
           install_requires=install_requires,
           platforms=['Linux'],
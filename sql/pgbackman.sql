@@ -1,5 +1,5 @@
 --
--- PgBackMan database - Version 5:1_3_1
+-- PgBackMan database - Version 6:1_4_0
 --
 -- Copyright (c) 2013-2017 Rafael Martinez Guerrero / PostgreSQL-es
 --
@@ -378,11 +378,19 @@ ALTER TABLE job_queue OWNER TO pgbackman_role_rw;
 -- @month_cron
 -- @weekday_cron
 -- @backup_code
--- @encryption: NOT IMPLEMENTED
+-- @encryption: Encrypt the dump files
 -- @retention_period
 -- @retention_redundancy
 -- @job_status
 -- @remarks
+-- @parallel_jobs: pg_dump --jobs for FULL and DATA backups.
+--                 NULL uses the PgSQL node parallel_jobs value
+-- @dump_compression: pg_dump --compress for FULL, DATA and SCHEMA
+--                    backups, e.g. 6, lz4, zstd:19, or the codec of
+--                    CLUSTER backups, e.g. pigz::8. NULL uses the
+--                    pg_dump default / cluster_compression
+-- @bandwidth_limit: MB/s read by pg_dump / pg_dumpall. NULL uses
+--                   only the PgSQL node bandwidth_limit value
 -- ------------------------------------------------------
 
 \echo '# [Creating table: backup_definition]\n'
@@ -405,7 +413,10 @@ CREATE TABLE backup_definition(
   retention_redundancy integer DEFAULT 1 NOT NULL,
   extra_backup_parameters TEXT DEFAULT '',
   job_status CHARACTER VARYING(20) NOT NULL,
-  remarks TEXT
+  remarks TEXT,
+  parallel_jobs INTEGER DEFAULT NULL,
+  dump_compression TEXT DEFAULT NULL,
+  bandwidth_limit INTEGER DEFAULT NULL
 );
 
 ALTER TABLE backup_definition ADD PRIMARY KEY (backup_server_id,pgsql_node_id,dbname,minutes_cron,hours_cron,day_month_cron,month_cron,weekday_cron,backup_code,extra_backup_parameters);
@@ -416,6 +427,38 @@ CREATE INDEX ON backup_definition(dbname);
 
 ALTER TABLE backup_definition OWNER TO pgbackman_role_rw;
 
+-- ------------------------------------------------------
+-- Table: backup_definition_spread
+--
+-- @Description: Start times assigned by
+--               update_backup_definition_spread() to backup
+--               definitions of PgSQL nodes with backup_spread = ON.
+--               These are used in the crontab instead of
+--               minutes_cron and hours_cron.
+--
+-- Attributes:
+--
+-- @def_id
+-- @minutes_cron
+-- @hours_cron
+-- @estimated_duration: Duration used to place the backup in the
+--                      backup window
+-- @registered
+-- ------------------------------------------------------
+
+\echo '# [Creating table: backup_definition_spread]\n'
+
+CREATE TABLE backup_definition_spread(
+  def_id BIGINT NOT NULL,
+  minutes_cron CHARACTER VARYING(255) NOT NULL,
+  hours_cron CHARACTER VARYING(255) NOT NULL,
+  estimated_duration INTERVAL,
+  registered TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+ALTER TABLE backup_definition_spread ADD PRIMARY KEY (def_id);
+ALTER TABLE backup_definition_spread OWNER TO pgbackman_role_rw;
+
 -- ------------------------------------------------------
 -- Table: snapshot_definition
 --
@@ -430,7 +473,7 @@ ALTER TABLE backup_definition OWNER TO pgbackman_role_rw;
 -- @dbname
 -- @at_time
 -- @backup_code
--- @encryption: NOT IMPLEMENTED
+-- @encryption: Encrypt the dump files
 -- @retention_period
 -- @remarks
 -- ------------------------------------------------------
@@ -550,7 +593,13 @@ CREATE TABLE backup_catalog(
   pgsql_node_release TEXT,
   pg_dump_release TEXT,
   checksum TEXT,
-  dbname_size BIGINT
+  dbname_size BIGINT,
+  parallel_jobs INTEGER,
+  compression TEXT,
+  queue_wait INTERVAL,
+  throttled INTERVAL,
+  estimated_size BIGINT,
+  manifest_file TEXT
 );
 
 ALTER TABLE backup_catalog ADD PRIMARY KEY (bck_id);
@@ -560,9 +609,56 @@ CREATE INDEX ON backup_catalog(snapshot_id);
 CREATE INDEX ON backup_catalog(backup_server_id);
 CREATE INDEX ON backup_catalog(pgsql_node_id);
 CREATE INDEX ON backup_catalog(dbname);
+CREATE INDEX ON backup_catalog(pgsql_node_id,bck_id);
+CREATE INDEX ON backup_catalog(def_id,bck_id);
+CREATE INDEX ON backup_catalog(finished);
 
 ALTER TABLE backup_catalog OWNER TO pgbackman_role_rw;
 
+-- ------------------------------------------------------
+-- Table: backup_in_progress
+--
+-- @Description: Progress of the backups running in the backup
+--               servers. Updated by pgbackman_dump while pg_dump /
+--               pg_dumpall runs and deleted when the backup is
+--               registered in the backup catalog.
+--
+-- Attributes:
+--
+-- @backup_server_id
+-- @procpid: pgbackman_dump process in the backup server
+-- @pgsql_node_id
+-- @dbname
+-- @def_id
+-- @snapshot_id
+-- @backup_code
+-- @started
+-- @updated
+-- @tables_dumped: 'dumping contents of table' lines in the pg_dump log
+-- @tables_total: tables in the database when the backup started
+-- @bytes_written: size of the dump file or directory
+-- ------------------------------------------------------
+
+\echo '# [Creating table: backup_in_progress]\n'
+
+CREATE TABLE backup_in_progress(
+  backup_server_id INTEGER NOT NULL,
+  procpid INTEGER NOT NULL,
+  pgsql_node_id INTEGER NOT NULL,
+  dbname TEXT NOT NULL,
+  def_id BIGINT DEFAULT NULL,
+  snapshot_id BIGINT DEFAULT NULL,
+  backup_code CHARACTER VARYING(10),
+  started TIMESTAMP WITH TIME ZONE NOT NULL,
+  updated TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  tables_dumped INTEGER,
+  tables_total INTEGER,
+  bytes_written BIGINT
+);
+
+ALTER TABLE backup_in_progress ADD PRIMARY KEY (backup_server_id,procpid);
+ALTER TABLE backup_in_progress OWNER TO pgbackman_role_rw;
+
 
 -- ------------------------------------------------------
 -- Table: restore_catalog
@@ -604,6 +700,8 @@ CREATE INDEX ON restore_catalog(backup_server_id);
 CREATE INDEX ON restore_catalog(target_pgsql_node_id);
 CREATE INDEX ON restore_catalog(source_dbname);
 CREATE INDEX ON restore_catalog(target_dbname);
+CREATE INDEX ON restore_catalog(target_pgsql_node_id,restore_id);
+CREATE INDEX ON restore_catalog(finished);
 
 ALTER TABLE restore_catalog OWNER TO pgbackman_role_rw;
 
@@ -684,7 +782,8 @@ CREATE TABLE catalog_entries_to_delete(
   pg_dump_roles_file TEXT,
   pg_dump_roles_log_file TEXT,
   pg_dump_dbconfig_file TEXT,
-  pg_dump_dbconfig_log_file TEXT
+  pg_dump_dbconfig_log_file TEXT,
+  manifest_file TEXT
 );
 
 ALTER TABLE catalog_entries_to_delete ADD PRIMARY KEY (del_id);
@@ -767,6 +866,50 @@ ALTER TABLE pgsql_node_config ADD PRIMARY KEY (node_id,parameter);
 ALTER TABLE pgsql_node_config OWNER TO pgbackman_role_rw;
 
 
+-- ------------------------------------------------------
+-- Table: pgbackman_stats_snapshot
+--
+-- @Description: Snapshot of the global, backup server
+--               and PgSQL node stats refreshed by
+--               pgbackman_maintenance
+--
+-- scope: GLOBAL, BACKUP_SERVER or PGSQL_NODE
+-- ref_id: SrvID or NodeID. 0 for GLOBAL
+-- ------------------------------------------------------
+
+\echo '# [Creating table: pgbackman_stats_snapshot]\n'
+
+CREATE TABLE pgbackman_stats_snapshot(
+  scope TEXT NOT NULL,
+  ref_id BIGINT NOT NULL,
+  refreshed TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  backup_server_running_cnt BIGINT,
+  backup_server_stopped_cnt BIGINT,
+  pgsql_node_running_cnt BIGINT,
+  pgsql_node_stopped_cnt BIGINT,
+  backup_server_cnt BIGINT,
+  pgsql_node_cnt BIGINT,
+  dbname_cnt BIGINT,
+  backup_jobs_active_cnt BIGINT,
+  backup_jobs_stopped_cnt BIGINT,
+  backup_jobs_cluster_cnt BIGINT,
+  backup_jobs_data_cnt BIGINT,
+  backup_jobs_full_cnt BIGINT,
+  backup_jobs_schema_cnt BIGINT,
+  backup_catalog_succeeded_cnt BIGINT,
+  backup_catalog_error_cnt BIGINT,
+  backup_space NUMERIC,
+  backup_duration INTERVAL,
+  oldest_backup_job TIMESTAMP WITH TIME ZONE,
+  newest_backup_job TIMESTAMP WITH TIME ZONE,
+  job_queue_cnt BIGINT,
+  defid_force_deletion_cnt BIGINT
+);
+
+ALTER TABLE pgbackman_stats_snapshot ADD PRIMARY KEY (scope,ref_id);
+ALTER TABLE pgbackman_stats_snapshot OWNER TO pgbackman_role_rw;
+
+
 -- ------------------------------------------------------
 -- Table: pgbackman_version
 --
@@ -832,6 +975,9 @@ ALTER TABLE ONLY backup_catalog
 ALTER TABLE ONLY backup_catalog
     ADD FOREIGN KEY (def_id) REFERENCES backup_definition (def_id) MATCH FULL ON DELETE RESTRICT;
 
+ALTER TABLE ONLY backup_definition_spread
+    ADD FOREIGN KEY (def_id) REFERENCES backup_definition (def_id) MATCH FULL ON DELETE CASCADE;
+
 ALTER TABLE ONLY backup_catalog
     ADD FOREIGN KEY (snapshot_id) REFERENCES snapshot_definition (snapshot_id) MATCH FULL ON DELETE RESTRICT;
 
@@ -950,7 +1096,7 @@ INSERT INTO backup_server_default_config (parameter,value,description)
 
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('pgnode_backup_partition','/srv/pgbackman/pgsql_node_%%pgnode%%','Partition to save pgbackman information for a pgnode');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('pgnode_crontab_file','/etc/cron.d/pgsql_node_%%pgnode%%','Crontab file for pgnode in the backup server');
-INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('encryption','false','GnuPG encryption - *Not used*');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('encryption','false','Encrypt the dump files with the encryption_backend');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('retention_period','7 days','Retention period for a backup job');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('retention_redundancy','1','Retention redundancy for a backup job');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('pgport','5432','postgreSQL port');
@@ -966,6 +1112,12 @@ INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('bac
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('backup_weekday_cron','*','Backup weekday cron default');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('extra_backup_parameters','','Extra backup parameters');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('extra_restore_parameters','','Extra restore parameters');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('parallel_jobs','1','Parallel pg_dump jobs for FULL and DATA backups');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('backup_spread','OFF','Spread the start time of backup definitions in backup_hours_interval');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('backup_spread_max_concurrency','4','Backups running at the same time with backup_spread ON');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('bandwidth_limit','0','Bandwidth limit in MB/s shared by the backups of the node running in a backup server. 0: no limit');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('backup_batch','OFF','Run the FULL, SCHEMA and DATA backups of the node with the same schedule in one node batch');
+INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('backup_batch_jobs','4','Backups of a node batch running at the same time');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('logs_email','example@example.org','E-mail to send logs');
 INSERT INTO pgsql_node_default_config (parameter,value,description) VALUES ('automatic_deletion_retention','14 days','Retention after automatic deletion of a backup definition');
 
@@ -978,7 +1130,7 @@ INSERT INTO alert_type (code,description) VALUES ('Restore-def','Alerts from fai
 
 \echo '# [Update: pgbackman_version]\n'
 
-INSERT INTO pgbackman_version (version,tag) VALUES ('5','v_1_3_1');
+INSERT INTO pgbackman_version (version,tag) VALUES ('6','v_1_4_0');
 
 
 -- ------------------------------------------------------------
@@ -2152,7 +2304,7 @@ ALTER FUNCTION update_pgsql_node(INTEGER,INTEGER,TEXT,TEXT,TEXT) OWNER TO pgback
 --
 -- ------------------------------------------------------------
 
-CREATE OR REPLACE FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,INTERVAL,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT,TEXT,TEXT) RETURNS VOID
+CREATE OR REPLACE FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,INTERVAL,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT,TEXT,TEXT,INTEGER DEFAULT NULL,TEXT DEFAULT NULL,INTEGER DEFAULT NULL,INTEGER DEFAULT NULL,TEXT DEFAULT NULL,INTEGER DEFAULT NULL) RETURNS VOID
  LANGUAGE plpgsql
  SECURITY INVOKER
  SET search_path = public, pg_temp
@@ -2178,8 +2330,16 @@ CREATE OR REPLACE FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,
   pgnode_backup_partition_ ALIAS FOR $18;
   pgnode_crontab_file_ ALIAS FOR $19;
   pgsql_node_status_ ALIAS FOR $20;
+  parallel_jobs_ ALIAS FOR $21;
+  backup_spread_ ALIAS FOR $22;
+  backup_spread_max_concurrency_ ALIAS FOR $23;
+  bandwidth_limit_ ALIAS FOR $24;
+  backup_batch_ ALIAS FOR $25;
+  backup_batch_jobs_ ALIAS FOR $26;
 
   node_cnt INTEGER;
+  crontab_changed BOOLEAN := FALSE;
+  job_row RECORD;
   v_msg     TEXT;
   v_detail  TEXT;
   v_context TEXT;
@@ -2189,6 +2349,25 @@ CREATE OR REPLACE FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,
 
    IF node_cnt != 0 THEN
 
+     --
+     -- The values are always sent by pgbackman, only a value
+     -- different from the stored one changes the crontab files
+     --
+
+     IF (backup_spread_ IS NOT NULL
+         AND upper(backup_spread_) IS DISTINCT FROM upper(COALESCE(get_pgsql_node_config_value(pgsql_node_id_,'backup_spread'),'OFF')))
+        OR (backup_spread_max_concurrency_ IS NOT NULL
+         AND GREATEST(backup_spread_max_concurrency_,1)::TEXT IS DISTINCT FROM get_pgsql_node_config_value(pgsql_node_id_,'backup_spread_max_concurrency'))
+        OR (backup_batch_ IS NOT NULL
+         AND upper(backup_batch_) IS DISTINCT FROM upper(COALESCE(get_pgsql_node_config_value(pgsql_node_id_,'backup_batch'),'OFF')))
+        OR (backup_batch_jobs_ IS NOT NULL
+         AND GREATEST(backup_batch_jobs_,1)::TEXT IS DISTINCT FROM get_pgsql_node_config_value(pgsql_node_id_,'backup_batch_jobs')) THEN
+       crontab_changed := TRUE;
+     ELSIF upper(COALESCE(get_pgsql_node_config_value(pgsql_node_id_,'backup_spread'),'OFF')) = 'ON'
+           AND get_pgsql_node_config_value(pgsql_node_id_,'backup_hours_interval') IS DISTINCT FROM backup_hours_interval_ THEN
+       crontab_changed := TRUE;
+     END IF;
+
      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''backup_minutes_interval'''
      USING pgsql_node_id_,
      	   backup_minutes_interval_;
@@ -2265,6 +2444,64 @@ CREATE OR REPLACE FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,
      USING pgsql_node_id_,
      	   pgsql_node_status_;
 
+    IF parallel_jobs_ IS NOT NULL THEN
+      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''parallel_jobs'''
+      USING pgsql_node_id_,
+     	    GREATEST(parallel_jobs_,1)::TEXT;
+    END IF;
+
+    IF backup_spread_ IS NOT NULL THEN
+      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''backup_spread'''
+      USING pgsql_node_id_,
+     	    upper(backup_spread_);
+    END IF;
+
+    IF backup_spread_max_concurrency_ IS NOT NULL THEN
+      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''backup_spread_max_concurrency'''
+      USING pgsql_node_id_,
+     	    GREATEST(backup_spread_max_concurrency_,1)::TEXT;
+    END IF;
+
+    IF bandwidth_limit_ IS NOT NULL THEN
+      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''bandwidth_limit'''
+      USING pgsql_node_id_,
+     	    GREATEST(bandwidth_limit_,0)::TEXT;
+    END IF;
+
+    IF backup_batch_ IS NOT NULL THEN
+      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''backup_batch'''
+      USING pgsql_node_id_,
+     	    upper(backup_batch_);
+    END IF;
+
+    IF backup_batch_jobs_ IS NOT NULL THEN
+      EXECUTE 'UPDATE pgsql_node_config SET value = $2 WHERE node_id = $1 AND parameter = ''backup_batch_jobs'''
+      USING pgsql_node_id_,
+     	    GREATEST(backup_batch_jobs_,1)::TEXT;
+    END IF;
+
+    --
+    -- The crontab files of the PgSQL node have to be generated again
+    -- if the spread or the batches of its backup definitions can
+    -- change
+    --
+
+    IF crontab_changed THEN
+      FOR job_row IN (
+       SELECT DISTINCT a.backup_server_id
+       FROM backup_definition a
+       WHERE a.pgsql_node_id = pgsql_node_id_
+       AND NOT EXISTS (SELECT 1 FROM job_queue b WHERE b.backup_server_id = a.backup_server_id AND b.pgsql_node_id = a.pgsql_node_id AND b.is_assigned IS FALSE)
+      ) LOOP
+
+        EXECUTE 'INSERT INTO job_queue (backup_server_id,pgsql_node_id) VALUES ($1,$2)'
+        USING job_row.backup_server_id,
+              pgsql_node_id_;
+
+        PERFORM pg_notify('channel_bs' || job_row.backup_server_id || '_pg' || pgsql_node_id_,'Backup jobs for ' || get_pgsql_node_fqdn(pgsql_node_id_) || ' updated on ' || get_backup_server_fqdn(job_row.backup_server_id));
+      END LOOP;
+    END IF;
+
     ELSE
       RAISE EXCEPTION 'PgSQL node % does not exist',pgsql_node_id_;
     END IF;
@@ -2278,7 +2515,7 @@ CREATE OR REPLACE FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,
   END;
 $$;
 
-ALTER FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,INTERVAL,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT,TEXT,TEXT) OWNER TO pgbackman_role_rw;
+ALTER FUNCTION update_pgsql_node_config(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,INTERVAL,TEXT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT,TEXT,TEXT,INTEGER,TEXT,INTEGER,INTEGER,TEXT,INTEGER) OWNER TO pgbackman_role_rw;
 
 -- ------------------------------------------------------------
 -- Function: update_backup_server_config()
@@ -2557,7 +2794,8 @@ CREATE OR REPLACE FUNCTION delete_force_backup_definition_id(INTEGER) RETURNS VO
 			   pg_dump_roles_file,
 			   pg_dump_roles_log_file,
 			   pg_dump_dbconfig_file,
-			   pg_dump_dbconfig_log_file
+			   pg_dump_dbconfig_log_file,
+			   manifest_file
              ),save_catinfo AS (
 	       INSERT INTO catalog_entries_to_delete(
 	       	      	   def_id,
@@ -2568,7 +2806,8 @@ CREATE OR REPLACE FUNCTION delete_force_backup_definition_id(INTEGER) RETURNS VO
 			   pg_dump_roles_file,
 			   pg_dump_roles_log_file,
 			   pg_dump_dbconfig_file,
-			   pg_dump_dbconfig_log_file)
+			   pg_dump_dbconfig_log_file,
+			   manifest_file)
 		SELECT * FROM del_catid
              )
              DELETE FROM backup_definition
@@ -2670,7 +2909,8 @@ CREATE OR REPLACE FUNCTION delete_force_backup_definition_dbname(INTEGER,TEXT) R
 			   pg_dump_roles_file,
 			   pg_dump_roles_log_file,
 			   pg_dump_dbconfig_file,
-			   pg_dump_dbconfig_log_file
+			   pg_dump_dbconfig_log_file,
+			   manifest_file
              ),save_catinfo AS (
 	       INSERT INTO catalog_entries_to_delete(
 	       	      	   def_id,
@@ -2681,7 +2921,8 @@ CREATE OR REPLACE FUNCTION delete_force_backup_definition_dbname(INTEGER,TEXT) R
 			   pg_dump_roles_file,
 			   pg_dump_roles_log_file,
 			   pg_dump_dbconfig_file,
-			   pg_dump_dbconfig_log_file)
+			   pg_dump_dbconfig_log_file,
+			   manifest_file)
 		SELECT * FROM del_catid
              )
              DELETE FROM backup_definition
@@ -2744,7 +2985,7 @@ ALTER FUNCTION delete_pgsql_node_to_delete(INTEGER,INTEGER) OWNER TO pgbackman_r
 -- Function: update_backup_definition()
 -- ------------------------------------------------------------
 
-CREATE OR REPLACE FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,TEXT,TEXT,TEXT) RETURNS VOID
+CREATE OR REPLACE FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,TEXT,TEXT,TEXT,INTEGER DEFAULT NULL,TEXT DEFAULT NULL,INTEGER DEFAULT NULL) RETURNS VOID
  LANGUAGE plpgsql
  SECURITY INVOKER
  SET search_path = public, pg_temp
@@ -2761,6 +3002,9 @@ CREATE OR REPLACE FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,
   extra_backup_parameters_ ALIAS FOR $9;
   job_status_ ALIAS FOR $10;
   remarks_ ALIAS FOR $11;
+  parallel_jobs_ ALIAS FOR $12;
+  dump_compression_ ALIAS FOR $13;
+  bandwidth_limit_ ALIAS FOR $14;
 
   defid_cnt INTEGER;
 
@@ -2782,7 +3026,10 @@ CREATE OR REPLACE FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,
 					    retention_redundancy = $8,
 					    extra_backup_parameters = $9,
 					    job_status = $10,
-					    remarks = $11
+					    remarks = $11,
+					    parallel_jobs = CASE WHEN $12 IS NULL THEN parallel_jobs ELSE NULLIF($12,0) END,
+					    dump_compression = CASE WHEN $13 IS NULL THEN dump_compression ELSE NULLIF($13,'''') END,
+					    bandwidth_limit = CASE WHEN $14 IS NULL THEN bandwidth_limit ELSE NULLIF($14,0) END
 	      WHERE def_id = $1'
 
      USING def_id_,
@@ -2795,7 +3042,10 @@ CREATE OR REPLACE FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,
 	   retention_redundancy_,
 	   extra_backup_parameters_,
 	   job_status_,
-	   remarks_;
+	   remarks_,
+	   parallel_jobs_,
+	   dump_compression_,
+	   bandwidth_limit_;
 
     ELSE
       RAISE EXCEPTION 'Backup definition with DefID: % does not exist',def_id_;
@@ -2810,7 +3060,7 @@ CREATE OR REPLACE FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,
   END;
 $$;
 
-ALTER FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,TEXT,TEXT,TEXT) OWNER TO pgbackman_role_rw;
+ALTER FUNCTION update_backup_definition(INTEGER,TEXT,TEXT,TEXT,TEXT,TEXT,INTERVAL,INTEGER,TEXT,TEXT,TEXT,INTEGER,TEXT,INTEGER) OWNER TO pgbackman_role_rw;
 
 
 -- ------------------------------------------------------------
@@ -3190,6 +3440,18 @@ CREATE OR REPLACE FUNCTION get_backup_definition_def_value(INTEGER,TEXT) RETURNS
   ELSIF parameter_ = 'remarks' THEN
    SELECT remarks FROM backup_definition WHERE def_id = def_id_ INTO value_;
 
+  ELSIF parameter_ = 'parallel_jobs' THEN
+   SELECT COALESCE(parallel_jobs,0) FROM backup_definition WHERE def_id = def_id_ INTO value_;
+
+  ELSIF parameter_ = 'dump_compression' THEN
+   SELECT COALESCE(dump_compression,'') FROM backup_definition WHERE def_id = def_id_ INTO value_;
+
+  ELSIF parameter_ = 'backup_code' THEN
+   SELECT backup_code FROM backup_definition WHERE def_id = def_id_ INTO value_;
+
+  ELSIF parameter_ = 'bandwidth_limit' THEN
+   SELECT COALESCE(bandwidth_limit,0) FROM backup_definition WHERE def_id = def_id_ INTO value_;
+
   ELSE
      RAISE EXCEPTION 'Problems getting the value of DefID: % - parameter: %',def_id_,parameter_;
   END IF;
@@ -3638,6 +3900,122 @@ $$;
 ALTER FUNCTION get_listen_channel_names(INTEGER) OWNER TO pgbackman_role_rw;
 
 
+-- ------------------------------------------------------------
+-- Function: update_backup_definition_spread()
+-- ------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION update_backup_definition_spread(INTEGER,INTEGER) RETURNS VOID
+ LANGUAGE plpgsql
+ SECURITY INVOKER
+ SET search_path = public, pg_temp
+ AS $$
+ DECLARE
+  backup_server_id_ ALIAS FOR $1;
+  pgsql_node_id_ ALIAS FOR $2;
+
+  backup_spread TEXT;
+  backup_hours_interval TEXT;
+  max_concurrency INTEGER;
+  window_start INTEGER;
+  window_minutes INTEGER;
+  slots INTEGER[];
+  slot INTEGER;
+  start_minute INTEGER;
+  job_row RECORD;
+
+  v_msg     TEXT;
+  v_detail  TEXT;
+  v_context TEXT;
+ BEGIN
+
+  --
+  -- With backup_spread = ON, the backup definitions of a PgSQL node
+  -- in a backup server get a start time in the backup window
+  -- defined by backup_hours_interval. The longest backups start
+  -- first, each one in the first of backup_spread_max_concurrency
+  -- slots to be free. The duration of a backup is the 90th
+  -- percentile of its successful backups during the last 30 days,
+  -- or the average of the PgSQL node if it has none.
+  --
+  -- Only definitions with a fixed minute and hour are spread. If
+  -- the backups do not fit in the window, the start times wrap
+  -- around to the beginning of the window.
+  --
+
+  EXECUTE 'DELETE FROM backup_definition_spread WHERE def_id IN (SELECT def_id FROM backup_definition WHERE backup_server_id = $1 AND pgsql_node_id = $2)'
+  USING backup_server_id_,
+        pgsql_node_id_;
+
+  backup_spread := get_pgsql_node_config_value(pgsql_node_id_,'backup_spread');
+
+  IF backup_spread IS NULL OR upper(backup_spread) <> 'ON' THEN
+    RETURN;
+  END IF;
+
+  backup_hours_interval := get_pgsql_node_config_value(pgsql_node_id_,'backup_hours_interval');
+  max_concurrency := GREATEST(COALESCE(get_pgsql_node_config_value(pgsql_node_id_,'backup_spread_max_concurrency')::INTEGER,1),1);
+
+  window_start := split_part(backup_hours_interval,'-',1)::INTEGER;
+  window_minutes := ((split_part(backup_hours_interval,'-',2)::INTEGER - window_start + 24) % 24 + 1) * 60;
+
+  slots := array_fill(0,ARRAY[max_concurrency]);
+
+  FOR job_row IN (
+   WITH durations AS (
+    SELECT c.def_id,
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY extract(epoch FROM c.duration)) AS seconds
+    FROM backup_catalog c
+    WHERE c.backup_server_id = backup_server_id_
+    AND c.pgsql_node_id = pgsql_node_id_
+    AND c.def_id IS NOT NULL
+    AND c.execution_status = 'SUCCEEDED'
+    AND c.finished > now() - interval '30 days'
+    GROUP BY c.def_id
+   )
+   SELECT a.def_id,
+          GREATEST(ceil(COALESCE(d.seconds,(SELECT avg(seconds) FROM durations),60) / 60),1)::INTEGER AS minutes
+   FROM backup_definition a
+   LEFT JOIN durations d ON d.def_id = a.def_id
+   WHERE a.backup_server_id = backup_server_id_
+   AND a.pgsql_node_id = pgsql_node_id_
+   AND a.job_status = 'ACTIVE'
+   AND a.minutes_cron ~ '^[0-9]+$'
+   AND a.hours_cron ~ '^[0-9]+$'
+   ORDER BY 2 DESC,a.def_id
+  ) LOOP
+
+   slot := 1;
+
+   FOR i IN 2..max_concurrency LOOP
+     IF slots[i] < slots[slot] THEN
+       slot := i;
+     END IF;
+   END LOOP;
+
+   start_minute := window_start * 60 + slots[slot] % window_minutes;
+   slots[slot] := slots[slot] + job_row.minutes;
+
+   EXECUTE 'INSERT INTO backup_definition_spread (def_id,minutes_cron,hours_cron,estimated_duration) VALUES ($1,$2,$3,$4)'
+   USING job_row.def_id,
+         lpad((start_minute % 60)::TEXT,2,'0'),
+         lpad((start_minute / 60 % 24)::TEXT,2,'0'),
+         job_row.minutes * interval '1 minute';
+
+  END LOOP;
+
+ EXCEPTION WHEN others THEN
+   	GET STACKED DIAGNOSTICS
+            v_msg     = MESSAGE_TEXT,
+            v_detail  = PG_EXCEPTION_DETAIL,
+            v_context = PG_EXCEPTION_CONTEXT;
+        RAISE EXCEPTION E'\n----------------------------------------------\nEXCEPTION:\n----------------------------------------------\nMESSAGE: % \nDETAIL : % \n----------------------------------------------\n', v_msg, v_detail;
+
+ END;
+$$;
+
+ALTER FUNCTION update_backup_definition_spread(INTEGER,INTEGER) OWNER TO pgbackman_role_rw;
+
+
 -- ------------------------------------------------------------
 -- Function: generate_crontab_file()
 -- ------------------------------------------------------------
@@ -3662,6 +4040,13 @@ CREATE OR REPLACE FUNCTION generate_crontab_backup_jobs(INTEGER,INTEGER) RETURNS
   root_backup_dir TEXT := '';
   admin_user TEXT := '';
   pgbackman_dump TEXT := '';
+  backup_batch BOOLEAN := FALSE;
+  backup_batch_jobs TEXT := '';
+
+  node_args TEXT := '';
+  job_args TEXT := '';
+  batch_jobs_output TEXT := '';
+  batch_output TEXT := '';
 
   output TEXT := '';
 BEGIN
@@ -3672,6 +4057,8 @@ BEGIN
   RETURN output;
  END IF;
 
+ PERFORM update_backup_definition_spread(backup_server_id_,pgsql_node_id_);
+
  logs_email := get_pgsql_node_config_value(pgsql_node_id_,'logs_email');
  pgnode_crontab_file := get_pgsql_node_config_value(pgsql_node_id_,'pgnode_crontab_file');
  root_backup_dir := get_backup_server_config_value(backup_server_id_,'root_backup_partition');
@@ -3680,6 +4067,8 @@ BEGIN
  pgsql_node_port := get_pgsql_node_port(pgsql_node_id_);
  admin_user := get_pgsql_node_admin_user(pgsql_node_id_);
  pgbackman_dump := get_backup_server_config_value(backup_server_id_,'pgbackman_dump');
+ backup_batch := upper(COALESCE(get_pgsql_node_config_value(pgsql_node_id_,'backup_batch'),'OFF')) = 'ON';
+ backup_batch_jobs := COALESCE(get_pgsql_node_config_value(pgsql_node_id_,'backup_batch_jobs'),'4');
 
  output := output || '# File: ' || COALESCE(pgnode_crontab_file,'') || E'\n';
  output := output || '# ' || E'\n';
@@ -3696,49 +4085,100 @@ BEGIN
  output := output || 'MAILTO=' || COALESCE(logs_email,'') || E'\n';
  output := output || E'\n';
 
+ node_args := ' --node-fqdn ' || pgsql_node_fqdn ||
+	      ' --node-id ' || pgsql_node_id_ ||
+	      ' --node-port ' || pgsql_node_port ||
+	      ' --node-user ' || admin_user;
+
  --
  -- Generating backup jobs output for jobs
  -- with job_status = ACTIVE for a backup server
  -- and a PgSQL node
  --
+ -- With backup_batch = ON, the FULL, SCHEMA and DATA backup jobs
+ -- of the node with the same schedule are run by one
+ -- pgbackman_dump process (node batch). The batch gets the DefID
+ -- of its first backup job as BatchID. The arguments of the backup
+ -- jobs of a batch are written in '# pgbackman batch <BatchID>:'
+ -- lines of this file and read from here by pgbackman_dump.
+ --
 
  FOR job_row IN (
- SELECT a.*
- FROM backup_definition a
- join pgsql_node b on a.pgsql_node_id = b.node_id
- WHERE a.backup_server_id = backup_server_id_
- AND a.pgsql_node_id = pgsql_node_id_
- AND a.job_status = 'ACTIVE'
- AND b.status = 'RUNNING'
- ORDER BY a.dbname,a.minutes_cron,a.hours_cron,a.day_month_cron,a.month_cron,a.weekday_cron,a.backup_code
+ SELECT c.*,
+        min(c.def_id) OVER w AS batch_id,
+        count(*) OVER w AS batch_cnt
+ FROM (
+  SELECT a.*,
+         COALESCE(s.minutes_cron, a.minutes_cron, '*') || ' ' || COALESCE(s.hours_cron, a.hours_cron, '*') || ' ' || COALESCE(a.day_month_cron, '*') || ' ' || COALESCE(a.month_cron, '*') || ' ' || COALESCE(a.weekday_cron, '*') AS schedule,
+         a.backup_code IN ('FULL','SCHEMA','DATA') AS batch_code
+  FROM backup_definition a
+  join pgsql_node b on a.pgsql_node_id = b.node_id
+  LEFT JOIN backup_definition_spread s ON s.def_id = a.def_id
+  WHERE a.backup_server_id = backup_server_id_
+  AND a.pgsql_node_id = pgsql_node_id_
+  AND a.job_status = 'ACTIVE'
+  AND b.status = 'RUNNING'
+ ) c
+ WINDOW w AS (PARTITION BY c.schedule,c.batch_code)
+ ORDER BY c.dbname,c.minutes_cron,c.hours_cron,c.day_month_cron,c.month_cron,c.weekday_cron,c.backup_code
  ) LOOP
 
-  output := output || COALESCE(job_row.minutes_cron, '*') || ' ' || COALESCE(job_row.hours_cron, '*') || ' ' || COALESCE(job_row.day_month_cron, '*') || ' ' || COALESCE(job_row.month_cron, '*') || ' ' || COALESCE(job_row.weekday_cron, '*');
-
-  output := output || ' pgbackman';
-  output := output || ' ' || pgbackman_dump ||
-  	    	   ' --node-fqdn ' || pgsql_node_fqdn ||
-		   ' --node-id ' || pgsql_node_id_ ||
-		   ' --node-port ' || pgsql_node_port ||
-		   ' --node-user ' || admin_user ||
-		   ' --def-id ' || job_row.def_id;
+  job_args := ' --def-id ' || job_row.def_id;
 
   IF job_row.backup_code != 'CLUSTER' THEN
-     output := output || ' --dbname ' || job_row.dbname;
+     job_args := job_args || ' --dbname ' || job_row.dbname;
   END IF;
 
-  output := output || ' --encryption ' || job_row.encryption::TEXT ||
-		      ' --backup-code ' || job_row.backup_code ||
-		      ' --root-backup-dir ' || root_backup_dir;
+  job_args := job_args || ' --encryption ' || job_row.encryption::TEXT ||
+		          ' --backup-code ' || job_row.backup_code;
 
   IF job_row.extra_backup_parameters != '' AND job_row.extra_backup_parameters IS NOT NULL THEN
-    output := output || ' --extra-backup-parameters "''' || job_row.extra_backup_parameters || '''"';
+    job_args := job_args || ' --extra-backup-parameters "''' || job_row.extra_backup_parameters || '''"';
+  END IF;
+
+  IF job_row.parallel_jobs IS NOT NULL AND job_row.backup_code IN ('FULL','DATA') THEN
+    job_args := job_args || ' --parallel-jobs ' || job_row.parallel_jobs;
   END IF;
 
-  output := output || E'\n';
+  IF job_row.dump_compression IS NOT NULL AND job_row.backup_code IN ('FULL','DATA','SCHEMA','CLUSTER') THEN
+    job_args := job_args || ' --dump-compression ' || job_row.dump_compression;
+  END IF;
+
+  IF job_row.bandwidth_limit IS NOT NULL AND job_row.backup_code IN ('FULL','DATA','SCHEMA','CLUSTER') THEN
+    job_args := job_args || ' --bandwidth-limit ' || job_row.bandwidth_limit;
+  END IF;
+
+  IF backup_batch AND job_row.batch_code AND job_row.batch_cnt > 1 THEN
+
+    batch_jobs_output := batch_jobs_output || '# pgbackman batch ' || job_row.batch_id || ':' || job_args || E'\n';
+
+    IF job_row.def_id = job_row.batch_id THEN
+      batch_output := batch_output || job_row.schedule ||
+                      ' pgbackman ' || pgbackman_dump || node_args ||
+                      ' --root-backup-dir ' || root_backup_dir ||
+                      ' --batch-id ' || job_row.batch_id ||
+                      ' --batch-jobs ' || backup_batch_jobs ||
+                      ' --batch-file ' || pgnode_crontab_file || E'\n';
+    END IF;
+
+  ELSE
+    output := output || job_row.schedule ||
+                        ' pgbackman ' || pgbackman_dump || node_args ||
+                        job_args ||
+                        ' --root-backup-dir ' || root_backup_dir || E'\n';
+  END IF;
 
  END LOOP;
 
+ IF batch_output != '' THEN
+   output := output || E'\n';
+   output := output || '#' || E'\n';
+   output := output || '# Node batches' || E'\n';
+   output := output || '#' || E'\n';
+   output := output || batch_jobs_output || E'\n';
+   output := output || batch_output;
+ END IF;
+
  RETURN output;
 END;
 $$;
@@ -3990,11 +4430,100 @@ $$;
 ALTER FUNCTION get_pgsql_node_admin_user(INTEGER) OWNER TO pgbackman_role_rw;
 
 
+-- ------------------------------------------------------------
+-- Function: update_backup_in_progress()
+-- ------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION update_backup_in_progress(INTEGER,INTEGER,INTEGER,TEXT,BIGINT,BIGINT,TEXT,TIMESTAMP WITH TIME ZONE,INTEGER,INTEGER,BIGINT) RETURNS VOID
+ LANGUAGE plpgsql
+ SECURITY INVOKER
+ SET search_path = public, pg_temp
+ AS $$
+ DECLARE
+
+  backup_server_id_ ALIAS FOR $1;
+  procpid_ ALIAS FOR $2;
+  pgsql_node_id_ ALIAS FOR $3;
+  dbname_ ALIAS FOR $4;
+  def_id_ ALIAS FOR $5;
+  snapshot_id_ ALIAS FOR $6;
+  backup_code_ ALIAS FOR $7;
+  started_ ALIAS FOR $8;
+  tables_dumped_ ALIAS FOR $9;
+  tables_total_ ALIAS FOR $10;
+  bytes_written_ ALIAS FOR $11;
+
+  row_cnt INTEGER;
+
+  v_msg     TEXT;
+  v_detail  TEXT;
+  v_context TEXT;
+ BEGIN
+
+    EXECUTE 'UPDATE backup_in_progress SET updated = now(),
+                                           tables_dumped = $3,
+                                           tables_total = $4,
+                                           bytes_written = $5
+             WHERE backup_server_id = $1 AND procpid = $2'
+    USING  backup_server_id_,
+           procpid_,
+           tables_dumped_,
+           tables_total_,
+           bytes_written_;
+
+    GET DIAGNOSTICS row_cnt = ROW_COUNT;
+
+    IF row_cnt = 0 THEN
+
+      --
+      -- Rows of pgbackman_dump processes that stopped without
+      -- registering their backup are removed after one day
+      --
+
+      EXECUTE 'DELETE FROM backup_in_progress WHERE backup_server_id = $1 AND updated < now() - interval ''1 day'''
+      USING backup_server_id_;
+
+      EXECUTE 'INSERT INTO backup_in_progress (backup_server_id,
+                                               procpid,
+                                               pgsql_node_id,
+                                               dbname,
+                                               def_id,
+                                               snapshot_id,
+                                               backup_code,
+                                               started,
+                                               tables_dumped,
+                                               tables_total,
+                                               bytes_written)
+               VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11)'
+      USING  backup_server_id_,
+             procpid_,
+             pgsql_node_id_,
+             dbname_,
+             def_id_,
+             snapshot_id_,
+             backup_code_,
+             started_,
+             tables_dumped_,
+             tables_total_,
+             bytes_written_;
+    END IF;
+
+ EXCEPTION WHEN others THEN
+   	GET STACKED DIAGNOSTICS
+            v_msg     = MESSAGE_TEXT,
+            v_detail  = PG_EXCEPTION_DETAIL,
+            v_context = PG_EXCEPTION_CONTEXT;
+        RAISE EXCEPTION E'\n----------------------------------------------\nEXCEPTION:\n----------------------------------------------\nMESSAGE: % \nDETAIL : % \n----------------------------------------------\n', v_msg, v_detail;
+ END;
+$$;
+
+ALTER FUNCTION update_backup_in_progress(INTEGER,INTEGER,INTEGER,TEXT,BIGINT,BIGINT,TEXT,TIMESTAMP WITH TIME ZONE,INTEGER,INTEGER,BIGINT) OWNER TO pgbackman_role_rw;
+
 -- ------------------------------------------------------------
 -- Function: register_backup_catalog()
 -- ------------------------------------------------------------
 
-CREATE OR REPLACE FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEGER,TEXT,TIMESTAMP WITH TIME ZONE,TIMESTAMP WITH TIME ZONE,INTERVAL,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT[],TEXT,TEXT) RETURNS VOID
+CREATE OR REPLACE FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEGER,TEXT,TIMESTAMP WITH TIME ZONE,TIMESTAMP WITH TIME ZONE,INTERVAL,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT[],TEXT,TEXT,INTEGER DEFAULT NULL,TEXT DEFAULT NULL,INTERVAL DEFAULT NULL,INTERVAL DEFAULT NULL,BIGINT DEFAULT NULL,BIGINT DEFAULT NULL,TEXT DEFAULT NULL,TEXT DEFAULT NULL) RETURNS VOID
  LANGUAGE plpgsql
  SECURITY INVOKER
  SET search_path = public, pg_temp
@@ -4026,6 +4555,14 @@ CREATE OR REPLACE FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEG
   role_list_ ALIAS FOR $23;
   pgsql_node_release_ ALIAS FOR $24;
   pg_dump_release_ ALIAS FOR $25;
+  parallel_jobs_ ALIAS FOR $26;
+  compression_ ALIAS FOR $27;
+  queue_wait_ ALIAS FOR $28;
+  throttled_ ALIAS FOR $29;
+  dbname_size_ ALIAS FOR $30;
+  estimated_size_ ALIAS FOR $31;
+  manifest_file_ ALIAS FOR $32;
+  checksum_ ALIAS FOR $33;
 
   v_msg     TEXT;
   v_detail  TEXT;
@@ -4056,8 +4593,16 @@ CREATE OR REPLACE FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEG
 					     snapshot_id,
 					     role_list,
 					     pgsql_node_release,
-					     pg_dump_release)
-	     VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,$17,$18,$19,$20,$21,$22,$23,$24,$25)'
+					     pg_dump_release,
+					     parallel_jobs,
+					     compression,
+					     queue_wait,
+					     throttled,
+					     dbname_size,
+					     estimated_size,
+					     manifest_file,
+					     checksum)
+	     VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,$17,$18,$19,$20,$21,$22,$23,$24,$25,$26,$27,$28,$29,$30,$31,$32,$33)'
     USING  def_id_,
     	   procpid_,
     	   backup_server_id_,
@@ -4082,7 +4627,23 @@ CREATE OR REPLACE FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEG
 	   snapshot_id_,
 	   role_list_,
 	   pgsql_node_release_,
-	   pg_dump_release_;
+	   pg_dump_release_,
+	   parallel_jobs_,
+	   compression_,
+	   queue_wait_,
+	   throttled_,
+	   dbname_size_,
+	   estimated_size_,
+	   manifest_file_,
+	   checksum_;
+
+    --
+    -- The backup is not in progress anymore
+    --
+
+    EXECUTE 'DELETE FROM backup_in_progress WHERE backup_server_id = $1 AND procpid = $2'
+    USING  backup_server_id_,
+           procpid_;
 
  EXCEPTION WHEN others THEN
    	GET STACKED DIAGNOSTICS
@@ -4094,7 +4655,7 @@ CREATE OR REPLACE FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEG
  END;
 $$;
 
-ALTER FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEGER,TEXT,TIMESTAMP WITH TIME ZONE,TIMESTAMP WITH TIME ZONE,INTERVAL,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT[],TEXT,TEXT) OWNER TO pgbackman_role_rw;
+ALTER FUNCTION register_backup_catalog(INTEGER,INTEGER,INTEGER,INTEGER,TEXT,TIMESTAMP WITH TIME ZONE,TIMESTAMP WITH TIME ZONE,INTERVAL,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,BIGINT,TEXT,TEXT,TEXT,TEXT,TEXT,INTEGER,TEXT[],TEXT,TEXT,INTEGER,TEXT,INTERVAL,INTERVAL,BIGINT,BIGINT,TEXT,TEXT) OWNER TO pgbackman_role_rw;
 
 
 -- ------------------------------------------------------------
@@ -4407,6 +4968,52 @@ $$;
 
 ALTER FUNCTION get_backup_server_id_from_bckid(INTEGER) OWNER TO pgbackman_role_rw;
 
+-- ------------------------------------------------------------
+-- Function: get_backup_size_ratio()
+-- ------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION get_backup_size_ratio(INTEGER,TEXT,TEXT,BIGINT) RETURNS NUMERIC
+ LANGUAGE plpgsql
+ SECURITY INVOKER
+ SET search_path = public, pg_temp
+ AS $$
+ DECLARE
+ pgsql_node_id_ ALIAS FOR $1;
+ dbname_ ALIAS FOR $2;
+ backup_code_ ALIAS FOR $3;
+ def_id_ ALIAS FOR $4;
+ ratio_ NUMERIC;
+
+ BEGIN
+  --
+  -- This function returns the largest dump size / database size
+  -- ratio of the last 5 succeeded backups of a backup definition,
+  -- or of the snapshots of the same database and backup code if
+  -- def_id is NULL. It returns NULL if there are no backups with
+  -- the database size registered. Used by pgbackman_dump to
+  -- estimate the size of a backup before it starts.
+  --
+
+  SELECT max(a.pg_dump_file_size::numeric / a.dbname_size)
+  FROM (SELECT b.pg_dump_file_size,
+               b.dbname_size
+        FROM backup_catalog b
+        LEFT JOIN snapshot_definition s ON s.snapshot_id = b.snapshot_id
+        WHERE b.execution_status = 'SUCCEEDED'
+        AND b.dbname_size > 0
+        AND ((def_id_ IS NOT NULL AND b.def_id = def_id_)
+             OR (def_id_ IS NULL AND b.pgsql_node_id = pgsql_node_id_ AND b.dbname = dbname_ AND s.backup_code = backup_code_))
+        ORDER BY b.finished DESC
+        LIMIT 5) a
+  INTO ratio_;
+
+  RETURN ratio_;
+ END;
+$$;
+
+ALTER FUNCTION get_backup_size_ratio(INTEGER,TEXT,TEXT,BIGINT) OWNER TO pgbackman_role_rw;
+
+
 -- ------------------------------------------------------------
 -- Function: get_roles_from_bckid()
 -- ------------------------------------------------------------
@@ -4510,6 +5117,165 @@ $$;
 ALTER FUNCTION register_restore_definition(TIMESTAMP,INTEGER,INTEGER,INTEGER,TEXT,TEXT,TEXT,TEXT[]) OWNER TO pgbackman_role_rw;
 
 
+-- ------------------------------------------------------------
+-- Function: refresh_pgbackman_stats_snapshot()
+--
+-- Recalculates all rows in pgbackman_stats_snapshot. Every
+-- table is read once per scope with FILTER aggregates.
+-- ------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION refresh_pgbackman_stats_snapshot() RETURNS VOID
+ LANGUAGE plpgsql
+ SECURITY INVOKER
+ SET search_path = public, pg_temp
+ AS $$
+ DECLARE
+
+  v_msg     TEXT;
+  v_detail  TEXT;
+  v_context TEXT;
+ BEGIN
+
+   DELETE FROM pgbackman_stats_snapshot;
+
+   INSERT INTO pgbackman_stats_snapshot (scope,ref_id,
+                                         backup_server_running_cnt,backup_server_stopped_cnt,
+                                         pgsql_node_running_cnt,pgsql_node_stopped_cnt,
+                                         backup_server_cnt,pgsql_node_cnt,dbname_cnt,
+                                         backup_jobs_active_cnt,backup_jobs_stopped_cnt,
+                                         backup_jobs_cluster_cnt,backup_jobs_data_cnt,backup_jobs_full_cnt,backup_jobs_schema_cnt,
+                                         backup_catalog_succeeded_cnt,backup_catalog_error_cnt,
+                                         backup_space,backup_duration,oldest_backup_job,newest_backup_job,
+                                         job_queue_cnt,defid_force_deletion_cnt)
+   SELECT 'GLOBAL',0,
+          bs.running_cnt,bs.stopped_cnt,
+          pn.running_cnt,pn.stopped_cnt,
+          bd.backup_server_cnt,bd.pgsql_node_cnt,bd.dbname_cnt,
+          bd.active_cnt,bd.stopped_cnt,
+          bd.cluster_cnt,bd.data_cnt,bd.full_cnt,bd.schema_cnt,
+          bc.succeeded_cnt,bc.error_cnt,
+          bc.backup_space,bc.backup_duration,bc.oldest_backup_job,bc.newest_backup_job,
+          jq.job_queue_cnt,ce.defid_force_deletion_cnt
+   FROM (SELECT count(*) FILTER (WHERE status = 'RUNNING') AS running_cnt,
+                count(*) FILTER (WHERE status = 'STOPPED') AS stopped_cnt
+         FROM backup_server) AS bs,
+        (SELECT count(*) FILTER (WHERE status = 'RUNNING') AS running_cnt,
+                count(*) FILTER (WHERE status = 'STOPPED') AS stopped_cnt
+         FROM pgsql_node) AS pn,
+        (SELECT count(DISTINCT backup_server_id) AS backup_server_cnt,
+                count(DISTINCT pgsql_node_id) AS pgsql_node_cnt,
+                count(DISTINCT (pgsql_node_id,dbname)) AS dbname_cnt,
+                count(*) FILTER (WHERE job_status = 'ACTIVE') AS active_cnt,
+                count(*) FILTER (WHERE job_status = 'STOPPED') AS stopped_cnt,
+                count(*) FILTER (WHERE backup_code = 'CLUSTER') AS cluster_cnt,
+                count(*) FILTER (WHERE backup_code = 'DATA') AS data_cnt,
+                count(*) FILTER (WHERE backup_code = 'FULL') AS full_cnt,
+                count(*) FILTER (WHERE backup_code = 'SCHEMA') AS schema_cnt
+         FROM backup_definition) AS bd,
+        (SELECT count(*) FILTER (WHERE execution_status = 'SUCCEEDED') AS succeeded_cnt,
+                count(*) FILTER (WHERE execution_status = 'ERROR') AS error_cnt,
+                sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size) AS backup_space,
+                sum(duration) AS backup_duration,
+                date_trunc('seconds',min(finished)) AS oldest_backup_job,
+                date_trunc('seconds',max(finished)) AS newest_backup_job
+         FROM backup_catalog) AS bc,
+        (SELECT count(*) AS job_queue_cnt FROM job_queue) AS jq,
+        (SELECT count(*) AS defid_force_deletion_cnt FROM catalog_entries_to_delete) AS ce;
+
+   INSERT INTO pgbackman_stats_snapshot (scope,ref_id,
+                                         pgsql_node_cnt,dbname_cnt,
+                                         backup_jobs_active_cnt,backup_jobs_stopped_cnt,
+                                         backup_jobs_cluster_cnt,backup_jobs_data_cnt,backup_jobs_full_cnt,backup_jobs_schema_cnt,
+                                         backup_catalog_succeeded_cnt,backup_catalog_error_cnt,
+                                         backup_space,backup_duration,oldest_backup_job,newest_backup_job,
+                                         job_queue_cnt,defid_force_deletion_cnt)
+   SELECT 'BACKUP_SERVER',s.server_id,
+          COALESCE(bd.pgsql_node_cnt,0),COALESCE(bd.dbname_cnt,0),
+          COALESCE(bd.active_cnt,0),COALESCE(bd.stopped_cnt,0),
+          COALESCE(bd.cluster_cnt,0),COALESCE(bd.data_cnt,0),COALESCE(bd.full_cnt,0),COALESCE(bd.schema_cnt,0),
+          COALESCE(bc.succeeded_cnt,0),COALESCE(bc.error_cnt,0),
+          bc.backup_space,bc.backup_duration,bc.oldest_backup_job,bc.newest_backup_job,
+          COALESCE(jq.job_queue_cnt,0),COALESCE(ce.defid_force_deletion_cnt,0)
+   FROM backup_server s
+   LEFT JOIN (SELECT backup_server_id,
+                     count(DISTINCT pgsql_node_id) AS pgsql_node_cnt,
+                     count(DISTINCT (pgsql_node_id,dbname)) AS dbname_cnt,
+                     count(*) FILTER (WHERE job_status = 'ACTIVE') AS active_cnt,
+                     count(*) FILTER (WHERE job_status = 'STOPPED') AS stopped_cnt,
+                     count(*) FILTER (WHERE backup_code = 'CLUSTER') AS cluster_cnt,
+                     count(*) FILTER (WHERE backup_code = 'DATA') AS data_cnt,
+                     count(*) FILTER (WHERE backup_code = 'FULL') AS full_cnt,
+                     count(*) FILTER (WHERE backup_code = 'SCHEMA') AS schema_cnt
+              FROM backup_definition
+              GROUP BY backup_server_id) AS bd ON s.server_id = bd.backup_server_id
+   LEFT JOIN (SELECT backup_server_id,
+                     count(*) FILTER (WHERE execution_status = 'SUCCEEDED') AS succeeded_cnt,
+                     count(*) FILTER (WHERE execution_status = 'ERROR') AS error_cnt,
+                     sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size) AS backup_space,
+                     sum(duration) AS backup_duration,
+                     date_trunc('seconds',min(finished)) AS oldest_backup_job,
+                     date_trunc('seconds',max(finished)) AS newest_backup_job
+              FROM backup_catalog
+              GROUP BY backup_server_id) AS bc ON s.server_id = bc.backup_server_id
+   LEFT JOIN (SELECT backup_server_id,count(*) AS job_queue_cnt
+              FROM job_queue
+              GROUP BY backup_server_id) AS jq ON s.server_id = jq.backup_server_id
+   LEFT JOIN (SELECT backup_server_id,count(*) AS defid_force_deletion_cnt
+              FROM catalog_entries_to_delete
+              GROUP BY backup_server_id) AS ce ON s.server_id = ce.backup_server_id;
+
+   INSERT INTO pgbackman_stats_snapshot (scope,ref_id,
+                                         backup_server_cnt,dbname_cnt,
+                                         backup_jobs_active_cnt,backup_jobs_stopped_cnt,
+                                         backup_jobs_cluster_cnt,backup_jobs_data_cnt,backup_jobs_full_cnt,backup_jobs_schema_cnt,
+                                         backup_catalog_succeeded_cnt,backup_catalog_error_cnt,
+                                         backup_space,backup_duration,oldest_backup_job,newest_backup_job,
+                                         job_queue_cnt)
+   SELECT 'PGSQL_NODE',n.node_id,
+          COALESCE(bd.backup_server_cnt,0),COALESCE(bd.dbname_cnt,0),
+          COALESCE(bd.active_cnt,0),COALESCE(bd.stopped_cnt,0),
+          COALESCE(bd.cluster_cnt,0),COALESCE(bd.data_cnt,0),COALESCE(bd.full_cnt,0),COALESCE(bd.schema_cnt,0),
+          COALESCE(bc.succeeded_cnt,0),COALESCE(bc.error_cnt,0),
+          bc.backup_space,bc.backup_duration,bc.oldest_backup_job,bc.newest_backup_job,
+          COALESCE(jq.job_queue_cnt,0)
+   FROM pgsql_node n
+   LEFT JOIN (SELECT pgsql_node_id,
+                     count(DISTINCT backup_server_id) AS backup_server_cnt,
+                     count(DISTINCT dbname) AS dbname_cnt,
+                     count(*) FILTER (WHERE job_status = 'ACTIVE') AS active_cnt,
+                     count(*) FILTER (WHERE job_status = 'STOPPED') AS stopped_cnt,
+                     count(*) FILTER (WHERE backup_code = 'CLUSTER') AS cluster_cnt,
+                     count(*) FILTER (WHERE backup_code = 'DATA') AS data_cnt,
+                     count(*) FILTER (WHERE backup_code = 'FULL') AS full_cnt,
+                     count(*) FILTER (WHERE backup_code = 'SCHEMA') AS schema_cnt
+              FROM backup_definition
+              GROUP BY pgsql_node_id) AS bd ON n.node_id = bd.pgsql_node_id
+   LEFT JOIN (SELECT pgsql_node_id,
+                     count(*) FILTER (WHERE execution_status = 'SUCCEEDED') AS succeeded_cnt,
+                     count(*) FILTER (WHERE execution_status = 'ERROR') AS error_cnt,
+                     sum(pg_dump_file_size+pg_dump_roles_file_size+pg_dump_dbconfig_file_size) AS backup_space,
+                     sum(duration) AS backup_duration,
+                     date_trunc('seconds',min(finished)) AS oldest_backup_job,
+                     date_trunc('seconds',max(finished)) AS newest_backup_job
+              FROM backup_catalog
+              GROUP BY pgsql_node_id) AS bc ON n.node_id = bc.pgsql_node_id
+   LEFT JOIN (SELECT pgsql_node_id,count(*) AS job_queue_cnt
+              FROM job_queue
+              GROUP BY pgsql_node_id) AS jq ON n.node_id = jq.pgsql_node_id;
+
+ EXCEPTION WHEN others THEN
+   	GET STACKED DIAGNOSTICS
+            v_msg     = MESSAGE_TEXT,
+            v_detail  = PG_EXCEPTION_DETAIL,
+            v_context = PG_EXCEPTION_CONTEXT;
+        RAISE EXCEPTION E'\n----------------------------------------------\nEXCEPTION:\n----------------------------------------------\nMESSAGE: % \nDETAIL : % \n----------------------------------------------\n', v_msg, v_detail;
+
+END;
+$$;
+
+ALTER FUNCTION refresh_pgbackman_stats_snapshot() OWNER TO pgbackman_role_rw;
+
+
 -- ------------------------------------------------------------
 -- Views
 -- ------------------------------------------------------------
@@ -4552,19 +5318,21 @@ SELECT lpad(server_id::text,5,'0') AS "SrvID",
 ALTER VIEW show_backup_servers OWNER TO pgbackman_role_rw;
 
 CREATE OR REPLACE VIEW show_backup_definitions AS
-SELECT lpad(def_id::text,11,'0') AS "DefID",
-       backup_server_id,
-       get_backup_server_fqdn(backup_server_id) AS "Backup server",
-       pgsql_node_id,
-       get_pgsql_node_fqdn(pgsql_node_id) AS "PgSQL node",
-       dbname AS "DBname",
-       minutes_cron || ' ' || hours_cron || ' ' || day_month_cron || ' ' || month_cron || ' ' || weekday_cron AS "Schedule",
-       backup_code AS "Code",
-       encryption::TEXT AS "Encryption",
-       retention_period::TEXT || ' (' || retention_redundancy::TEXT || ')' AS "Retention",
-       job_status AS "Status",
-       extra_backup_parameters AS "Parameters"
-FROM backup_definition
+SELECT lpad(a.def_id::text,11,'0') AS "DefID",
+       a.backup_server_id,
+       get_backup_server_fqdn(a.backup_server_id) AS "Backup server",
+       a.pgsql_node_id,
+       get_pgsql_node_fqdn(a.pgsql_node_id) AS "PgSQL node",
+       a.dbname AS "DBname",
+       a.minutes_cron || ' ' || a.hours_cron || ' ' || a.day_month_cron || ' ' || a.month_cron || ' ' || a.weekday_cron AS "Schedule",
+       a.backup_code AS "Code",
+       a.encryption::TEXT AS "Encryption",
+       a.retention_period::TEXT || ' (' || a.retention_redundancy::TEXT || ')' AS "Retention",
+       a.job_status AS "Status",
+       a.extra_backup_parameters AS "Parameters",
+       COALESCE(s.minutes_cron || ' ' || s.hours_cron || ' ' || a.day_month_cron || ' ' || a.month_cron || ' ' || a.weekday_cron,'') AS "Spread schedule"
+FROM backup_definition a
+LEFT JOIN backup_definition_spread s ON s.def_id = a.def_id
 ORDER BY "Backup server","PgSQL node","DBname","Code","Status";
 
 ALTER VIEW show_backup_definitions OWNER TO pgbackman_role_rw;
@@ -4611,6 +5379,32 @@ CREATE OR REPLACE VIEW show_backup_catalog AS
 
 ALTER VIEW show_backup_catalog OWNER TO pgbackman_role_rw;
 
+CREATE OR REPLACE VIEW show_backup_catalog_keyset AS
+SELECT a.bck_id,
+       a.finished,
+       lpad(a.bck_id::text,9,'0') AS "BckID",
+       COALESCE(lpad(a.def_id::text,9,'0'),'') AS "DefID",
+       a.def_id,
+       COALESCE(lpad(a.snapshot_id::text,9,'0'),'') AS "SnapshotID",
+       a.snapshot_id,
+       date_trunc('seconds',a.finished) AS "Finished",
+       a.backup_server_id,
+       get_backup_server_fqdn(a.backup_server_id) AS "Backup server",
+       a.pgsql_node_id,
+       get_pgsql_node_fqdn(a.pgsql_node_id) AS "PgSQL node",
+       a.dbname AS "DBname",
+       date_trunc('seconds',a.duration) AS "Duration",
+       pg_size_pretty(a.pg_dump_file_size+a.pg_dump_roles_file_size+a.pg_dump_dbconfig_file_size) AS "Size",
+       COALESCE(b.backup_code,c.backup_code) AS "Code",
+       a.execution_method AS "Execution",
+       a.execution_status AS "Status"
+FROM backup_catalog a
+LEFT JOIN backup_definition b ON a.def_id = b.def_id
+LEFT JOIN snapshot_definition c ON a.snapshot_id = c.snapshot_id
+WHERE b.def_id IS NOT NULL OR c.snapshot_id IS NOT NULL;
+
+ALTER VIEW show_backup_catalog_keyset OWNER TO pgbackman_role_rw;
+
 CREATE OR REPLACE VIEW show_backup_details AS
    (SELECT lpad(a.bck_id::text,12,'0') AS "BckID",
        a.bck_id AS bck_id,
@@ -4648,7 +5442,16 @@ CREATE OR REPLACE VIEW show_backup_details AS
        left(a.error_message,60) AS "Error message",
        array_to_string(a.role_list,',') AS "Role list",
        a.pgsql_node_release AS "PgSQL node release",
-       a.pg_dump_release AS "pg_dump release"
+       a.pg_dump_release AS "pg_dump release",
+       a.parallel_jobs AS "Parallel jobs",
+       CASE WHEN b.backup_code = 'CLUSTER' THEN a.compression END AS "Compression",
+       CASE WHEN b.backup_code <> 'CLUSTER' THEN a.compression END AS "Dump compression",
+       date_trunc('seconds',a.queue_wait) AS "Queue wait",
+       date_trunc('seconds',a.throttled) AS "Throttled",
+       b.bandwidth_limit AS "Bandwidth limit",
+       pg_size_pretty(a.dbname_size) AS "DBname size",
+       pg_size_pretty(a.estimated_size) AS "Estimated size",
+       a.manifest_file AS "Manifest file"
    FROM backup_catalog a
    JOIN backup_definition b ON a.def_id = b.def_id)
    UNION
@@ -4688,7 +5491,16 @@ CREATE OR REPLACE VIEW show_backup_details AS
        left(a.error_message,60) AS "Error message",
        array_to_string(a.role_list,',') AS "Role list",
        a.pgsql_node_release AS "PgSQL node release",
-       a.pg_dump_release AS "pg_dump release"
+       a.pg_dump_release AS "pg_dump release",
+       a.parallel_jobs AS "Parallel jobs",
+       CASE WHEN b.backup_code = 'CLUSTER' THEN a.compression END AS "Compression",
+       CASE WHEN b.backup_code <> 'CLUSTER' THEN a.compression END AS "Dump compression",
+       date_trunc('seconds',a.queue_wait) AS "Queue wait",
+       date_trunc('seconds',a.throttled) AS "Throttled",
+       NULL::INTEGER AS "Bandwidth limit",
+       pg_size_pretty(a.dbname_size) AS "DBname size",
+       pg_size_pretty(a.estimated_size) AS "Estimated size",
+       a.manifest_file AS "Manifest file"
    FROM backup_catalog a
    JOIN snapshot_definition b ON a.snapshot_id = b.snapshot_id)
  ORDER BY "Finished" DESC,backup_server_id,pgsql_node_id,"DBname","Code","Status";
@@ -4706,7 +5518,8 @@ CREATE OR REPLACE VIEW get_catalog_entries_to_delete AS
 	 pg_dump_roles_file,
 	 pg_dump_roles_log_file,
 	 pg_dump_dbconfig_file,
-	 pg_dump_dbconfig_log_file
+	 pg_dump_dbconfig_log_file,
+	 manifest_file
    FROM catalog_entries_to_delete
    ORDER BY del_id;
 
@@ -4730,7 +5543,8 @@ WITH
       a.pg_dump_roles_file,
       a.pg_dump_roles_log_file,
       a.pg_dump_dbconfig_file,
-      a.pg_dump_dbconfig_log_file
+      a.pg_dump_dbconfig_log_file,
+      a.manifest_file
    FROM backup_catalog a
    INNER JOIN backup_definition b ON a.def_id=b.def_id
    ORDER BY a.def_id,a.finished ASC
@@ -4769,7 +5583,8 @@ WITH
       a.pg_dump_roles_file,
       a.pg_dump_roles_log_file,
       a.pg_dump_dbconfig_file,
-      a.pg_dump_dbconfig_log_file
+      a.pg_dump_dbconfig_log_file,
+      a.manifest_file
    FROM backup_catalog a
    INNER JOIN snapshot_definition b ON a.snapshot_id=b.snapshot_id
    ORDER BY a.snapshot_id,a.finished ASC
@@ -4886,6 +5701,27 @@ CREATE OR REPLACE VIEW show_restore_catalog AS
 
 ALTER VIEW show_restore_catalog OWNER TO pgbackman_role_rw;
 
+CREATE OR REPLACE VIEW show_restore_catalog_keyset AS
+SELECT a.restore_id,
+       a.finished,
+       lpad(a.restore_id::text,10,'0') AS "RestoreID",
+       lpad(a.restore_def::text,10,'0') AS "RestoreDef",
+       a.restore_def,
+       b.bck_id AS "BckID",
+       date_trunc('seconds',a.finished) AS "Finished",
+       a.backup_server_id,
+       get_backup_server_fqdn(a.backup_server_id) AS "Backup server",
+       a.target_pgsql_node_id,
+       get_pgsql_node_fqdn(a.target_pgsql_node_id) AS "Target PgSQL node",
+       a.target_dbname AS "Target DBname",
+       a.renamed_dbname AS "Renamed DBname",
+       date_trunc('seconds',a.duration) AS "Duration",
+       a.execution_status AS "Status"
+FROM restore_catalog a
+JOIN restore_definition b ON a.restore_def = b.restore_def;
+
+ALTER VIEW show_restore_catalog_keyset OWNER TO pgbackman_role_rw;
+
 
 CREATE OR REPLACE VIEW show_restore_details AS
 (SELECT a.restore_id,
@@ -4959,6 +5795,52 @@ CREATE OR REPLACE VIEW show_restores_in_progress AS
 
 ALTER VIEW show_restores_in_progress OWNER TO pgbackman_role_rw;
 
+--
+-- Progress of the running backups. The fraction done is the size
+-- written compared with the size of the last successful backup of
+-- the definition, or the tables dumped if there is none. The ETA
+-- uses the elapsed time and this fraction, or the duration of the
+-- last successful backup when nothing has been written yet.
+--
+
+CREATE OR REPLACE VIEW show_backups_in_progress AS
+   SELECT a.procpid AS "ProcPID",
+          lpad(a.def_id::text, 11, '0'::text) AS "DefID",
+          lpad(a.snapshot_id::text, 11, '0'::text) AS "SnapshotID",
+          a.backup_server_id,
+          get_backup_server_fqdn(a.backup_server_id) AS "Backup server",
+          a.pgsql_node_id,
+          get_pgsql_node_fqdn(a.pgsql_node_id) AS "PgSQL node",
+          a.dbname AS "DBname",
+          a.backup_code AS "Code",
+          date_trunc('seconds'::text, a.started) AS "Started",
+          date_trunc('second',now()-a.started)::text AS "Elapsed time",
+          COALESCE(a.tables_dumped::text || '/' || a.tables_total::text,a.tables_dumped::text,'') AS "Tables",
+          COALESCE(pg_size_pretty(a.bytes_written),'') AS "Size",
+          COALESCE(pg_size_pretty(b.pg_dump_file_size),'') AS "Previous size",
+          COALESCE(round(c.fraction * 100)::text || '%','') AS "Progress",
+          COALESCE(to_char(CASE WHEN c.fraction > 0 THEN a.started + (a.updated - a.started) / c.fraction::double precision
+                                ELSE a.started + b.duration
+                           END, 'YYYY-MM-DD HH24:MI:SS'::text),'') AS "ETA",
+          date_trunc('seconds'::text, a.updated) AS "Updated"
+   FROM backup_in_progress a
+   LEFT JOIN LATERAL (
+     SELECT d.pg_dump_file_size,
+            d.duration
+     FROM backup_catalog d
+     WHERE d.execution_status = 'SUCCEEDED'
+     AND ((a.def_id IS NOT NULL AND d.def_id = a.def_id)
+          OR (a.def_id IS NULL AND d.snapshot_id IS NOT NULL AND d.pgsql_node_id = a.pgsql_node_id AND d.dbname = a.dbname))
+     ORDER BY d.finished DESC
+     LIMIT 1) b ON TRUE
+   LEFT JOIN LATERAL (
+     SELECT CASE WHEN b.pg_dump_file_size > 0 THEN LEAST(a.bytes_written::numeric / b.pg_dump_file_size,0.99)
+                 WHEN a.tables_total > 0 THEN LEAST(a.tables_dumped::numeric / a.tables_total,0.99)
+            END AS fraction) c ON TRUE
+   ORDER BY a.started ASC;
+
+ALTER VIEW show_backups_in_progress OWNER TO pgbackman_role_rw;
+
 CREATE OR REPLACE VIEW get_deleted_backup_definitions_to_delete_by_retention AS
    SELECT a.def_id
    FROM backup_definition a
@@ -4970,4 +5852,14 @@ CREATE OR REPLACE VIEW get_deleted_backup_definitions_to_delete_by_retention AS
 
 ALTER VIEW get_deleted_backup_definitions_to_delete_by_retention OWNER TO pgbackman_role_rw;
 
+-- ------------------------------------------------------------
+-- Privileges for pgbackman_role_ro
+--
+-- Read only access used by the show_* commands when they run
+-- against a standby server (ro_host in pgbackman.conf)
+-- ------------------------------------------------------------
+
+GRANT SELECT ON ALL TABLES IN SCHEMA public TO pgbackman_role_ro;
+ALTER DEFAULT PRIVILEGES FOR ROLE pgbackman_role_rw IN SCHEMA public GRANT SELECT ON TABLES TO pgbackman_role_ro;
+
 COMMIT;